@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import numpy as np
+import pandas as pd
+from futures_perps.trade.apolo.indicator_kernels import parabolic_sar
+
+
+def legacy_sar(data):
+    """The per-row pandas loop add_indicators used before parabolic_sar (kept for comparison)."""
+    data['sar'] = np.nan
+    af = 0.02
+    max_af = 0.2
+    ep = data['high'].iloc[0]
+    sar = data['low'].iloc[0]
+    trend = 1
+    for i in range(1, len(data)):
+        prev_sar = sar
+        sar = prev_sar + af * (ep - prev_sar)
+        if trend == 1:
+            if data['low'].iloc[i] < sar:
+                trend = -1
+                sar = ep
+                ep = data['low'].iloc[i]
+                af = 0.02
+        else:
+            if data['high'].iloc[i] > sar:
+                trend = 1
+                sar = ep
+                ep = data['high'].iloc[i]
+                af = 0.02
+        if af < max_af:
+            af += 0.02
+        data.loc[data.index[i], 'sar'] = sar
+    return data['sar']
+
+
+def make_candles(n, seed=42):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    high = close * (1 + rng.uniform(0, 0.005, n))
+    low = close * (1 - rng.uniform(0, 0.005, n))
+    return pd.DataFrame({"high": high, "low": low, "close": close})
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def bench():
+    print(f"{'candles':>8} | {'legacy (s)':>11} | {'kernel (s)':>11} | {'speedup':>8} | identical")
+    for n in (80, 1_000, 100_000):
+        df = make_candles(n)
+        repeat = 1 if n >= 100_000 else 5
+        legacy_time, legacy = best_of(lambda: legacy_sar(df.copy()), repeat)
+        kernel_time, kernel = best_of(
+            lambda: parabolic_sar(df['high'].to_numpy(), df['low'].to_numpy()), max(repeat, 5)
+        )
+        identical = np.array_equal(legacy.to_numpy(), kernel, equal_nan=True)
+        print(f"{n:>8} | {legacy_time:>11.5f} | {kernel_time:>11.5f} | {legacy_time / kernel_time:>7.0f}x | {identical}")
+
+
+if __name__ == "__main__":
+    bench()
@@ -2,6 +2,7 @@
 
 import os
 import sqlite3
+import time
 from contextlib import contextmanager
 from datetime import datetime
 
@@ -32,6 +33,22 @@ def initialize_database_tables():
             );
         """)
 
+        # create table llm_decisions (LLM decisions cached per closed candle)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS llm_decisions (
+                cache_key TEXT PRIMARY KEY,
+                asset TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                strategy TEXT,
+                candle_ts INTEGER NOT NULL,
+                prompt_mode TEXT,
+                prompt_hash TEXT NOT NULL,
+                decision TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_llm_decisions_created_at ON llm_decisions (created_at);")
+
         # Insert the default setting if it doesn't exist
         # key: asset, value: PERP_BTC_USDC
         # key: risk_level, value: 1.5
@@ -58,7 +75,19 @@ def initialize_database_tables():
             ('show_prompt', 'False'),
             ('prompt_mode', 'mixed'),
             ('order_book_threshold', '1.6'),
-            ('llm_model', 'deepseek-chat')
+            ('llm_model', 'deepseek-chat'),
+            ('candle_close_offset', '2'),
+            ('autotrade_concurrency', '4'),
+            ('asset_timeout', '120'),
+            ('llm_stream', 'True'),
+            ('prompt_token_budget', '2500'),
+            ('llm_batch', 'False'),
+            ('llm_batch_size', '8'),
+            ('llm_batch_window', '2'),
+            ('llm_base_url', 'https://api.deepseek.com/v1/chat/completions'),
+            ('llm_fallback_models', ''),
+            ('llm_hedge', 'True'),
+            ('llm_timeout', '30')
         ]
         for key, value in default_settings:
             cur.execute("""
@@ -144,5 +173,43 @@ def remove_automated_asset(asset: str):
     assets = get_automated_asset_list()
     if asset in assets:
         assets.remove(asset)
-        upsert_setting('automated_assets', ','.join(assets))  
-                    
\ No newline at end of file
+        upsert_setting('automated_assets', ','.join(assets))
+
+
+# Helper functions for the LLM decision cache (decision is stored as a JSON string)
+
+def get_llm_decision(cache_key: str, max_age: float) -> str | None:
+    """Returns the stored decision JSON for cache_key if it is younger than max_age seconds."""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("SELECT decision FROM llm_decisions WHERE cache_key = ? AND created_at >= ?",
+                    (cache_key, time.time() - max_age))
+        row = cur.fetchone()
+        return row['decision'] if row else None
+
+def save_llm_decision(cache_key: str, asset: str, interval: str, strategy: str, candle_ts: int,
+                      prompt_mode: str, prompt_hash: str, decision: str):
+    """Stores (or replaces) a decision."""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT OR REPLACE INTO llm_decisions
+                (cache_key, asset, interval, strategy, candle_ts, prompt_mode, prompt_hash, decision, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+        """, (cache_key, asset, interval, strategy, candle_ts, prompt_mode, prompt_hash, decision, time.time()))
+        conn.commit()
+
+def evict_llm_decisions(max_age: float, max_entries: int) -> int:
+    """Deletes decisions older than max_age seconds, then the oldest beyond max_entries. Returns rows deleted."""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM llm_decisions WHERE created_at < ?", (time.time() - max_age,))
+        deleted = cur.rowcount
+        cur.execute("""
+            DELETE FROM llm_decisions WHERE cache_key IN (
+                SELECT cache_key FROM llm_decisions ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            );
+        """, (max_entries,))
+        deleted += cur.rowcount
+        conn.commit()
+        return deleted
@@ -0,0 +1,202 @@
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from logs.log_config import apolo_trader_logger as logger
+from futures_perps.trade.apolo.feature_planner import compile_feature_plan, BASE_COLUMNS
+from futures_perps.trade.apolo.indicator_kernels import parabolic_sar
+from futures_perps.trade.apolo.kline_columns import KlineColumns
+
+# ---------------------------------------------------------------------------
+# 2-D kernels: every array is (symbols × time) and works along axis=1 with the
+# same NaN/min_periods semantics as the pandas calls in add_indicators.
+# ---------------------------------------------------------------------------
+
+
+def _shift(x: np.ndarray, periods: int) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    if periods < x.shape[1]:
+        out[:, periods:] = x[:, :x.shape[1] - periods]
+    return out
+
+
+def _windows(x: np.ndarray, window: int) -> np.ndarray:
+    """(S, T, window) view; the first window-1 positions are left-padded with NaN."""
+    if x.shape[1] == 0:
+        # No rows left after the warm-up (the window is shorter than the indicators need)
+        return np.empty((x.shape[0], 0, window))
+    padded = np.concatenate([np.full((x.shape[0], window - 1), np.nan), x], axis=1)
+    return sliding_window_view(padded, window, axis=1)
+
+
+def _rolling(x: np.ndarray, window: int, min_periods, reducer) -> np.ndarray:
+    min_periods = window if min_periods is None else min_periods
+    w = _windows(x, window)
+    count = np.sum(~np.isnan(w), axis=-1)
+    with np.errstate(all="ignore"):
+        out = reducer(w, count)
+    return np.where(count >= max(min_periods, 1), out, np.nan)
+
+
+def _rolling_mean(x, window, min_periods=None):
+    return _rolling(x, window, min_periods, lambda w, n: np.nansum(w, axis=-1) / n)
+
+
+def _rolling_std(x, window, min_periods=None):
+    def std(w, n):
+        mean = np.nansum(w, axis=-1) / n
+        ssq = np.nansum((w - mean[..., None]) ** 2, axis=-1)
+        return np.where(n > 1, np.sqrt(ssq / (n - 1)), np.nan)
+    return _rolling(x, window, min_periods, std)
+
+
+def _rolling_extreme(x, window, min_periods, reducer):
+    # All-NaN windows are replaced by 0 only to keep nanmin/nanmax quiet; _rolling masks them
+    return _rolling(x, window, min_periods, lambda w, n: reducer(np.where(n[..., None] > 0, w, 0.0), axis=-1))
+
+
+def _rolling_min(x, window, min_periods=None):
+    return _rolling_extreme(x, window, min_periods, np.nanmin)
+
+
+def _rolling_max(x, window, min_periods=None):
+    return _rolling_extreme(x, window, min_periods, np.nanmax)
+
+
+def _ema(x: np.ndarray, span: int) -> np.ndarray:
+    """ewm(span, adjust=False).mean() advanced one time step at a time for all symbols."""
+    alpha = 1.0 / (1.0 + (span - 1) / 2.0)
+    old_wt, new_wt = 1.0 - alpha, alpha
+    out = np.empty_like(x)
+    weighted = x[:, 0].copy()
+    out[:, 0] = weighted
+    for t in range(1, x.shape[1]):
+        cur = x[:, t]
+        blended = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+        weighted = np.where(np.isnan(weighted), cur,
+                            np.where(np.isnan(cur) | (weighted == cur), weighted, blended))
+        out[:, t] = weighted
+    return out
+
+
+def _true_range(high, low, close):
+    prev_close = _shift(close, 1)
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+def _rsi(avg_gain, avg_loss):
+    rs = np.where(avg_loss == 0, np.inf, avg_gain / avg_loss)
+    return np.where(avg_loss == 0, 100.0, 100 - (100 / (1 + rs)))
+
+
+def _sar(high, low):
+    return np.vstack([parabolic_sar(h, l) for h, l in zip(high, low)])
+
+
+def _dm(x, positive):
+    d = x - _shift(x, 1)
+    return np.where(d > 0, d, 0.0) if positive else -np.where(d < 0, d, 0.0)
+
+
+_NUMPY_OPS = {
+    "ema": lambda x, p: _ema(x[0], p[0]),
+    "sub": lambda x, p: x[0] - x[1],
+    "rolling_mean": lambda x, p: _rolling_mean(x[0], *p),
+    "rolling_std": lambda x, p: _rolling_std(x[0], *p),
+    "rolling_min": lambda x, p: _rolling_min(x[0], *p),
+    "rolling_max": lambda x, p: _rolling_max(x[0], *p),
+    "true_range": lambda x, p: _true_range(x[0], x[1], x[2]),
+    "band": lambda x, p: x[0] + (x[1] * p[1]) if p[0] > 0 else x[0] - (x[1] * p[1]),
+    "diff": lambda x, p: x[0] - _shift(x[0], p[0]),
+    "gain": lambda x, p: np.where(x[0] > 0, x[0], 0.0),
+    "loss": lambda x, p: -np.where(x[0] < 0, x[0], 0.0),
+    "rsi": lambda x, p: _rsi(x[0], x[1]),
+    "stoch_k": lambda x, p: ((x[0] - x[1]) / (x[2] - x[1])) * 100,
+    "roc": lambda x, p: (x[0] / _shift(x[0], p[0]) - 1) * 100,
+    "plus_dm": lambda x, p: _dm(x[0], True),
+    "minus_dm": lambda x, p: _dm(x[0], False),
+    "di": lambda x, p: 100 * (x[0] / x[1]),
+    "dx": lambda x, p: 100 * np.abs(x[0] - x[1]) / (x[0] + x[1]),
+    "midpoint": lambda x, p: (x[0] + x[1]) / 2,
+    "avg2": lambda x, p: (x[0] + x[1]) / 2,
+    "shift": lambda x, p: _shift(x[0], p[0]),
+    "sar": lambda x, p: _sar(x[0], x[1]),
+    "vwap": lambda x, p: np.cumsum(x[3] * (x[0] + x[1] + x[2]) / 3, axis=1) / np.cumsum(x[3], axis=1),
+}
+
+
+def _ffill(x: np.ndarray) -> np.ndarray:
+    valid = ~np.isnan(x)
+    idx = np.where(valid, np.arange(x.shape[1]), 0)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+    filled = x[np.arange(x.shape[0])[:, None], idx]
+    return np.where(np.maximum.accumulate(valid, axis=1), filled, np.nan)
+
+
+def _compute_group(candles: Dict[str, KlineColumns], features: List[str]) -> Dict[str, KlineColumns]:
+    """One vectorized pass for symbols whose windows have the same length."""
+    symbols = list(candles)
+    base = {column: np.vstack([candles[s][column] for s in symbols]) for column in BASE_COLUMNS}
+
+    plan = compile_feature_plan(tuple(features))
+    values = dict(base)
+    with np.errstate(all="ignore"):
+        for step in plan.steps:
+            values[step.key] = _NUMPY_OPS[step.op]([values[dep] for dep in step.deps], step.params)
+
+    # Same cleaning as add_indicators: inf → nan, forward fill, drop warm-up rows.
+    # After a forward fill the rows with a NaN are a prefix, so one start index per symbol.
+    columns = {}
+    for column, key in plan.outputs:
+        if column not in BASE_COLUMNS:
+            arr = values[key]
+            columns[column] = _ffill(np.where(np.isinf(arr), np.nan, arr))
+    filled_base = [_ffill(arr) for arr in base.values()]
+    complete = np.logical_and.reduce([~np.isnan(arr) for arr in filled_base + list(columns.values())])
+    has_row = complete.any(axis=1)
+    starts = np.where(has_row, np.argmax(complete, axis=1), complete.shape[1])
+
+    results = {}
+    for i, symbol in enumerate(symbols):
+        start = int(starts[i])
+        indicators = {column: arr[i] for column, arr in columns.items()}
+
+        # --- RSI 14 (needed for entropy), over the rows that are kept ---
+        if 'rsi_14' not in indicators:
+            close = base['close'][i, start:][None, :]
+            delta = close - _shift(close, 1)
+            with np.errstate(all="ignore"):
+                gain = _rolling_mean(np.where(delta > 0, delta, 0.0), 14)
+                loss = _rolling_mean(-np.where(delta < 0, delta, 0.0), 14)
+                rsi = np.full(len(candles[symbol]), np.nan)
+                rsi[start:] = (100 - (100 / (1 + gain / loss)))[0]
+            indicators['rsi_14'] = rsi
+        results[symbol] = candles[symbol].slice(start, indicators)
+    return results
+
+
+def compute_indicator_columns(candles: Dict[str, KlineColumns], features: List[str]) -> Dict[str, KlineColumns]:
+    """
+    add_indicators for many symbols at once, on column arrays.
+
+    Candle windows are stacked into (symbols × time) float64 arrays and every
+    step of the compiled feature plan runs once over the whole stack. Indicators
+    never mix symbols, so windows are aligned by position; symbols with a
+    different window length (e.g. a recent listing) go into their own group.
+    Returns {symbol: KlineColumns} with the indicator columns attached and the
+    warm-up rows dropped; to_frame() gives the add_indicators output.
+    """
+    groups = defaultdict(dict)
+    for symbol, columns in candles.items():
+        if columns is not None and len(columns) > 0:
+            groups[len(columns)][symbol] = columns
+
+    results = {}
+    for length, group in groups.items():
+        try:
+            results.update(_compute_group(group, features))
+        except Exception as e:
+            logger.warning(f"⚠️ Batch indicator pass failed for {list(group)} ({length} rows): {e}")
+    return results
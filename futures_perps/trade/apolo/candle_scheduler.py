@@ -0,0 +1,109 @@
+import time
+from typing import Callable, List, Optional
+
+from logs.log_config import apolo_trader_logger as logger
+from futures_perps.trade.apolo.kline_buffer import INTERVAL_MS
+
+# Seconds after the candle close before processing starts (exchange needs a moment to finalize the bar)
+DEFAULT_CLOSE_OFFSET = 2.0
+# Long waits (4h, 1d) are slept in chunks of at most this many seconds
+MAX_SLEEP_CHUNK = 60.0
+# Candles are aligned to the Unix epoch, except weekly ones which open on Monday 00:00 UTC
+# (the epoch was a Thursday)
+_ALIGNMENT_MS = {"1w": 4 * 24 * 60 * 60_000}
+
+
+def next_candle_close_ms(interval: str, now_ms: int) -> int:
+    """Epoch-ms of the next candle boundary strictly after now_ms."""
+    step = INTERVAL_MS[interval]
+    align = _ALIGNMENT_MS.get(interval, 0)
+    return ((now_ms - align) // step + 1) * step + align
+
+
+class CandleScheduler:
+    """
+    Runs the autotrade cycle right after each candle close instead of sleeping
+    a fixed interval after the work is done (which drifts by the processing time).
+
+    The next wall-clock boundary is converted once to a monotonic deadline and
+    slept towards in chunks, then `offset` more seconds give the exchange time
+    to finalize the bar. When a close signal is available (the kline stream saw
+    the bar close), the cycle starts as soon as it fires and `offset` is only
+    the upper bound. A cycle that overruns one or more boundaries skips them
+    and waits for the next one. Decisions are recorded against the close they
+    were made for, giving the close-to-decision latency of every cycle.
+    """
+
+    def __init__(self, interval: str, offset: float = DEFAULT_CLOSE_OFFSET):
+        if interval not in INTERVAL_MS:
+            raise ValueError(f"Unsupported interval for candle scheduling: {interval}")
+        self.interval = interval
+        self.offset = offset
+        self.last_close_ms: Optional[int] = None
+        self._latencies: List[float] = []
+        self.stats = {"cycles": 0, "missed_closes": 0, "signalled_closes": 0, "last_cycle": None}
+
+    def wait_for_next_close(self, close_signal: Optional[Callable[[int, float], bool]] = None) -> int:
+        """
+        Sleep until the next candle close, then until `close_signal(candle_start_ms, timeout)`
+        reports the bar closed or `offset` seconds pass; returns that close (epoch ms).
+        """
+        now_ms = int(time.time() * 1000)
+        close_ms = next_candle_close_ms(self.interval, now_ms)
+
+        if self.last_close_ms is not None:
+            missed = (close_ms - self.last_close_ms) // INTERVAL_MS[self.interval] - 1
+            if missed > 0:
+                self.stats["missed_closes"] += missed
+                logger.warning(f"⚠️ Autotrade cycle overran {missed} candle close(s) on {self.interval}")
+
+        boundary = time.monotonic() + (close_ms - now_ms) / 1000
+        self._sleep_until(boundary)
+        signalled = False
+        if close_signal is not None:
+            try:
+                signalled = close_signal(close_ms - INTERVAL_MS[self.interval], self.offset)
+            except Exception as e:
+                logger.warning(f"⚠️ Candle close signal failed, using the {self.offset}s offset: {e}")
+        if signalled:
+            self.stats["signalled_closes"] += 1
+        else:
+            self._sleep_until(boundary + self.offset)
+
+        self.last_close_ms = close_ms
+        self._latencies = []
+        return close_ms
+
+    @staticmethod
+    def _sleep_until(deadline: float):
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, MAX_SLEEP_CHUNK))
+
+    def record_decision(self, label: str = "") -> float:
+        """Seconds since the current cycle's candle close; logged per decision."""
+        latency = time.time() - self.last_close_ms / 1000
+        self._latencies.append(latency)
+        logger.info(f"⏱️ Close-to-decision latency {label}: {latency:.2f}s")
+        return latency
+
+    def finish_cycle(self) -> Optional[dict]:
+        """Summarize the cycle's latencies (first / last / max decision after the close)."""
+        self.stats["cycles"] += 1
+        if not self._latencies:
+            return None
+        summary = {
+            "close_ms": self.last_close_ms,
+            "decisions": len(self._latencies),
+            "first": self._latencies[0],
+            "last": self._latencies[-1],
+            "max": max(self._latencies),
+        }
+        self.stats["last_cycle"] = summary
+        logger.info(
+            f"Autotrade cycle for {self.interval} close done: {summary['decisions']} decisions, "
+            f"first {summary['first']:.2f}s / last {summary['last']:.2f}s after close"
+        )
+        return summary
@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import NamedTuple, Optional
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from logs.log_config import apolo_trader_logger as logger
+from db.db_ops import get_llm_decision, save_llm_decision, evict_llm_decisions
+from futures_perps.trade.apolo.kline_buffer import INTERVAL_MS
+
+# A decision is only reused within its candle, so nothing older than the longest interval is useful
+DECISION_MAX_AGE = INTERVAL_MS["1w"] / 1000
+DECISION_MAX_ENTRIES = 2000
+# Eviction runs on every Nth store
+EVICT_EVERY = 50
+
+
+class DecisionKey(NamedTuple):
+    asset: str
+    interval: str
+    strategy: str
+    candle_ts: int     # start of the last closed candle the decision was made on (ms)
+    prompt_mode: str
+    prompt_hash: str   # fingerprint of the instructions sent to the LLM (prompt text, format, model)
+
+    @property
+    def cache_key(self) -> str:
+        return hashlib.sha256(json.dumps(list(self)).encode()).hexdigest()
+
+
+def prompt_fingerprint(*parts) -> str:
+    """Short hash of the prompt template pieces; changing any of them invalidates cached decisions."""
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode()).hexdigest()[:16]
+
+
+def last_closed_candle_ts(start_times, interval: str, now_ms: Optional[int] = None) -> Optional[int]:
+    """Start (ms) of the newest candle in `start_times` that has closed, or None."""
+    step = INTERVAL_MS.get(interval)
+    if step is None or not len(start_times):
+        return None
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    for ts in reversed(start_times[-2:].tolist()):
+        if ts + step <= now_ms:
+            return int(ts)
+    return None
+
+
+class DecisionCache:
+    """
+    LLM decisions keyed by (asset, interval, strategy, last closed candle,
+    prompt mode, prompt fingerprint), persisted in SQLite so they survive restarts.
+
+    The same asset analyzed twice within one candle (a manual signal overlapping
+    the autotrade loop, or a restarted loop) reuses the first decision instead
+    of calling the LLM again. Callers hold lock(key) around lookup + LLM call +
+    store, so an overlapping analysis waits for the one in flight and then hits.
+    Live inputs (price, book) are not part of the key: they move every second,
+    and the Python rules applied after the LLM still use the fresh values.
+    """
+
+    def __init__(self, max_age: float = DECISION_MAX_AGE, max_entries: int = DECISION_MAX_ENTRIES):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._stores = 0
+        self.stats = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "evicted": 0, "errors": 0}
+
+    @contextmanager
+    def lock(self, key: DecisionKey):
+        with self._locks_guard:
+            entry = self._locks.setdefault(key.cache_key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[key.cache_key]
+
+    def get(self, key: DecisionKey, bypass: bool = False) -> Optional[dict]:
+        if bypass:
+            self.stats["bypassed"] += 1
+            return None
+        try:
+            raw = get_llm_decision(key.cache_key, self.max_age)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"⚠️ Decision cache lookup failed: {e}")
+            return None
+        if raw is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return json.loads(raw)
+
+    def put(self, key: DecisionKey, decision: dict):
+        try:
+            save_llm_decision(key.cache_key, key.asset, key.interval, key.strategy, key.candle_ts,
+                              key.prompt_mode, key.prompt_hash, json.dumps(decision))
+            self.stats["stores"] += 1
+            self._stores += 1
+            if self._stores % EVICT_EVERY == 1:
+                self.stats["evicted"] += evict_llm_decisions(self.max_age, self.max_entries)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"⚠️ Decision cache store failed: {e}")
+
+
+# ✅ Shared decision cache
+decision_cache = DecisionCache()
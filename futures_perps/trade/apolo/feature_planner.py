@@ -0,0 +1,156 @@
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
+
+from logs.log_config import apolo_trader_logger as logger
+
+BASE_COLUMNS = ("close", "high", "low", "volume")
+
+
+class PlanStep(NamedTuple):
+    key: str                 # unique name of the intermediate, e.g. "rolling_min:low:14"
+    op: str                  # operation the executor runs, e.g. "rolling_min"
+    deps: Tuple[str, ...]    # keys this step reads
+    params: Tuple            # op parameters (window, min_periods, ...)
+
+
+class FeaturePlan(NamedTuple):
+    steps: Tuple[PlanStep, ...]        # topologically ordered, each intermediate once
+    outputs: Tuple[Tuple[str, str], ...]  # (column, step key) for every requested column
+
+
+# ---------------------------------------------------------------------------
+# Node constructors. Each returns the key of the node and registers it (and its
+# dependencies) in `nodes`; identical intermediates collapse onto the same key.
+# ---------------------------------------------------------------------------
+
+def _node(nodes: Dict[str, PlanStep], key: str, op: str, deps=(), params=()) -> str:
+    if key not in nodes:
+        nodes[key] = PlanStep(key, op, tuple(deps), tuple(params))
+    return key
+
+
+def _ema(nodes, src, span):
+    return _node(nodes, f"ema:{src}:{span}", "ema", (src,), (span,))
+
+
+def _rolling(nodes, op, src, window, min_periods=None):
+    suffix = f":{min_periods}" if min_periods is not None else ""
+    return _node(nodes, f"{op}:{src}:{window}{suffix}", op, (src,), (window, min_periods))
+
+
+def _true_range(nodes):
+    return _node(nodes, "tr", "true_range", ("high", "low", "close"))
+
+
+def _midpoint(nodes, window):
+    hi = _rolling(nodes, "rolling_max", "high", window)
+    lo = _rolling(nodes, "rolling_min", "low", window)
+    return _node(nodes, f"midpoint:{window}", "midpoint", (hi, lo))
+
+
+def _macd(nodes):
+    fast, slow = _ema(nodes, "close", 12), _ema(nodes, "close", 26)
+    return _node(nodes, "macd", "sub", (fast, slow))
+
+
+def _stoch_k(nodes, window):
+    lo = _rolling(nodes, "rolling_min", "low", window)
+    hi = _rolling(nodes, "rolling_max", "high", window)
+    return _node(nodes, f"stoch_k:{window}", "stoch_k", ("close", lo, hi))
+
+
+def _window(feature: str, last: bool = False) -> int:
+    parts = feature.split("_")
+    return int(parts[-1] if last else parts[1])
+
+
+def _feature_node(nodes, feature: str) -> str:
+    """Key of the node producing `feature` (raises IndexError/ValueError on a bad window)."""
+    if feature in BASE_COLUMNS:
+        return feature
+    if feature.startswith("ema_"):
+        return _ema(nodes, "close", _window(feature))
+    if feature == "macd":
+        return _macd(nodes)
+    if feature == "macd_signal":
+        return _ema(nodes, _macd(nodes), 9)
+    if feature.startswith("atr_"):
+        return _rolling(nodes, "rolling_mean", _true_range(nodes), _window(feature))
+    if feature in ("bollinger_hband", "bollinger_lband"):
+        mavg = _rolling(nodes, "rolling_mean", "close", 20)
+        std = _rolling(nodes, "rolling_std", "close", 20)
+        sign = 1 if feature == "bollinger_hband" else -1
+        return _node(nodes, f"band:{sign}:{mavg}:{std}", "band", (mavg, std), (sign, 2))
+    if feature.startswith("std_"):
+        return _rolling(nodes, "rolling_std", "close", _window(feature))
+    if feature.startswith("rsi_"):
+        window = _window(feature)
+        delta = _node(nodes, "diff:close:1", "diff", ("close",), (1,))
+        gain = _node(nodes, "gain", "gain", (delta,))
+        loss = _node(nodes, "loss", "loss", (delta,))
+        avg_gain = _rolling(nodes, "rolling_mean", gain, window, 1)
+        avg_loss = _rolling(nodes, "rolling_mean", loss, window, 1)
+        return _node(nodes, f"rsi:{window}", "rsi", (avg_gain, avg_loss))
+    if feature.startswith("stoch_k_"):
+        return _stoch_k(nodes, _window(feature, last=True))
+    if feature.startswith("stoch_d_"):
+        return _rolling(nodes, "rolling_mean", _stoch_k(nodes, _window(feature, last=True)), 3)
+    if feature.startswith("momentum_"):
+        return _node(nodes, f"diff:close:{_window(feature)}", "diff", ("close",), (_window(feature),))
+    if feature.startswith("roc_"):
+        return _node(nodes, f"roc:{_window(feature)}", "roc", ("close",), (_window(feature),))
+    if feature.startswith("adx"):
+        window = int(feature.split("_")[1]) if "_" in feature else 14
+        tr_mean = _rolling(nodes, "rolling_mean", _true_range(nodes), window)
+        plus_dm = _node(nodes, "plus_dm", "plus_dm", ("high",))
+        minus_dm = _node(nodes, "minus_dm", "minus_dm", ("low",))
+        plus_di = _node(nodes, f"di:+:{window}", "di", (_rolling(nodes, "rolling_mean", plus_dm, window), tr_mean))
+        minus_di = _node(nodes, f"di:-:{window}", "di", (_rolling(nodes, "rolling_mean", minus_dm, window), tr_mean))
+        dx = _node(nodes, f"dx:{window}", "dx", (plus_di, minus_di))
+        return _rolling(nodes, "rolling_mean", dx, window)
+    if feature.startswith("tenkan_sen_") or feature.startswith("kijun_sen_"):
+        return _midpoint(nodes, _window(feature, last=True))
+    if feature.startswith("senkou_span_a"):
+        line = _node(nodes, "senkou_a_line", "avg2", (_midpoint(nodes, 9), _midpoint(nodes, 26)))
+        return _node(nodes, "senkou_span_a", "shift", (line,), (26,))
+    if feature.startswith("senkou_span_b"):
+        return _node(nodes, "senkou_span_b", "shift", (_midpoint(nodes, 52),), (26,))
+    if feature == "sar":
+        return _node(nodes, "sar", "sar", ("high", "low"))
+    if feature == "vwap":
+        return _node(nodes, "vwap", "vwap", ("high", "low", "close", "volume"))
+    raise ValueError(f"Unknown feature: {feature}")
+
+
+def _topological(nodes: Dict[str, PlanStep], roots: List[str]) -> List[PlanStep]:
+    ordered, seen = [], set(BASE_COLUMNS)
+
+    def visit(key):
+        if key in seen:
+            return
+        seen.add(key)
+        for dep in nodes[key].deps:
+            visit(dep)
+        ordered.append(nodes[key])
+
+    for root in roots:
+        visit(root)
+    return ordered
+
+
+@lru_cache(maxsize=None)
+def compile_feature_plan(features: Tuple[str, ...]) -> FeaturePlan:
+    """
+    Compile a feature list (e.g. strategy_features[interval][strategy]["features"])
+    into an ordered DAG of computations. Shared intermediates (true range,
+    rolling min/max, EMAs, rolling std, ...) appear once. Cached per feature tuple.
+    """
+    nodes: Dict[str, PlanStep] = {}
+    outputs = []
+    for feature in features:
+        try:
+            outputs.append((feature, _feature_node(nodes, feature)))
+        except (IndexError, ValueError):
+            logger.warning(f"⚠️ Could not extract window for feature: {feature}")
+    steps = _topological(nodes, [key for _, key in outputs])
+    return FeaturePlan(tuple(steps), tuple(outputs))
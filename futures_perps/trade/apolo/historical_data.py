@@ -1,57 +1,20 @@
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
-import threading
 import time
 from typing import Dict, Optional, List
-import requests
 import pandas as pd
 import numpy as np
-from base58 import b58decode
-from base64 import urlsafe_b64encode
-import urllib.parse
-from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
 from logs.log_config import apolo_trader_logger as logger
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# ✅ Orderly API Config
-BASE_URL = os.getenv("ORDERLY_BASE_URL")
-ORDERLY_ACCOUNT_ID = os.getenv("ORDERLY_ACCOUNT_ID")
-ORDERLY_SECRET = os.getenv("ORDERLY_SECRET")
-ORDERLY_PUBLIC_KEY = os.getenv("ORDERLY_PUBLIC_KEY")
-
-if not ORDERLY_SECRET or not ORDERLY_PUBLIC_KEY:
-    raise ValueError("❌ ORDERLY_SECRET or ORDERLY_PUBLIC_KEY environment variables are not set!")
-
-# ✅ Remove "ed25519:" prefix if present in private key
-if ORDERLY_SECRET.startswith("ed25519:"):
-    ORDERLY_SECRET = ORDERLY_SECRET.replace("ed25519:", "")
-
-# ✅ Decode Base58 Private Key
-private_key = Ed25519PrivateKey.from_private_bytes(b58decode(ORDERLY_SECRET))
-
-# ✅ Rate limiter (Ensures max 8 API requests per second globally)
-class RateLimiter:
-    def __init__(self, max_calls, period):
-        self.max_calls = max_calls
-        self.period = period
-        self.calls = []
-        self.lock = threading.Lock()
-
-    def __call__(self):
-        with self.lock:
-            now = time.time()
-            self.calls = [call for call in self.calls if call > now - self.period]
-            if len(self.calls) >= self.max_calls:
-                sleep_time = self.period - (now - self.calls[0])
-                print(f"⏳ Rate limit reached! Sleeping for {sleep_time:.2f} seconds...")
-                time.sleep(sleep_time)
-            self.calls.append(time.time())
-
-# ✅ Initialize Global Rate Limiter
-rate_limiter = RateLimiter(max_calls=10, period=1)
+from trading_bot.orderly_client import orderly_client
+from trading_bot.orderly_types import (
+    Kline, OrderbookSnapshot, FundingRate, Liquidation, response_json,
+)
+from futures_perps.trade.apolo.kline_buffer import KlineBuffer
+from futures_perps.trade.apolo.indicator_kernels import parabolic_sar
+from futures_perps.trade.apolo.feature_planner import compile_feature_plan, BASE_COLUMNS
+from futures_perps.trade.apolo.batch_indicators import compute_indicator_columns
+from futures_perps.trade.apolo.kline_columns import KlineColumns, columns_from_klines
 
 base_features = ["close", "high", "low", "volume"]
 
@@ -112,183 +75,71 @@ strategy_features = {
     }
 }
 
+def _pandas_rolling(series, window, min_periods):
+    return series.rolling(window=window, min_periods=min_periods)
+
+
+# ✅ pandas implementation of every planner op: op(inputs, params) -> Series/array
+_PANDAS_OPS = {
+    "ema": lambda x, p: x[0].ewm(span=p[0], adjust=False).mean(),
+    "sub": lambda x, p: x[0] - x[1],
+    "rolling_mean": lambda x, p: _pandas_rolling(x[0], *p).mean(),
+    "rolling_std": lambda x, p: _pandas_rolling(x[0], *p).std(),
+    "rolling_min": lambda x, p: _pandas_rolling(x[0], *p).min(),
+    "rolling_max": lambda x, p: _pandas_rolling(x[0], *p).max(),
+    "true_range": lambda x, p: pd.concat([
+        x[0] - x[1],
+        (x[0] - x[2].shift()).abs(),
+        (x[1] - x[2].shift()).abs()
+    ], axis=1).max(axis=1),
+    "band": lambda x, p: x[0] + (x[1] * p[1]) if p[0] > 0 else x[0] - (x[1] * p[1]),
+    "diff": lambda x, p: x[0].diff(periods=p[0]),
+    "gain": lambda x, p: x[0].where(x[0] > 0, 0.0),
+    "loss": lambda x, p: -x[0].where(x[0] < 0, 0.0),
+    "rsi": lambda x, p: _rsi_from_averages(x[0], x[1]),
+    "stoch_k": lambda x, p: ((x[0] - x[1]) / (x[2] - x[1])) * 100,
+    "roc": lambda x, p: x[0].pct_change(periods=p[0]) * 100,
+    "plus_dm": lambda x, p: x[0].diff().where(lambda d: d > 0, 0),
+    "minus_dm": lambda x, p: -x[0].diff().where(lambda d: d < 0, 0),
+    "di": lambda x, p: 100 * (x[0] / x[1]),
+    "dx": lambda x, p: 100 * abs(x[0] - x[1]) / (x[0] + x[1]),
+    "midpoint": lambda x, p: (x[0] + x[1]) / 2,
+    "avg2": lambda x, p: (x[0] + x[1]) / 2,
+    "shift": lambda x, p: x[0].shift(p[0]),
+    "sar": lambda x, p: parabolic_sar(x[0].to_numpy(dtype=float), x[1].to_numpy(dtype=float)),
+    "vwap": lambda x, p: (x[3] * (x[0] + x[1] + x[2]) / 3).cumsum() / x[3].cumsum(),
+}
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    # Avoid division by zero
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = np.where(avg_loss == 0, np.inf, avg_gain / avg_loss)
+        return np.where(avg_loss == 0, 100.0, 100 - (100 / (1 + rs)))
+
+
 def add_indicators(data, required_features):
     """
     Add only the necessary indicators to the data based on the requested features.
+
+    The feature list is compiled once into a dependency plan (see feature_planner),
+    so shared intermediates are computed a single time and only the requested
+    columns (plus the candle columns already in `data`) are written to the frame.
     """
     data[['close', 'high', 'low', 'volume']] = data[['close', 'high', 'low', 'volume']].apply(pd.to_numeric)
 
-    # --- EMA ---
-    for feature in required_features:
-        if feature.startswith("ema_"):
-            try:
-                window = int(feature.split("_")[1])
-                data[feature] = data['close'].ewm(span=window, adjust=False).mean()
-            except (IndexError, ValueError):
-                logger.warning(f"⚠️ Could not extract window for feature: {feature}")
-
-    # --- MACD ---
-    if any(x in required_features for x in ['macd', 'macd_signal']):
-        data['ema_12'] = data['close'].ewm(span=12, adjust=False).mean()
-        data['ema_26'] = data['close'].ewm(span=26, adjust=False).mean()
-        data['macd'] = data['ema_12'] - data['ema_26']
-        data['macd_signal'] = data['macd'].ewm(span=9, adjust=False).mean()
-
-    # --- ATR ---
-    for feature in required_features:
-        if feature.startswith("atr_"):
-            try:
-                window = int(feature.split("_")[1])
-                data['tr'] = pd.concat([
-                    data['high'] - data['low'],
-                    (data['high'] - data['close'].shift()).abs(),
-                    (data['low'] - data['close'].shift()).abs()
-                ], axis=1).max(axis=1)
-                data[feature] = data['tr'].rolling(window=window).mean()
-            except (IndexError, ValueError):
-                logger.warning(f"⚠️ Could not extract window for feature: {feature}")
-
-    # --- Bollinger Bands ---
-    if any(f in required_features for f in ['bollinger_hband', 'bollinger_lband']):
-        window = 20
-        data['bollinger_mavg'] = data['close'].rolling(window=window).mean()
-        data['bollinger_std'] = data['close'].rolling(window=window).std()
-        data['bollinger_hband'] = data['bollinger_mavg'] + (data['bollinger_std'] * 2)
-        data['bollinger_lband'] = data['bollinger_mavg'] - (data['bollinger_std'] * 2)
-
-    # --- Standard Deviation ---
-    for feature in required_features:
-        if feature.startswith("std_"):
-            try:
-                window = int(feature.split("_")[1])
-                data[feature] = data['close'].rolling(window=window).std()
-            except (IndexError, ValueError):
-                logger.warning(f"⚠️ Could not extract window for feature: {feature}")
-
-    # --- RSI (robust) ---
-    for feature in required_features:
-        if feature.startswith("rsi_"):
-            try:
-                window = int(feature.split("_")[1])
-                delta = data['close'].diff()
-                gain = delta.where(delta > 0, 0.0)
-                loss = -delta.where(delta < 0, 0.0)
-
-                avg_gain = gain.rolling(window=window, min_periods=1).mean()
-                avg_loss = loss.rolling(window=window, min_periods=1).mean()
-
-                # Avoid division by zero
-                rs = np.where(avg_loss == 0, np.inf, avg_gain / avg_loss)
-                rsi = np.where(avg_loss == 0, 100.0, 100 - (100 / (1 + rs)))
-                data[feature] = rsi
-
-            except (IndexError, ValueError, ZeroDivisionError) as e:
-                logger.warning(f"⚠️ RSI calculation failed for {feature}: {e}")
-                data[feature] = np.nan
-
-    # --- Stochastic Oscillator ---
-    stoch_done = set()
-    for feature in required_features:
-        if feature.startswith("stoch_"):
-            try:
-                window = int(feature.split("_")[-1])
-                if window in stoch_done:
-                    continue
-                stoch_k = ((data['close'] - data['low'].rolling(window).min()) /
-                           (data['high'].rolling(window).max() - data['low'].rolling(window).min())) * 100
-                stoch_d = stoch_k.rolling(3).mean()
-                data[f'stoch_k_{window}'] = stoch_k
-                data[f'stoch_d_{window}'] = stoch_d
-                stoch_done.add(window)
-            except (IndexError, ValueError):
-                logger.warning(f"⚠️ Could not extract window for feature: {feature}")
-
-    # --- Momentum ---
-    for feature in required_features:
-        if feature.startswith("momentum_"):
-            try:
-                window = int(feature.split("_")[1])
-                data[feature] = data['close'].diff(periods=window)
-            except (IndexError, ValueError):
-                logger.warning(f"⚠️ Could not extract window for feature: {feature}")
-
-    # --- Rate of Change (ROC) ---
-    for feature in required_features:
-        if feature.startswith("roc_"):
-            try:
-                window = int(feature.split("_")[1])
-                data[feature] = data['close'].pct_change(periods=window) * 100
-            except (IndexError, ValueError):
-                logger.warning(f"⚠️ Could not extract window for feature: {feature}")
-
-    # --- ADX ---
-    for feature in required_features:
-        if feature.startswith("adx"):
-            try:
-                window = int(feature.split("_")[1]) if "_" in feature else 14
-                data['plus_dm'] = data['high'].diff().where(lambda x: x > 0, 0)
-                data['minus_dm'] = -data['low'].diff().where(lambda x: x < 0, 0)
-                data['tr'] = pd.concat([
-                    data['high'] - data['low'],
-                    (data['high'] - data['close'].shift()).abs(),
-                    (data['low'] - data['close'].shift()).abs()
-                ], axis=1).max(axis=1)
-                data['plus_di'] = 100 * (data['plus_dm'].rolling(window=window).mean() / data['tr'].rolling(window=window).mean())
-                data['minus_di'] = 100 * (data['minus_dm'].rolling(window=window).mean() / data['tr'].rolling(window=window).mean())
-                data['dx'] = 100 * abs(data['plus_di'] - data['minus_di']) / (data['plus_di'] + data['minus_di'])
-                data[feature] = data['dx'].rolling(window=window).mean()
-            except (IndexError, ValueError) as e:
-                logger.warning(f"⚠️ ADX error for {feature}: {e}")
-
-    # --- Ichimoku Cloud ---
-    for feature in required_features:
-        if feature.startswith("tenkan_sen_"):
-            try:
-                window = int(feature.split("_")[-1])
-                data[feature] = (data['high'].rolling(window=window).max() + data['low'].rolling(window=window).min()) / 2
-            except (IndexError, ValueError):
-                logger.warning(f"⚠️ Could not extract window for feature: {feature}")
-        if feature.startswith("kijun_sen_"):
-            try:
-                window = int(feature.split("_")[-1])
-                data[feature] = (data['high'].rolling(window=window).max() + data['low'].rolling(window=window).min()) / 2
-            except (IndexError, ValueError):
-                logger.warning(f"⚠️ Could not extract window for feature: {feature}")
-        if feature.startswith("senkou_span_a"):
-            data[feature] = ((data['tenkan_sen_9'] + data['kijun_sen_26']) / 2).shift(26)
-        if feature.startswith("senkou_span_b"):
-            data[feature] = ((data['high'].rolling(window=52).max() + data['low'].rolling(window=52).min()) / 2).shift(26)
-
-    # --- Parabolic SAR ---
-    if 'sar' in required_features:
-        data['sar'] = np.nan
-        af = 0.02
-        max_af = 0.2
-        ep = data['high'].iloc[0]
-        sar = data['low'].iloc[0]
-        trend = 1
-        for i in range(1, len(data)):
-            prev_sar = sar
-            sar = prev_sar + af * (ep - prev_sar)
-            if trend == 1:
-                if data['low'].iloc[i] < sar:
-                    trend = -1
-                    sar = ep
-                    ep = data['low'].iloc[i]
-                    af = 0.02
-            else:
-                if data['high'].iloc[i] > sar:
-                    trend = 1
-                    sar = ep
-                    ep = data['high'].iloc[i]
-                    af = 0.02
-            if af < max_af:
-                af += 0.02
-            data.loc[data.index[i], 'sar'] = sar
-
-    # --- VWAP ---
-    if 'vwap' in required_features:
-        data['vwap'] = (data['volume'] * (data['high'] + data['low'] + data['close']) / 3).cumsum() / data['volume'].cumsum()
+    plan = compile_feature_plan(tuple(required_features))
+    values = {column: data[column] for column in BASE_COLUMNS}
+    for step in plan.steps:
+        try:
+            values[step.key] = _PANDAS_OPS[step.op]([values[dep] for dep in step.deps], step.params)
+        except (IndexError, ValueError, ZeroDivisionError) as e:
+            logger.warning(f"⚠️ Indicator step {step.key} failed: {e}")
+            values[step.key] = pd.Series(np.nan, index=data.index)
+
+    for column, key in plan.outputs:
+        if column not in BASE_COLUMNS:
+            data[column] = values[key]
 
     # Clean NaNs safely (NO backfill to avoid leakage)
     data.replace([np.inf, -np.inf], np.nan, inplace=True)
@@ -317,140 +168,175 @@ def get_features_for_strategy(interval, strategy):
     }
 
 
-# ✅ Fetch historical Orderly data with global rate limiting
-def get_historical_data_limit_apolo(symbol, interval, limit, strategy):
-    rate_limiter()  # ✅ Apply global rate limit
-
-    timestamp = str(int(time.time() * 1000))
+def _fetch_kline_rows(symbol, interval, limit):
+    """/v1/kline rows as Kline records (newest first, as Orderly returns them) or None on failure."""
     params = {"symbol": symbol, "type": interval, "limit": limit}
-    path = "/v1/kline"
-    query = f"?{urllib.parse.urlencode(params)}"
-    message = f"{timestamp}GET{path}{query}"
-    signature = urlsafe_b64encode(private_key.sign(message.encode())).decode()
-
-    headers = {
-        "orderly-timestamp": timestamp,
-        "orderly-account-id": ORDERLY_ACCOUNT_ID,
-        "orderly-key": ORDERLY_PUBLIC_KEY,
-        "orderly-signature": signature,
-    }
-
-    url = f"{BASE_URL}{path}{query}"
-    response = requests.get(url, headers=headers)
+    response = orderly_client.get("/v1/kline", params=params)
 
     if response.status_code != 200:
-        print(f"❌ Error fetching data for {symbol} {interval}: {response.json()}")
+        print(f"❌ Error fetching data for {symbol} {interval}: {response.text}")
         return None
 
-    data = response.json().get("data", {})
+    data = response_json(response).get("data", {})
     if not data or "rows" not in data:
         return None
+    return Kline.many_from_rest(data["rows"])
 
-    df = pd.DataFrame(data["rows"])
-    required_columns = ["start_timestamp", "open", "high", "low", "close", "volume"]
-    if set(required_columns).issubset(df.columns):
-        # Convert start_timestamp from ms to datetime
-        df["start_time"] = df["start_timestamp"]  # keep raw ms
-        df["start_timestamp"] = pd.to_datetime(df["start_timestamp"], unit="ms", utc=True)
-        
 
-        # Optional: set index but still keep the columns
-        df = df.set_index("start_timestamp", drop=False)
+# ✅ Candles are kept in memory per (symbol, interval); only new ones are downloaded
+kline_buffer = KlineBuffer(_fetch_kline_rows)
 
-        # Remove duplicates
-        df = df[~df.index.duplicated(keep="first")]
 
-        # Keep column order nice
-        df = df[["start_time", "start_timestamp", "open", "high", "low", "close", "volume"]]
+def _get_strategy_features(interval, strategy):
+    features = get_features_for_strategy(interval, strategy)["features"]
+    if not features:
+        print(f"⚠️ Warning: No features defined for interval: {interval} and strategy: {strategy}")
+        raise ValueError(f"No features defined for interval: {interval} and strategy: {strategy}")
+    return features
 
-        # ✅ SORT CHRONOLOGICALLY (OLDEST → NEWEST)
-        df = df.reset_index(drop=True).sort_values('start_timestamp').reset_index(drop=True)
 
-        features_dict = get_features_for_strategy(interval, strategy)
-        features = features_dict["features"]
-        
-        if not features:
-            print(f"⚠️ Warning: No features defined for interval: {interval} and strategy: {strategy}")
-            raise ValueError(f"No features defined for interval: {interval} and strategy: {strategy}")
-        
-        df = add_indicators(df, features)
+def get_kline_columns_apolo(symbol, interval, limit) -> Optional[KlineColumns]:
+    """Sorted, de-duplicated candle window as column arrays (no DataFrame), or None."""
+    rows = kline_buffer.get_rows(symbol, interval, limit)
+    if not rows:
+        return None
+    return columns_from_klines(rows)
 
-        return df
-    return None
 
+def get_kline_frame_apolo(symbol, interval, limit):
+    """Sorted candle frame (start_time, start_timestamp, open, high, low, close, volume) without indicators."""
+    candles = get_kline_columns_apolo(symbol, interval, limit)
+    return candles.to_frame() if candles is not None else None
 
 
-def get_orderbook(symbol: str, limit: int = 5) -> Dict[str, List[List[str]]]:
+# ✅ Fetch historical Orderly data with global rate limiting
+def get_historical_data_limit_apolo(symbol, interval, limit, strategy):
+    df = get_kline_frame_apolo(symbol, interval, limit)
+    if df is None:
+        return None
+
+    features = _get_strategy_features(interval, strategy)
+    return add_indicators(df, features)
+
+
+def get_indicator_columns_apolo(symbol, interval, limit, strategy) -> Optional[KlineColumns]:
+    """get_historical_data_limit_apolo on column arrays: candles + strategy indicators, no DataFrame."""
+    return get_historical_data_batch_apolo([symbol], interval, limit, strategy).get(symbol)
+
+
+def get_historical_data_batch_apolo(symbols, interval, limit, strategy) -> Dict[str, KlineColumns]:
     """
-    Fetch authenticated order book from Orderly (required for PERP_*_USDC).
-    Returns: {"bids": [["price","qty"], ...], "asks": [["price","qty"], ...]}
+    Candles + strategy indicators for several symbols as KlineColumns, computed
+    in one vectorized pass on the arrays (to_frame() gives the
+    get_historical_data_limit_apolo frame). Symbols whose klines could not be
+    loaded are missing from the result. Each window records when it was
+    computed in attrs["computed_at"] so callers can reject stale ones.
     """
-    rate_limiter()  # ✅ Apply global rate limit
-
-    max_level = min(limit, 500)
-    path = f"/v1/orderbook/{symbol}"
-    query = f"?max_level={max_level}"
-
-    # Sign the request
-    timestamp = str(int(time.time() * 1000))
-    message = f"{timestamp}GET{path}{query}"
-    signature = urlsafe_b64encode(private_key.sign(message.encode())).decode()
-
-    headers = {
-        "orderly-timestamp": timestamp,
-        "orderly-account-id": ORDERLY_ACCOUNT_ID,
-        "orderly-key": ORDERLY_PUBLIC_KEY,
-        "orderly-signature": signature,
-    }
+    features = _get_strategy_features(interval, strategy)
+    candles = {}
+    for symbol in symbols:
+        columns = get_kline_columns_apolo(symbol, interval, limit)
+        if columns is not None:
+            candles[symbol] = columns
 
-    url = f"{BASE_URL}{path}{query}"
+    results = compute_indicator_columns(candles, features)
+    computed_at = time.time()
+    for columns in results.values():
+        columns.attrs["computed_at"] = computed_at
+    return results
+
+
+def get_orderbook_snapshot(symbol: str, max_level: int = 100) -> Optional[OrderbookSnapshot]:
+    """
+    Authenticated REST order book snapshot with numeric levels and the exchange timestamp
+    (the sequence anchor for WebSocket deltas).
+    Returns: OrderbookSnapshot(bids=[(price, qty), ...], asks=[...], timestamp=ms) or None on failure.
+    """
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = orderly_client.get(f"/v1/orderbook/{symbol}", params={"max_level": min(max_level, 500)},
+                                      endpoint="/v1/orderbook")
         if response.status_code != 200:
-            return {"bids": [], "asks": []}
+            return None
 
-        payload = response.json()
+        payload = response_json(response)
         if not payload.get("success") or "data" not in payload:
-            return {"bids": [], "asks": []}
-
-        data = payload["data"]
-        bids = [[str(b["price"]), str(b["quantity"])] for b in data.get("bids", [])]
-        asks = [[str(a["price"]), str(a["quantity"])] for a in data.get("asks", [])]
-        return {"bids": bids, "asks": asks}
+            return None
+        return OrderbookSnapshot.from_rest(payload["data"])
 
     except Exception:
+        return None
+
+
+def get_orderbook(symbol: str, limit: int = 5) -> Dict[str, List[List[str]]]:
+    """
+    Fetch authenticated order book from Orderly (required for PERP_*_USDC).
+    Returns: {"bids": [["price","qty"], ...], "asks": [["price","qty"], ...]}
+    """
+    snapshot = get_orderbook_snapshot(symbol, limit)
+    if snapshot is None:
         return {"bids": [], "asks": []}
+    return {
+        "bids": [[str(price), str(qty)] for price, qty in snapshot.bids],
+        "asks": [[str(price), str(qty)] for price, qty in snapshot.asks],
+    }
 
 def get_funding_rate_history(symbol: str, limit: int = 1000):
-    rate_limiter()
-    url = f"{BASE_URL}/v1/public/funding_rate_history"
-    r = requests.get(url, params={"symbol": symbol, "limit": limit}, timeout=10)
+    r = orderly_client.get("/v1/public/funding_rate_history", params={"symbol": symbol, "limit": limit}, signed=False)
     r.raise_for_status()
-    payload = r.json()
+    payload = response_json(r)
     data = payload.get("data", [])
     # Some endpoints use {'data': {'rows': [...]}}
     if isinstance(data, dict) and "rows" in data:
-        return data["rows"]
-    return data if isinstance(data, list) else []    
+        data = data["rows"]
+    return [FundingRate.from_history(row) for row in data] if isinstance(data, list) else []
+
+# /v1/public/liquidated_positions is paginated
+LIQUIDATION_PAGE_SIZE = 100
+MAX_LIQUIDATION_PAGES = 20
+
+
+class LiquidationRows(list):
+    """fetch_liquidation_rows result; `truncated` is set when the page cap stopped it before the window was covered."""
+    truncated = False
+
+
+def fetch_liquidation_rows(start_ms: int, end_ms: int, symbol: str = None) -> LiquidationRows:
+    """
+    All liquidations in [start_ms, end_ms] (every symbol unless one is given), following
+    pages. At most MAX_LIQUIDATION_PAGES pages are read: past that the result is
+    marked truncated (and a warning logged) instead of passing for the whole window.
+    """
+    rows = LiquidationRows()
+    for page in range(1, MAX_LIQUIDATION_PAGES + 1):
+        params = {"start_t": start_ms, "end_t": end_ms, "page": page, "size": LIQUIDATION_PAGE_SIZE}
+        if symbol:
+            params["symbol"] = symbol
+        r = orderly_client.get("/v1/public/liquidated_positions", params=params, signed=False)
+        r.raise_for_status()
+        data = response_json(r).get("data")
+        if isinstance(data, dict):
+            # expected shape: {'rows': [...], 'meta': {'total': ..., 'records_per_page': ..., 'current_page': ...}}
+            page_rows = data.get("rows", [])
+            total = (data.get("meta") or {}).get("total")
+        else:
+            page_rows, total = data or [], None
+        rows.extend(Liquidation.from_rest(row) for row in page_rows)
+        if len(page_rows) < LIQUIDATION_PAGE_SIZE or (total is not None and len(rows) >= total):
+            break
+    else:
+        rows.truncated = True
+        logger.warning(f"⚠️ Liquidations {start_ms}-{end_ms} cut at {len(rows)} rows "
+                       f"({MAX_LIQUIDATION_PAGES} pages, total {total if total is not None else 'unknown'})")
+    return rows
+
 
 def get_public_liquidations(symbol: str = None, lookback_hours: int = 24):
     """
     Liquidations in a time window. Many APIs require start_t/end_t in ms.
     """
-    rate_limiter()
     end_ms = int(time.time() * 1000)
     start_ms = end_ms - int(lookback_hours * 3600 * 1000)
-    params = {"start_t": start_ms, "end_t": end_ms}
-    if symbol:
-        params["symbol"] = symbol
-    url = f"{BASE_URL}/v1/public/liquidated_positions"
-    r = requests.get(url, params=params, timeout=10)
-    r.raise_for_status()
-    data = r.json().get("data")
-    if isinstance(data, dict):
-        # expected shape: {'rows': [...], 'meta': {...}}
-        return data.get("rows", [])
-    return data or []
+    return fetch_liquidation_rows(start_ms, end_ms, symbol)
 
 
 # if __name__ == "__main__":
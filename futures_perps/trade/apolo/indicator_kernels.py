@@ -0,0 +1,46 @@
+import numpy as np
+
+
+def parabolic_sar(high, low, af_start: float = 0.02, af_step: float = 0.02, max_af: float = 0.2) -> np.ndarray:
+    """
+    Parabolic SAR over raw high/low arrays (oldest → newest).
+
+    Same recurrence as the original add_indicators loop: the first candle has
+    no value, the acceleration factor grows every candle up to max_af and is
+    reset on each reversal. SAR is path dependent (each value decides the next
+    reversal), so this is a tight scalar loop over plain floats rather than a
+    per-row pandas read/write. That is what made the old version slow.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    n = len(high)
+    if n == 0:
+        return np.empty(0, dtype=np.float64)
+
+    highs = high.tolist()
+    lows = low.tolist()
+    out = [np.nan] * n
+
+    af = af_start
+    ep = highs[0]
+    sar = lows[0]
+    trend = 1
+    for i in range(1, n):
+        sar = sar + af * (ep - sar)
+        if trend == 1:
+            if lows[i] < sar:
+                trend = -1
+                sar = ep
+                ep = lows[i]
+                af = af_start
+        else:
+            if highs[i] > sar:
+                trend = 1
+                sar = ep
+                ep = highs[i]
+                af = af_start
+        if af < max_af:
+            af += af_step
+        out[i] = sar
+
+    return np.array(out, dtype=np.float64)
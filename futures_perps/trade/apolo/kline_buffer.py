@@ -0,0 +1,154 @@
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from logs.log_config import apolo_trader_logger as logger
+from trading_bot.orderly_types import Kline
+
+# Candle length in milliseconds for the Orderly kline types we use
+INTERVAL_MS = {
+    "1m": 60_000,
+    "5m": 5 * 60_000,
+    "15m": 15 * 60_000,
+    "30m": 30 * 60_000,
+    "1h": 60 * 60_000,
+    "4h": 4 * 60 * 60_000,
+    "12h": 12 * 60 * 60_000,
+    "1d": 24 * 60 * 60_000,
+    "1w": 7 * 24 * 60 * 60_000,
+}
+
+# Orderly /v1/kline returns at most 1000 rows
+MAX_KLINE_LIMIT = 1000
+
+
+class KlineBuffer:
+    """
+    In-memory ring buffer of Kline records per (symbol, interval).
+
+    The first request for a key downloads the full window. Later requests only
+    download the candles that opened since the last stored start_timestamp
+    (plus one row of overlap, because the newest stored candle may still have
+    been forming). If the delta does not overlap the stored data, or the merged
+    series has a hole, the window is backfilled with a full download.
+
+    fetch_rows(symbol, interval, limit) must return Kline records (in any
+    order, duplicates allowed) or None on failure.
+    """
+
+    def __init__(self, fetch_rows: Callable[[str, str, int], Optional[List[Kline]]], capacity: int = MAX_KLINE_LIMIT):
+        self._fetch_rows = fetch_rows
+        self.capacity = capacity
+        self._series: Dict[tuple, deque] = {}
+        self._locks: Dict[tuple, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.stats = {"full_fetches": 0, "delta_fetches": 0, "gap_backfills": 0, "rows_fetched": 0}
+
+    def _lock_for(self, key: tuple) -> threading.Lock:
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def get_rows(self, symbol: str, interval: str, limit: int) -> Optional[List[Kline]]:
+        """Return the newest `limit` rows (oldest → newest), fetching only what changed."""
+        key = (symbol, interval)
+        step = INTERVAL_MS.get(interval)
+        with self._lock_for(key):
+            series = self._series.get(key)
+
+            if step is None or series is None or len(series) < limit:
+                # Unknown interval, cold start, or a caller wants more history than we hold
+                return self._full_fetch(key, limit)
+
+            last_ts = int(series[-1]["start_timestamp"])
+            now_ms = int(time.time() * 1000)
+            missing = max(0, (now_ms - last_ts) // step)
+            if missing + 1 >= limit:
+                # Everything we hold is older than the window: just refetch it
+                return self._full_fetch(key, limit)
+
+            rows = self._fetch_rows(symbol, interval, int(missing) + 2)
+            if rows is None:
+                return None
+            self.stats["delta_fetches"] += 1
+            self.stats["rows_fetched"] += len(rows)
+
+            rows = sorted(rows, key=lambda r: int(r["start_timestamp"]))
+            if not rows or int(rows[0]["start_timestamp"]) > last_ts:
+                # No overlap with what we have → candles were skipped in between
+                logger.warning(f"⚠️ Kline gap detected for {symbol} {interval}, backfilling window")
+                self.stats["gap_backfills"] += 1
+                return self._full_fetch(key, limit)
+
+            # Drop the stored rows the delta supersedes (at least the possibly-forming last one)
+            while series and int(series[-1]["start_timestamp"]) >= int(rows[0]["start_timestamp"]):
+                series.pop()
+
+            # Only the seam and the new rows are checked: holes the exchange itself
+            # returns in a full download are accepted as-is
+            seam = ([series[-1]] if series else []) + rows
+            if not self._is_contiguous(seam, step):
+                logger.warning(f"⚠️ Kline series for {symbol} {interval} not contiguous, backfilling window")
+                self.stats["gap_backfills"] += 1
+                return self._full_fetch(key, limit)
+
+            series.extend(rows)
+            return list(series)[-limit:]
+
+    def _full_fetch(self, key: tuple, limit: int) -> Optional[List[Kline]]:
+        symbol, interval = key
+        rows = self._fetch_rows(symbol, interval, limit)
+        if rows is None:
+            return None
+        self.stats["full_fetches"] += 1
+        self.stats["rows_fetched"] += len(rows)
+
+        # De-duplicate by start_timestamp (first occurrence wins) and sort oldest → newest
+        unique = {}
+        for row in rows:
+            unique.setdefault(int(row["start_timestamp"]), row)
+        ordered = [unique[ts] for ts in sorted(unique)]
+
+        self._series[key] = deque(ordered, maxlen=max(self.capacity, limit))
+        return ordered[-limit:]
+
+    @staticmethod
+    def _is_contiguous(rows: List[Kline], step: int) -> bool:
+        return all(
+            int(b["start_timestamp"]) - int(a["start_timestamp"]) == step
+            for a, b in zip(rows, rows[1:])
+        )
+
+    def append_closed(self, symbol: str, interval: str, row: Kline) -> bool:
+        """
+        Store a finished candle pushed by the kline stream. Only applied when it
+        continues (or replaces the newest row of) an existing series; otherwise
+        the next get_rows() fills the window from REST. Returns True if stored.
+        """
+        key = (symbol, interval)
+        step = INTERVAL_MS.get(interval)
+        with self._lock_for(key):
+            series = self._series.get(key)
+            if step is None or not series:
+                return False
+            start = int(row["start_timestamp"])
+            last = int(series[-1]["start_timestamp"])
+            if start == last:
+                series[-1] = row
+            elif start == last + step:
+                series.append(row)
+            else:
+                return False
+            return True
+
+    def invalidate(self, symbol: str = None, interval: str = None):
+        """Forget stored candles (all, one symbol, or one (symbol, interval))."""
+        with self._locks_guard:
+            keys = [key for key in self._series
+                    if (symbol is None or key[0] == symbol) and (interval is None or key[1] == interval)]
+        # Under each series lock, so a get_rows() in flight cannot store the old series back afterwards
+        for key in keys:
+            with self._lock_for(key):
+                self._series.pop(key, None)
@@ -0,0 +1,92 @@
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from trading_bot.orderly_types import Kline
+
+# Candle columns kept as arrays, in the order of the frames built from them
+CANDLE_COLUMNS = ("open", "high", "low", "close", "volume")
+
+
+class KlineColumns:
+    """
+    Candle window as contiguous column arrays, oldest → newest: start_time
+    (int64 ms) plus float64 open/high/low/close/volume, and optionally
+    indicator columns from the batch indicator pass.
+
+    Column access works like a frame (`candles["close"]`, `"rsi_14" in candles`)
+    but returns NumPy arrays, so rule checks read the arrays directly. A
+    DataFrame is only built when a caller asks for one with to_frame().
+    """
+    __slots__ = ("start_time", "open", "high", "low", "close", "volume", "indicators", "attrs")
+
+    def __init__(self, start_time: np.ndarray, open: np.ndarray, high: np.ndarray, low: np.ndarray,
+                 close: np.ndarray, volume: np.ndarray, indicators: Optional[Dict[str, np.ndarray]] = None,
+                 attrs: Optional[dict] = None):
+        self.start_time = start_time
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.indicators = indicators or {}
+        self.attrs = attrs if attrs is not None else {}
+
+    def __len__(self):
+        return len(self.start_time)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        if column in CANDLE_COLUMNS or column == "start_time":
+            return getattr(self, column)
+        return self.indicators[column]
+
+    def __contains__(self, column: str) -> bool:
+        return column in CANDLE_COLUMNS or column == "start_time" or column in self.indicators
+
+    @property
+    def columns(self) -> tuple:
+        return ("start_time", "start_timestamp") + CANDLE_COLUMNS + tuple(self.indicators)
+
+    def slice(self, start: int, indicators: Optional[Dict[str, np.ndarray]] = None) -> "KlineColumns":
+        """Rows from `start` on (views, no copy), optionally with a new set of indicator columns."""
+        indicators = self.indicators if indicators is None else indicators
+        return KlineColumns(self.start_time[start:], self.open[start:], self.high[start:], self.low[start:],
+                            self.close[start:], self.volume[start:],
+                            {name: values[start:] for name, values in indicators.items()}, dict(self.attrs))
+
+    def to_frame(self) -> pd.DataFrame:
+        """Same frame get_kline_frame_apolo / the indicator functions produce (RangeIndex, UTC start_timestamp)."""
+        data = {
+            "start_time": self.start_time,
+            "start_timestamp": pd.to_datetime(self.start_time, unit="ms", utc=True),
+        }
+        for column in CANDLE_COLUMNS:
+            data[column] = getattr(self, column)
+        data.update(self.indicators)
+        frame = pd.DataFrame(data)
+        frame.attrs.update(self.attrs)
+        return frame
+
+
+def columns_from_klines(rows: Sequence[Kline]) -> KlineColumns:
+    """
+    Decode Kline records into one preallocated (6 × n) float64 block, one contiguous
+    row per column, then sort by start_time and drop duplicate candles (first wins)
+    with array ops. Rows that already arrive sorted and unique skip the reorder.
+    """
+    n = len(rows)
+    values = np.empty((1 + len(CANDLE_COLUMNS), n), dtype=np.float64)
+    if n:
+        values.T[:] = [(r.start_timestamp, r.open, r.high, r.low, r.close, r.volume) for r in rows]
+    start_time = values[0].astype(np.int64)
+
+    if n > 1 and not np.all(start_time[1:] > start_time[:-1]):
+        order = np.argsort(start_time, kind="stable")
+        ordered = start_time[order]
+        keep = np.ones(n, dtype=bool)
+        keep[1:] = ordered[1:] != ordered[:-1]
+        order = order[keep]
+        values, start_time = values.take(order, axis=1), start_time[order]
+
+    return KlineColumns(start_time, *values[1:])
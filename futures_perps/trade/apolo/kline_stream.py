@@ -0,0 +1,198 @@
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Set
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from logs.log_config import apolo_trader_logger as logger
+from futures_perps.trade.apolo.kline_buffer import INTERVAL_MS, KlineBuffer
+from futures_perps.trade.apolo.kline_columns import KlineColumns
+from futures_perps.trade.apolo.historical_data import kline_buffer, _get_strategy_features
+from futures_perps.trade.apolo.streaming_indicators import engines_for, get_indicator_engine
+from trading_bot.market_data_hub import MarketDataHub, get_market_data_hub
+from trading_bot.futures_executor_apolo import ORDERLY_ACCOUNT_ID
+from trading_bot.orderly_types import Kline
+
+# Threads that store closed candles: the buffer lock can be held during a REST fetch,
+# so that never happens on the hub's event loop
+CLOSE_WORKERS = 4
+# Candles fed to a cold indicator engine before its first window (long EMAs settle)
+WARM_UP_CANDLES = 300
+
+
+class CandleClose(NamedTuple):
+    symbol: str
+    interval: str
+    candle: Kline      # finished bar (start_timestamp, open, ..., volume)
+    latency: float     # seconds from the candle's end_timestamp to the event
+
+
+class KlineStream:
+    """
+    Follows `{symbol}@kline_{interval}` topics on the market data hub.
+
+    The forming candle of each (symbol, interval) is kept in memory. When a
+    message for a newer candle arrives, the previous one is final: a worker
+    thread pushes it into the kline buffer, then threads blocked in
+    wait_for_close() wake up (the autotrade scheduler starts its cycle on that
+    signal, with the candle already stored).
+
+    The same worker advances the indicator engines of that (symbol, interval)
+    by one candle, so indicator_columns() only previews the forming candle
+    instead of recomputing the whole window each cycle.
+    """
+
+    def __init__(self, hub: MarketDataHub, buffer: KlineBuffer = kline_buffer):
+        self.hub = hub
+        self.buffer = buffer
+        self._forming: Dict[tuple, Kline] = {}
+        self._subscribed: Set[tuple] = set()
+        self._last_close: Dict[tuple, CandleClose] = {}
+        self._cond = threading.Condition()
+        self._stats = {"messages": 0, "closes": 0}
+        self._workers = ThreadPoolExecutor(max_workers=CLOSE_WORKERS, thread_name_prefix="kline-close")
+
+    def subscribe(self, symbol: str, interval: str):
+        """Follow klines for (symbol, interval); repeated calls are no-ops."""
+        key = (symbol, interval)
+        with self._cond:
+            if key in self._subscribed:
+                return
+            self._subscribed.add(key)
+        self.hub.add_handler(f"{symbol}@kline_{interval}", self._on_message)
+
+    def _on_message(self, msg: dict):
+        data = msg["data"]
+        symbol, interval = msg["topic"].split("@kline_", 1)
+        key = (symbol, interval)
+        row = Kline.from_ws(data)
+
+        with self._cond:
+            self._stats["messages"] += 1
+            forming = self._forming.get(key)
+            if forming is not None and row.start_timestamp < forming.start_timestamp:
+                return  # late message for an already-closed candle
+            self._forming[key] = row
+            if forming is None or row.start_timestamp == forming.start_timestamp:
+                return
+        self._workers.submit(self._close_candle, symbol, interval, forming)
+
+    def _close_candle(self, symbol: str, interval: str, candle: Kline) -> CandleClose:
+        try:
+            self.buffer.append_closed(symbol, interval, candle)
+        except Exception as e:
+            logger.error(f"❌ Could not store closed candle for {symbol} {interval}: {e}")
+        for engine in engines_for(symbol, interval):
+            with engine.lock:
+                # Out-of-order or gapped closes are left to the catch-up in indicator_columns()
+                if engine.last_ts is not None and candle.start_timestamp == engine.last_ts + INTERVAL_MS[interval]:
+                    engine.update(candle)
+        event = CandleClose(symbol, interval, candle, time.time() - candle.end_timestamp / 1000)
+        with self._cond:
+            last = self._last_close.get((symbol, interval))
+            if last is None or last.candle.start_timestamp < candle.start_timestamp:
+                self._last_close[(symbol, interval)] = event
+            self._stats["closes"] += 1
+            self._cond.notify_all()
+        return event
+
+    def indicator_columns(self, symbol: str, interval: str, limit: int, features: List[str]) -> Optional[KlineColumns]:
+        """
+        Newest `limit` candles with their indicators from the incremental engine:
+        closed candles the stream did not deliver are fed from the kline buffer
+        first, and the forming candle is previewed without changing the engine.
+        None when the klines could not be loaded or the window is still warming up.
+        """
+        engine = get_indicator_engine(symbol, interval, features)
+        with engine.lock:
+            rows = self.buffer.get_rows(symbol, interval, limit if engine.last_ts is not None else max(limit, WARM_UP_CANDLES))
+            if not rows:
+                return None
+            rows, forming = _split_forming(rows, interval)
+
+            pending = [row for row in rows if engine.last_ts is None or row.start_timestamp > engine.last_ts]
+            if engine.last_ts is not None and pending and pending[0].start_timestamp != engine.last_ts + INTERVAL_MS[interval]:
+                # Candles missing between the engine and the window: start over from a full history
+                logger.warning(f"⚠️ Indicator engine for {symbol} {interval} fell behind, warming up again")
+                engine.reset()
+                rows, forming = _split_forming(self.buffer.get_rows(symbol, interval, max(limit, WARM_UP_CANDLES)) or [], interval)
+                pending = rows
+            engine.warm_up(pending)
+
+            columns = engine.window(limit, forming)
+        if columns is not None:
+            columns.attrs["computed_at"] = time.time()
+        return columns
+
+    def last_close(self, symbol: str, interval: str) -> Optional[CandleClose]:
+        with self._cond:
+            return self._last_close.get((symbol, interval))
+
+    def wait_for_close(self, symbol: str, interval: str, after_ts: int, timeout: float) -> Optional[CandleClose]:
+        """Block until a candle starting after `after_ts` (ms) closes, or timeout → None."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                event = self._last_close.get((symbol, interval))
+                if event is not None and event.candle.start_timestamp > after_ts:
+                    return event
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {**self._stats, "streams": len(self._subscribed)}
+
+
+def _split_forming(rows: List[Kline], interval: str):
+    """(closed rows, forming candle or None): REST windows end with the candle still in progress."""
+    if rows and rows[-1].start_timestamp + INTERVAL_MS[interval] > time.time() * 1000:
+        return rows[:-1], rows[-1]
+    return rows, None
+
+
+_stream: Optional[KlineStream] = None
+_stream_lock = threading.Lock()
+
+
+def get_kline_stream() -> KlineStream:
+    global _stream
+    with _stream_lock:
+        if _stream is None:
+            _stream = KlineStream(get_market_data_hub(ORDERLY_ACCOUNT_ID))
+        return _stream
+
+
+def subscribe_klines(symbols, interval: str) -> KlineStream:
+    """Stream klines for every symbol (closed candles go straight into the kline buffer)."""
+    stream = get_kline_stream()
+    for symbol in symbols:
+        try:
+            stream.subscribe(symbol, interval)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not start kline stream for {symbol} {interval}: {e}")
+    return stream
+
+
+def streamed_indicator_columns(symbols, interval: str, limit: int, strategy: str) -> Dict[str, KlineColumns]:
+    """
+    get_historical_data_batch_apolo from the incremental engines of the kline
+    stream; symbols whose window could not be built are missing from the result.
+    """
+    stream = get_kline_stream()
+    features = _get_strategy_features(interval, strategy)
+    results = {}
+    for symbol in symbols:
+        try:
+            columns = stream.indicator_columns(symbol, interval, limit, features)
+        except Exception as e:
+            logger.warning(f"⚠️ Streamed indicators failed for {symbol} {interval}: {e}")
+            continue
+        if columns is not None:
+            results[symbol] = columns
+    return results
@@ -0,0 +1,185 @@
+import os
+import sys
+import math
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import deque
+from typing import Callable, Dict, List, Optional
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from futures_perps.trade.apolo.historical_data import fetch_liquidation_rows
+from trading_bot.orderly_types import Liquidation
+
+LIQUIDATION_WINDOW_HOURS = 24
+# Minimum seconds between two incremental pulls (signals analyzed together share one)
+REFRESH_INTERVAL = 30
+
+
+class _SymbolLiquidations:
+    """Liquidations of one symbol: time-ordered for eviction, price-sorted for range queries."""
+    __slots__ = ("by_time", "prices", "notionals")
+
+    def __init__(self):
+        self.by_time = deque()        # (timestamp_ms, mark_price, notional), oldest first
+        self.prices: List[float] = []     # sorted mark prices
+        self.notionals: List[float] = []  # notional of prices[i]
+
+    def add(self, ts: int, price: float, notional: float):
+        self.by_time.append((ts, price, notional))
+        i = bisect_right(self.prices, price)
+        self.prices.insert(i, price)
+        self.notionals.insert(i, notional)
+
+    def evict_before(self, cutoff_ms: int) -> int:
+        evicted = 0
+        while self.by_time and self.by_time[0][0] < cutoff_ms:
+            _, price, notional = self.by_time.popleft()
+            i = bisect_left(self.prices, price)
+            # Same price may appear several times; drop the entry with this notional
+            while self.notionals[i] != notional:
+                i += 1
+            del self.prices[i]
+            del self.notionals[i]
+            evicted += 1
+        return evicted
+
+
+class LiquidationStore:
+    """
+    Rolling window of public liquidations for every symbol.
+
+    The first refresh downloads the whole window from the all-symbol feed;
+    later refreshes only ask for rows since the newest timestamp seen
+    (rows are de-duplicated by liquidation_id, or by content when it is
+    missing) and rows older than the window are evicted. Per symbol, mark
+    prices are kept in a sorted list so range counts are two binary searches.
+
+    A fetch cut by the page cap leaves a hole that is never filled, so the
+    store reports itself `partial` until that fetch has left the window.
+    """
+
+    def __init__(self, fetch_rows: Callable[[int, int], List[Liquidation]] = fetch_liquidation_rows,
+                 window_hours: float = LIQUIDATION_WINDOW_HOURS, refresh_interval: float = REFRESH_INTERVAL):
+        self.fetch_rows = fetch_rows
+        self.window_ms = int(window_hours * 3600 * 1000)
+        self.refresh_interval = refresh_interval
+        self._symbols: Dict[str, _SymbolLiquidations] = {}
+        self._seen = {}               # liquidation_id -> timestamp_ms (evicted with the window)
+        self._last_ts: Optional[int] = None
+        self._last_refresh = 0.0
+        self._partial_until = 0       # ms: rows are missing from the window until then
+        self._lock = threading.Lock()
+        self.stats = {"full_fetches": 0, "incremental_fetches": 0, "truncated_fetches": 0, "rows": 0, "evicted": 0}
+
+    def refresh(self, force: bool = False) -> "LiquidationStore":
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_refresh and now - self._last_refresh < self.refresh_interval:
+                return self
+            end_ms = int(time.time() * 1000)
+            cutoff = end_ms - self.window_ms
+            start_ms = cutoff if self._last_ts is None else max(cutoff, self._last_ts)
+
+            rows = self.fetch_rows(start_ms, end_ms)
+            self.stats["incremental_fetches" if self._last_ts is not None else "full_fetches"] += 1
+            self._last_refresh = now
+            if getattr(rows, "truncated", False):
+                self.stats["truncated_fetches"] += 1
+                self._partial_until = end_ms + self.window_ms
+            # Oldest first, so each symbol's time-ordered deque stays ordered for eviction
+            for row in sorted(rows, key=lambda r: r.timestamp):
+                self._add_row(row)
+            self._evict(cutoff)
+            return self
+
+    def _add_row(self, row: Liquidation):
+        ts = row.timestamp
+        positions = [pos for pos in row.positions_by_perp
+                     if math.isfinite(pos.mark_price) and math.isfinite(pos.notional)]
+        # Rows without an id are keyed by content: incremental pulls re-read the newest timestamp
+        key = row.liquidation_id
+        if key is None:
+            key = (ts, row.type, tuple((pos.symbol, pos.mark_price, pos.notional) for pos in positions))
+        if key in self._seen:
+            return
+        self._seen[key] = ts
+        self._last_ts = ts if self._last_ts is None else max(self._last_ts, ts)
+        self.stats["rows"] += 1
+
+        for pos in positions:
+            mark, notional = pos.mark_price, pos.notional
+            if pos.symbol not in self._symbols:
+                self._symbols[pos.symbol] = _SymbolLiquidations()
+            self._symbols[pos.symbol].add(ts, mark, notional)
+
+    def _evict(self, cutoff_ms: int):
+        for liquidations in self._symbols.values():
+            self.stats["evicted"] += liquidations.evict_before(cutoff_ms)
+        for key in [k for k, ts in self._seen.items() if ts < cutoff_ms]:
+            del self._seen[key]
+
+    @property
+    def partial(self) -> bool:
+        """True while counts may miss liquidations of a truncated fetch."""
+        return time.time() * 1000 < self._partial_until
+
+    def count_near(self, symbol: str, price: float, pct: float = 2.0) -> int:
+        """Number of liquidations of symbol with |mark - price| <= price * pct%."""
+        with self._lock:
+            liquidations = self._symbols.get(symbol)
+            if liquidations is None:
+                return 0
+            price_range = price * pct / 100
+            lo = bisect_left(liquidations.prices, price - price_range)
+            hi = bisect_right(liquidations.prices, price + price_range)
+            return hi - lo
+
+    def heatmap(self, symbol: str, price: float, pct: float = 5.0, buckets: int = 10) -> List[dict]:
+        """
+        Liquidations of symbol within ±pct% of price in `buckets` equal price bands:
+        [{"low", "high", "count", "notional"}, ...] from the lowest band up.
+        """
+        with self._lock:
+            liquidations = self._symbols.get(symbol)
+            low_edge = price * (1 - pct / 100)
+            width = (price * (1 + pct / 100) - low_edge) / buckets
+            bands = []
+            for b in range(buckets):
+                low, high = low_edge + b * width, low_edge + (b + 1) * width
+                count, notional = 0, 0.0
+                if liquidations is not None:
+                    lo = bisect_left(liquidations.prices, low)
+                    # Last band includes its upper edge
+                    hi = (bisect_right if b == buckets - 1 else bisect_left)(liquidations.prices, high)
+                    count = hi - lo
+                    notional = sum(liquidations.notionals[lo:hi])
+                bands.append({"low": low, "high": high, "count": count, "notional": notional})
+            return bands
+
+
+def format_liquidation_heatmap(bands: List[dict]) -> str:
+    """Prompt text for non-empty heatmap bands (empty string when there are none)."""
+    lines = [
+        f"{band['low']:.6f}-{band['high']:.6f}: {band['count']} liq, {band['notional']:.0f} USDC"
+        for band in bands if band["count"]
+    ]
+    return "\n".join(lines)
+
+
+_store: Optional[LiquidationStore] = None
+_store_lock = threading.Lock()
+
+
+def get_liquidation_store() -> LiquidationStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = LiquidationStore()
+        return _store
+
+
+def refresh_liquidation_store() -> LiquidationStore:
+    """Shared store, pulled up to date (at most once per REFRESH_INTERVAL)."""
+    return get_liquidation_store().refresh()
@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import time
+import threading
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from logs.log_config import apolo_trader_logger as logger
+
+DEFAULT_BATCH_SIZE = 8
+# Seconds the first asset of a batch waits for others to reach the LLM step
+DEFAULT_BATCH_WINDOW = 2.0
+BATCH_TIMEOUT = 60
+# Output tokens per asset in a batched answer (single calls use 1000), capped by the model limit
+BATCH_TOKENS_PER_ASSET = 700
+BATCH_MAX_TOKENS = 8000
+VALID_SIDES = ("BUY", "SELL", "NONE")
+
+
+class BatchRequest(NamedTuple):
+    asset: str
+    model: str
+    header: str   # sections shared by every asset (user prompt, rules); only identical headers share a call
+    body: str     # asset-specific sections (market, structure, candles)
+    footer: str   # answer instructions for the JSON array
+
+
+def parse_batch_decisions(content: str, assets: Iterable[str], required: Iterable[str]) -> Dict[str, dict]:
+    """
+    Per-asset decisions from a JSON array answer. Each entry is validated on its
+    own: it must name one of `assets` (first entry wins), carry every `required`
+    field and a known side. Entries that fail are left out so the caller can
+    re-ask for those assets alone. Raises ValueError if there is no array at all.
+    """
+    start, end = content.find("["), content.rfind("]") + 1
+    entries = json.loads(content[start:end] if start != -1 and end > start else content.strip())
+    if not isinstance(entries, list):
+        raise ValueError(f"Expected a JSON array, got {type(entries).__name__}")
+
+    assets, required = set(assets), tuple(required)
+    decisions = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        asset = entry.get("asset")
+        if asset not in assets or asset in decisions:
+            continue
+        if any(field not in entry for field in required) or entry.get("side") not in VALID_SIDES:
+            logger.warning(f"⚠️ Invalid batched decision for {asset}: {str(entry)[:200]}")
+            continue
+        decisions[asset] = entry
+    return decisions
+
+
+class _Batch:
+    def __init__(self):
+        self.requests: List[BatchRequest] = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results: Dict[str, dict] = {}
+
+
+class LLMBatcher:
+    """
+    Packs the LLM calls of assets analyzed at the same time into one request.
+
+    Each asset thread calls submit() at its LLM step and blocks. The first one
+    opens a batch and waits up to `window` seconds (or until `max_batch` assets
+    joined), then sends the shared header once, every asset block, and asks for
+    a JSON array with one decision per asset. submit() returns the decision in
+    the single-call shape ({"content", "llm_result", "model"}), or None when the
+    caller should make its own single call instead: alone in its batch, entry
+    missing or invalid, unparseable answer, or service error.
+    """
+
+    def __init__(self, complete: Callable[[str, int, int], Tuple[Optional[str], Optional[str], Optional[str]]],
+                 required: Iterable[str], max_batch: int = DEFAULT_BATCH_SIZE, window: float = DEFAULT_BATCH_WINDOW):
+        self.complete = complete  # (prompt, timeout_sec, max_tokens) -> (content, model answering, error)
+        self.required = tuple(required)
+        self.max_batch = max(1, max_batch)
+        self.window = window
+        self._lock = threading.Lock()
+        self._open: Dict[tuple, _Batch] = {}
+        self.stats = {"batches": 0, "batched_assets": 0, "fallbacks": 0, "calls_saved": 0}
+
+    def submit(self, request: BatchRequest) -> Optional[dict]:
+        group = (request.model, request.header, request.footer)
+        with self._lock:
+            batch = self._open.get(group)
+            leader = batch is None
+            if leader:
+                batch = self._open[group] = _Batch()
+            batch.requests.append(request)
+            if len(batch.requests) >= self.max_batch:
+                del self._open[group]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open.get(group) is batch:
+                    del self._open[group]
+            try:
+                self._flush(batch)
+            finally:
+                batch.done.set()
+        elif not batch.done.wait(self.window + BATCH_TIMEOUT + 5):
+            logger.warning(f"⚠️ Batched LLM call for {request.asset} did not finish, asking alone")
+
+        decision = batch.results.get(request.asset)
+        if decision is None and len(batch.requests) > 1:
+            with self._lock:
+                self.stats["fallbacks"] += 1
+        return decision
+
+    def _flush(self, batch: _Batch):
+        requests = batch.requests
+        if len(requests) < 2:
+            return  # nothing to share, the caller makes its usual single call
+        assets = [r.asset for r in requests]
+        first = requests[0]
+        blocks = [f"=== ACTIVO {i}: {r.asset} ===\n{r.body}" for i, r in enumerate(requests, 1)]
+        prompt = "\n\n".join(part for part in (first.header, *blocks, first.footer) if part)
+        max_tokens = min(BATCH_MAX_TOKENS, BATCH_TOKENS_PER_ASSET * len(requests))
+
+        started = time.monotonic()
+        content, model, error = self.complete(prompt, BATCH_TIMEOUT, max_tokens)
+        if content is None:
+            logger.warning(f"✗ Batched LLM call for {assets} failed, falling back to single calls: {error}")
+            return
+        try:
+            decisions = parse_batch_decisions(content, assets, self.required)
+        except ValueError as e:
+            logger.error(f"Batched LLM answer unparseable for {assets}, falling back to single calls: {e}")
+            return
+
+        for asset, entry in decisions.items():
+            batch.results[asset] = {
+                "content": json.dumps(entry, ensure_ascii=False),
+                "llm_result": entry,
+                "model": model,
+            }
+        with self._lock:
+            self.stats["batches"] += 1
+            self.stats["batched_assets"] += len(decisions)
+            self.stats["calls_saved"] += max(0, len(decisions) - 1)
+        logger.info(f"📦 Batched LLM call for {len(requests)} assets in {time.monotonic() - started:.1f}s: "
+                    f"{len(decisions)} valid decisions, "
+                    f"{len(requests) - len(decisions)} re-asked alone. {self.summary()}")
+
+    def summary(self) -> str:
+        with self._lock:
+            return (f"LLM calls saved by batching: {self.stats['calls_saved']} "
+                    f"({self.stats['batches']} batches, {self.stats['fallbacks']} single fallbacks)")
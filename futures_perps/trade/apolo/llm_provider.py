@@ -0,0 +1,268 @@
+import os
+import sys
+import time
+import queue
+import threading
+from collections import deque
+from urllib.parse import urlparse
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import requests
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from db.db_ops import get_setting
+from logs.log_config import apolo_trader_logger as logger
+from trading_bot.orderly_types import loads
+from futures_perps.trade.apolo.llm_stream import IncrementalJSONObject, stream_chat_completion
+
+DEFAULT_CHAT_URL = "https://api.deepseek.com/v1/chat/completions"
+# Environment variable with the key sent to DEFAULT_CHAT_URL and llm_base_url (and only there)
+DEFAULT_KEY_ENV = "DEEP_SEEK_API_KEY"
+DEFAULT_LLM_TIMEOUT = 30
+# Until an endpoint has this many answers its hedge delay is DEFAULT_HEDGE_DELAY
+MIN_LATENCY_SAMPLES = 5
+LATENCY_WINDOW = 50
+DEFAULT_HEDGE_DELAY = 10.0
+
+
+class LLMEndpoint(NamedTuple):
+    model: str
+    url: str
+    key_env: str = ""  # environment variable holding this endpoint's API key; "" sends no Authorization
+
+
+def _api_key_header(endpoint: LLMEndpoint) -> dict:
+    key = os.getenv(endpoint.key_env) if endpoint.key_env else None
+    return {"Authorization": f"Bearer {key}"} if key else {}
+
+
+class LLMAnswer(NamedTuple):
+    content: str
+    result: Optional[dict]   # decision object with every required field, None if not found
+    model: str
+    latency: float
+    cut_off: bool
+
+
+def parse_endpoints(entries: Iterable[str], default_url: str) -> List[LLMEndpoint]:
+    """
+    "model", "model@url" or "model@url#ENV_VAR" entries, in order, without
+    duplicates. ENV_VAR names the variable with that endpoint's API key; without
+    it only default_url and DEFAULT_CHAT_URL get DEFAULT_KEY_ENV, any other host
+    is called without a key (never with the DeepSeek one).
+    """
+    endpoints = []
+    for entry in entries:
+        entry = entry.strip()
+        if not entry:
+            continue
+        model, _, url = entry.partition("@")
+        url, _, key_env = url.partition("#")
+        url = url.strip() or default_url
+        key_env = key_env.strip() or (DEFAULT_KEY_ENV if url in (default_url, DEFAULT_CHAT_URL) else "")
+        endpoint = LLMEndpoint(model.strip(), url, key_env)
+        if endpoint not in endpoints:
+            endpoints.append(endpoint)
+    return endpoints
+
+
+def configured_endpoints() -> List[LLMEndpoint]:
+    """llm_model first, then the comma-separated llm_fallback_models; llm_base_url is the default endpoint."""
+    default_url = get_setting("llm_base_url") or DEFAULT_CHAT_URL
+    fallbacks = (get_setting("llm_fallback_models") or "").split(",")
+    return parse_endpoints([get_setting("llm_model") or "deepseek-chat", *fallbacks], default_url)
+
+
+class LatencyTracker:
+    """
+    Recent latencies of one endpoint (seconds) and its failure count. Attempts
+    that failed, lost the hedge or were cancelled add the time they had run,
+    a lower bound of their latency, so a slow endpoint cannot keep a low p90
+    just by never winning.
+    """
+
+    def __init__(self):
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+        self.failures = 0
+        self.wins = 0
+
+    def p90(self) -> Optional[float]:
+        if len(self.samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return float(np.percentile(self.samples, 90))
+
+    def hedge_delay(self) -> float:
+        p90 = self.p90()
+        return DEFAULT_HEDGE_DELAY if p90 is None else p90
+
+
+def _read_completion(response, cancel: threading.Event) -> Optional[str]:
+    """Body of a non-streamed completion, read in chunks so a cancelled request stops early."""
+    chunks = []
+    for chunk in response.iter_content(chunk_size=16384):
+        if cancel.is_set():
+            return None
+        chunks.append(chunk)
+    return loads(b"".join(chunks))['choices'][0]['message']['content']
+
+
+class LLMProvider:
+    """
+    Chat completions over an ordered list of OpenAI-compatible endpoints.
+
+    The first endpoint is asked; if it has not answered after its own p90
+    latency, the next one is fired as a hedge, and one that fails hands over to
+    the next right away. The first valid answer wins and the requests still in
+    flight are cancelled: streams and bodies stop being read and the connection
+    is closed (a request still waiting for response headers finishes in its
+    thread and is ignored). With hedging off the list is only used for failover.
+    Latencies are tracked per endpoint and call kind, so a batched call (many
+    assets, long answer) is not hedged at the p90 of single decisions.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.trackers: Dict[Tuple[LLMEndpoint, str], LatencyTracker] = {}
+        self.stats = {"requests": 0, "hedges": 0, "failovers": 0, "failed": 0}
+
+    def tracker(self, endpoint: LLMEndpoint, kind: str = "single") -> LatencyTracker:
+        with self._lock:
+            return self.trackers.setdefault((endpoint, kind), LatencyTracker())
+
+    def complete(self, prompt: str, max_tokens: int = 1000, timeout: Optional[float] = None,
+                 required: Iterable[str] = (), stream: bool = False,
+                 endpoints: Optional[List[LLMEndpoint]] = None,
+                 kind: str = "single") -> Tuple[Optional[LLMAnswer], Optional[str]]:
+        """
+        Returns (answer, None) or (None, last error). An answer is valid when it
+        carries a JSON object with every `required` field (any content if none);
+        if no endpoint gives a valid one, the last content received is returned
+        with result=None so the caller can still read it. `kind` selects the
+        latency history the hedge delay is taken from ("single", "batch").
+        """
+        endpoints = endpoints or configured_endpoints()
+        timeout = float(timeout or get_setting("llm_timeout") or DEFAULT_LLM_TIMEOUT)
+        hedging = (get_setting("llm_hedge") or "True") == "True"
+        required = tuple(required)
+        deadline = time.monotonic() + timeout
+        cancel = threading.Event()
+        answers = queue.Queue()
+        launched: List[Tuple[LLMEndpoint, float]] = []
+        elapsed: Dict[LLMEndpoint, float] = {}  # latency samples of the attempts that already finished
+        running, last_error, fallback = 0, None, None
+
+        def launch(reason: str):
+            endpoint = endpoints[len(launched)]
+            launched.append((endpoint, time.monotonic()))
+            if reason != "primary":
+                with self._lock:
+                    self.stats["hedges" if reason == "hedge" else "failovers"] += 1
+            logger.info(f"Trying LLM model: {endpoint.model} at {endpoint.url} ({reason}, "
+                        f"{deadline - time.monotonic():.0f}s left, stream={stream})")
+            threading.Thread(target=self._attempt, name=f"llm-{endpoint.model}", daemon=True,
+                             args=(endpoint, prompt, max_tokens, deadline, required, stream, cancel, answers)).start()
+
+        with self._lock:
+            self.stats["requests"] += 1
+        launch("primary")
+        running = 1
+        try:
+            while running:
+                now = time.monotonic()
+                if now >= deadline:
+                    last_error = f"no answer within {timeout:.0f}s"
+                    break
+                wait_for = deadline - now
+                can_hedge = hedging and len(launched) < len(endpoints)
+                if can_hedge:
+                    newest, started = launched[-1]
+                    wait_for = min(wait_for, started + self.tracker(newest, kind).hedge_delay() - now)
+                try:
+                    endpoint, answer, error = answers.get(timeout=max(0.0, wait_for))
+                except queue.Empty:
+                    if can_hedge and time.monotonic() < deadline:
+                        launch("hedge")
+                        running += 1
+                    continue
+
+                running -= 1
+                tracker = self.tracker(endpoint, kind)
+                elapsed[endpoint] = answer.latency if answer is not None else time.monotonic() - dict(launched)[endpoint]
+                if answer is not None and (answer.result is not None or not required):
+                    with self._lock:
+                        tracker.wins += 1
+                    logger.info(f"✓ LLM model {endpoint.model} answered in {answer.latency:.1f}s"
+                                f"{' (cut off after the decision)' if answer.cut_off else ''}")
+                    return answer, None
+
+                with self._lock:
+                    tracker.failures += 1
+                if answer is not None:
+                    fallback = answer
+                    error = f"{endpoint.model}: no valid decision in the answer"
+                last_error = error
+                logger.warning(f"✗ LLM model {endpoint.model} failed: {error}")
+                if len(launched) < len(endpoints):
+                    launch("failover")
+                    running += 1
+        finally:
+            cancel.set()
+            now = time.monotonic()
+            for endpoint, started in launched:
+                tracker = self.tracker(endpoint, kind)
+                with self._lock:
+                    tracker.samples.append(elapsed.get(endpoint, now - started))
+
+        with self._lock:
+            self.stats["failed"] += fallback is None
+        return fallback, (None if fallback is not None else last_error)
+
+    def _attempt(self, endpoint: LLMEndpoint, prompt: str, max_tokens: int, deadline: float,
+                 required: tuple, stream: bool, cancel: threading.Event, answers: queue.Queue):
+        payload = {
+            "model": endpoint.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.1,
+            "max_tokens": max_tokens,
+            "stream": False
+        }
+        headers = _api_key_header(endpoint)
+        started = time.monotonic()
+        timeout = max(1.0, deadline - started)
+        try:
+            if stream:
+                content, result, cut_off = stream_chat_completion(endpoint.url, headers, payload, timeout,
+                                                                  required=required, cancel=cancel)
+            else:
+                response = requests.post(endpoint.url, headers=headers, json=payload, timeout=timeout, stream=True)
+                try:
+                    if response.status_code != 200:
+                        raise RuntimeError(f"Status {response.status_code}: {response.text[:200]}")
+                    content = _read_completion(response, cancel)
+                finally:
+                    response.close()
+                if content is None:
+                    return  # cancelled
+                result = IncrementalJSONObject(required).feed(content) if required else None
+                cut_off = False
+            if cancel.is_set():
+                return
+            answers.put((endpoint, LLMAnswer(content, result, endpoint.model, time.monotonic() - started, cut_off), None))
+        except Exception as e:
+            answers.put((endpoint, None, str(e)))
+
+    def summary(self) -> str:
+        with self._lock:
+            parts = []
+            for (endpoint, kind), tracker in self.trackers.items():
+                p90 = tracker.p90()
+                parts.append(f"{endpoint.model}@{urlparse(endpoint.url).netloc} {kind}: p90 {f'{p90:.1f}s' if p90 is not None else 'n/a'}, "
+                             f"{tracker.wins} wins, {tracker.failures} failures")
+            return (f"LLM requests: {self.stats['requests']} ({self.stats['hedges']} hedges, "
+                    f"{self.stats['failovers']} failovers, {self.stats['failed']} failed) | " + "; ".join(parts))
+
+
+# ✅ Shared provider (latency history covers every LLM call of the process)
+llm_provider = LLMProvider()
@@ -0,0 +1,109 @@
+import time
+import json
+import threading
+from typing import Iterable, Optional, Tuple
+
+import requests
+
+from trading_bot.orderly_types import loads
+
+
+class IncrementalJSONObject:
+    """
+    Finds the first complete top-level JSON object in text that arrives in pieces.
+
+    Only braces outside strings count towards nesting, so prose before the
+    object and `{`/`}` inside string values are handled. Each chunk is scanned
+    once. An object that parses but lacks a required field is skipped and the
+    search continues with the next one.
+    """
+
+    def __init__(self, required: Iterable[str] = ()):
+        self.required = tuple(required)
+        self.text = ""
+        self.result: Optional[dict] = None
+        self._pos = 0          # next character to scan
+        self._start = -1       # index of the opening brace of the current candidate
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> Optional[dict]:
+        """Add text; returns the decision object once it is complete (and keeps returning it)."""
+        if self.result is not None:
+            return self.result
+        self.text += chunk
+        text = self.text
+        for i in range(self._pos, len(text)):
+            ch = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                if self._depth:
+                    self._in_string = True
+            elif ch == "{":
+                if self._depth == 0:
+                    self._start = i
+                self._depth += 1
+            elif ch == "}" and self._depth:
+                self._depth -= 1
+                if self._depth == 0 and self._complete(text[self._start:i + 1]):
+                    self._pos = i + 1
+                    return self.result
+        self._pos = len(text)
+        return None
+
+    def _complete(self, candidate: str) -> bool:
+        try:
+            obj = json.loads(candidate)
+        except ValueError:
+            return False
+        if not isinstance(obj, dict) or any(field not in obj for field in self.required):
+            return False
+        self.result = obj
+        return True
+
+
+def stream_chat_completion(url: str, headers: dict, payload: dict, timeout: float,
+                           required: Iterable[str] = (),
+                           cancel: Optional[threading.Event] = None) -> Tuple[str, Optional[dict], bool]:
+    """
+    POST an OpenAI-style chat completion with "stream": true and read the
+    server-sent `data:` chunks. The delta text is fed to an incremental parser and
+    the connection is closed as soon as a JSON object with every `required` field
+    is complete, without waiting for the rest of the completion. Setting `cancel`
+    (another request already answered) also closes it, with no decision.
+
+    Returns (content received, decision object or None, cut_off_early).
+    Raises requests exceptions, or RuntimeError for a non-200 status.
+    """
+    deadline = time.monotonic() + timeout
+    parser = IncrementalJSONObject(required)
+    response = requests.post(url, headers=headers, json={**payload, "stream": True},
+                             timeout=timeout, stream=True)
+    try:
+        if response.status_code != 200:
+            raise RuntimeError(f"Status {response.status_code}: {response.text[:200]}")
+        for line in response.iter_lines():
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"stream exceeded {timeout}s")
+            if cancel is not None and cancel.is_set():
+                return parser.text, None, True
+            if not line.startswith(b"data:"):
+                continue  # keep-alive comments and blank separators
+            data = line[5:].strip()
+            if data == b"[DONE]":
+                break
+            choices = loads(data).get("choices") or [{}]
+            delta = (choices[0].get("delta") or {}).get("content")
+            if delta and parser.feed(delta) is not None:
+                return parser.text, parser.result, True
+        return parser.text, parser.result, False
+    finally:
+        # Frees the connection right away, also when the completion is cut off mid-stream
+        response.close()
@@ -0,0 +1,246 @@
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from logs.log_config import apolo_trader_logger as logger
+from futures_perps.trade.apolo.historical_data import get_orderbook_snapshot
+from futures_perps.trade.apolo.orderbook_analytics import (
+    NumericOrderBook, EMPTY_BOOK, MAX_DEPTH, book_from_levels, imbalance,
+)
+from trading_bot.market_data_hub import MarketDataHub, get_market_data_hub
+from trading_bot.orderly_types import OrderbookSnapshot
+from trading_bot.futures_executor_apolo import ORDERLY_ACCOUNT_ID
+
+SNAPSHOT_LEVELS = MAX_DEPTH
+# Levels kept per side; deltas far from the touch are trimmed beyond this
+MAX_LEVELS = 1000
+# Deltas buffered while a snapshot is in flight
+MAX_BUFFERED_UPDATES = 2000
+# A synced book that has not received a delta for this long is treated as stale
+BOOK_MAX_AGE = 30.0
+# Pause before retrying a failed snapshot
+SNAPSHOT_RETRY_DELAY = 2.0
+
+
+class _Book:
+    __slots__ = ("bids", "asks", "ts", "synced", "resyncing", "retry_at", "buffer", "updated_at", "chained")
+
+    def __init__(self):
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self.ts = 0            # exchange timestamp of the last applied snapshot/delta
+        self.synced = False
+        self.resyncing = False
+        self.retry_at = 0.0    # monotonic time before which a failed snapshot is not retried
+        self.buffer = []       # (prev_ts, ts, bids, asks) received before the snapshot
+        self.updated_at = 0.0  # local receive time of the last applied change
+        self.chained = False   # a delta was applied since the snapshot (from then on prevTs must match ts)
+
+
+def _trim_levels(side: Dict[float, float], descending: bool):
+    if len(side) > MAX_LEVELS:
+        for price in sorted(side, reverse=descending)[MAX_LEVELS:]:
+            del side[price]
+
+
+def _apply_levels(side: Dict[float, float], levels, descending: bool):
+    for price, qty in levels:
+        price, qty = float(price), float(qty)
+        if qty == 0:
+            side.pop(price, None)
+        else:
+            side[price] = qty
+    _trim_levels(side, descending)
+
+
+def _chains(book: _Book, prev_ts: int) -> bool:
+    """
+    Whether a delta newer than book.ts follows on from it. The first delta after
+    a snapshot only has to straddle it (prevTs <= snapshot ts < ts); after that
+    the chain must be exact.
+    """
+    return prev_ts == book.ts or (not book.chained and prev_ts < book.ts)
+
+
+class LocalOrderBookManager:
+    """
+    L2 order books maintained from `{symbol}@orderbookupdate` deltas.
+
+    On track(symbol) the deltas start buffering and a REST snapshot is taken
+    off the hub thread. Buffered deltas newer than the snapshot are replayed,
+    then every delta must chain onto the previous one (its prevTs equals the
+    last applied ts). A gap marks the book unsynced and triggers a fresh
+    snapshot. Reads never touch the network.
+    """
+
+    def __init__(self, hub: MarketDataHub, fetch_snapshot: Callable[[str, int], Optional[OrderbookSnapshot]] = get_orderbook_snapshot):
+        self.hub = hub
+        self.fetch_snapshot = fetch_snapshot
+        self._books: Dict[str, _Book] = {}
+        self._cond = threading.Condition()
+        self._stats = {"updates": 0, "snapshots": 0, "resyncs": 0, "gaps": 0}
+
+    def track(self, symbol: str):
+        """Start maintaining the book for symbol (idempotent)."""
+        with self._cond:
+            if symbol in self._books:
+                return
+            self._books[symbol] = _Book()
+        self.hub.add_handler(f"{symbol}@orderbookupdate", self._on_update)
+        self._schedule_resync(symbol)
+
+    # --- sync ----------------------------------------------------------------
+
+    def _schedule_resync(self, symbol: str):
+        with self._cond:
+            book = self._books[symbol]
+            if book.resyncing:
+                return
+            book.resyncing = True
+            book.synced = False
+        threading.Thread(target=self._resync, args=(symbol,), name=f"ob-resync-{symbol}", daemon=True).start()
+
+    def _resync(self, symbol: str):
+        snapshot = None
+        try:
+            snapshot = self.fetch_snapshot(symbol, SNAPSHOT_LEVELS)
+        except Exception as e:
+            logger.warning(f"⚠️ Order book snapshot failed for {symbol}: {e}")
+
+        with self._cond:
+            book = self._books[symbol]
+            book.resyncing = False
+            if not snapshot:
+                # Stay unsynced; a delta after the retry delay schedules another attempt
+                book.retry_at = time.monotonic() + SNAPSHOT_RETRY_DELAY
+                return
+            self._stats["snapshots"] += 1
+            # Snapshot levels are already (float, float): load them as they are
+            book.bids = {price: qty for price, qty in snapshot.bids if qty}
+            book.asks = {price: qty for price, qty in snapshot.asks if qty}
+            _trim_levels(book.bids, descending=True)
+            _trim_levels(book.asks, descending=False)
+            book.ts = snapshot.timestamp
+            book.chained = False
+
+            # Replay deltas that arrived while the snapshot was in flight
+            pending, book.buffer = book.buffer, []
+            for prev_ts, ts, bids, asks in pending:
+                if ts <= book.ts:
+                    continue
+                if not _chains(book, prev_ts):
+                    # Missing (dropped or out-of-order) updates between the snapshot and this delta
+                    self._stats["gaps"] += 1
+                    self._stats["resyncs"] += 1
+                    break
+                self._apply(book, ts, bids, asks)
+            else:
+                book.synced = True
+                book.updated_at = time.time()
+                self._cond.notify_all()
+                return
+        self._schedule_resync(symbol)
+
+    def _apply(self, book: _Book, ts: int, bids, asks):
+        _apply_levels(book.bids, bids, descending=True)
+        _apply_levels(book.asks, asks, descending=False)
+        book.ts = ts
+        book.chained = True
+        book.updated_at = time.time()
+
+    def _on_update(self, msg: dict):
+        data = msg["data"]
+        symbol = data.get("symbol") or msg["topic"].split("@", 1)[0]
+        ts, prev_ts = int(msg.get("ts") or data.get("ts") or 0), int(data.get("prevTs") or 0)
+        bids, asks = data.get("bids", []), data.get("asks", [])
+
+        with self._cond:
+            book = self._books.get(symbol)
+            if book is None:
+                return
+            self._stats["updates"] += 1
+            if not book.synced:
+                if len(book.buffer) < MAX_BUFFERED_UPDATES:
+                    book.buffer.append((prev_ts, ts, bids, asks))
+                needs_snapshot = not book.resyncing and time.monotonic() >= book.retry_at
+            elif ts <= book.ts and not book.chained:
+                needs_snapshot = False  # already contained in the snapshot
+            elif not _chains(book, prev_ts):
+                logger.warning(f"⚠️ Order book gap for {symbol} (prevTs {prev_ts} != {book.ts}), resyncing")
+                self._stats["gaps"] += 1
+                self._stats["resyncs"] += 1
+                book.synced = False
+                book.buffer = [(prev_ts, ts, bids, asks)]
+                needs_snapshot = True
+            else:
+                self._apply(book, ts, bids, asks)
+                needs_snapshot = False
+        if needs_snapshot:
+            self._schedule_resync(symbol)
+
+    # --- reads ---------------------------------------------------------------
+
+    def get_book(self, symbol: str, depth: int = MAX_DEPTH, wait: float = 0.0,
+                 max_age: float = BOOK_MAX_AGE) -> Optional[NumericOrderBook]:
+        """
+        Top `depth` levels as a NumericOrderBook, or None while the book is unsynced
+        or stale. With wait > 0, block that long for the first sync.
+        """
+        self.track(symbol)
+        deadline = time.monotonic() + wait
+        with self._cond:
+            book = self._books[symbol]
+            while not book.synced:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            if time.time() - book.updated_at > max_age:
+                return None
+            bids, asks, ts = list(book.bids.items()), list(book.asks.items()), book.ts
+        return book_from_levels(bids, asks, ts, depth)
+
+    def imbalance(self, symbol: str, depth: int = 15) -> Optional[dict]:
+        """
+        Bid/ask quantity totals over the top `depth` levels and their ratios, with the
+        same convention as analyze_with_llm (ratio is 0 when the other side is empty).
+        """
+        book = self.get_book(symbol, depth)
+        if book is None:
+            return None
+        return imbalance(book, (depth,))[depth]
+
+    def stats(self) -> dict:
+        with self._cond:
+            synced = sum(1 for book in self._books.values() if book.synced)
+            return {**self._stats, "books": len(self._books), "synced": synced}
+
+
+_manager: Optional[LocalOrderBookManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_orderbook_manager() -> LocalOrderBookManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = LocalOrderBookManager(get_market_data_hub(ORDERLY_ACCOUNT_ID))
+        return _manager
+
+
+def get_live_orderbook(symbol: str, limit: int = MAX_DEPTH) -> NumericOrderBook:
+    """
+    Top `limit` levels from the locally maintained book; the first call for a symbol waits
+    briefly for the initial sync and falls back to a REST snapshot if it is not ready.
+    """
+    book = get_orderbook_manager().get_book(symbol, limit, wait=3.0)
+    if book is not None:
+        return book
+    snapshot = get_orderbook_snapshot(symbol, limit)
+    if snapshot is None:
+        return EMPTY_BOOK
+    return book_from_levels(snapshot.bids, snapshot.asks, snapshot.timestamp, limit)
@@ -1,111 +1,155 @@
-from datetime import timedelta
 import json
 import time
-import requests
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pydantic import BaseModel
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
 
 from db.db_ops import  get_setting
 from logs.log_config import apolo_trader_logger as logger
-from futures_perps.trade.apolo.historical_data import get_historical_data_limit_apolo, get_orderbook, get_funding_rate_history, get_public_liquidations
+from futures_perps.trade.apolo.market_context import gather_market_context
+from futures_perps.trade.apolo.liquidation_store import format_liquidation_heatmap
+from futures_perps.trade.apolo.orderbook_analytics import (
+    format_orderbook_as_text, format_depth_analytics, imbalance as orderbook_imbalance,
+)
+from futures_perps.trade.apolo.historical_data import get_historical_data_batch_apolo
+from futures_perps.trade.apolo.kline_stream import subscribe_klines, streamed_indicator_columns
+from futures_perps.trade.apolo.kline_buffer import INTERVAL_MS
+from futures_perps.trade.apolo.candle_scheduler import CandleScheduler, DEFAULT_CLOSE_OFFSET
+from futures_perps.trade.apolo.llm_provider import llm_provider
+from futures_perps.trade.apolo.llm_batch import BatchRequest, LLMBatcher, DEFAULT_BATCH_SIZE, DEFAULT_BATCH_WINDOW
+from futures_perps.trade.apolo.prompt_compactor import (
+    PromptBudget, DEFAULT_PROMPT_TOKEN_BUDGET, compact_block, compact_candle_history,
+)
+from futures_perps.trade.apolo.pre_gate import StructuralInputs, pre_gate, structural_rejections
+from futures_perps.trade.apolo.decision_cache import DecisionKey, decision_cache, last_closed_candle_ts, prompt_fingerprint
 
 # Load environment variables
 from dotenv import load_dotenv
 load_dotenv()
 
 # Import your executor
-from trading_bot.futures_executor_apolo import place_futures_order, get_close_price, get_available_balance, ORDERLY_ACCOUNT_ID, ORDERLY_SECRET, ORDERLY_PUBLIC_KEY
+from trading_bot.futures_executor_apolo import place_futures_order, ORDERLY_ACCOUNT_ID
+from trading_bot.market_data_hub import subscribe_configured_tickers
+from trading_bot.reference_data import get_cached_exchange_info
 
 from trading_bot.send_bot_message import send_bot_message
 
 # Import your liquidity persistence monitor
 from futures_perps.trade.apolo import liquidity_persistence_monitor as lpm
 
+# Fields the decision JSON must carry (streaming stops as soon as they are all in a complete object)
+LLM_REQUIRED_FIELDS = ("side", "approved", "resume_of_analysis")
 
-# Helper: Format orderbook as text (not CSV!)
-def format_orderbook_as_text(ob: dict) -> str:
-    lines = ["Top Bids (price, quantity):"]
-    for price, qty in ob.get('bids', [])[:15]:
-        lines.append(f"{price},{qty}")
-    
-    lines.append("\nTop Asks (price, quantity):")
-    for price, qty in ob.get('asks', [])[:15]:
-        lines.append(f"{price},{qty}")
-    
-    return "\n".join(lines)
+
+def _complete_llm(prompt: str, timeout_sec: int, max_tokens: int):
+    """Free-form completion (batched answers): (content, model, None) or (None, None, error)."""
+    answer, error = llm_provider.complete(prompt, max_tokens=max_tokens, timeout=timeout_sec, kind="batch")
+    if answer is None:
+        return None, None, error
+    return answer.content, answer.model, None
+
+
+def _query_llm(prompt: str, timeout_sec: int = None):
+    """
+    One decision from the configured LLM endpoints (hedged and failed over by llm_provider).
+    Returns ({"content", "llm_result", "model"}, None) or (None, error) when no endpoint
+    answered; content without a valid decision JSON falls back to a keyword read.
+    With the llm_stream setting on, completions are streamed and cut off as soon as the
+    decision JSON is complete.
+    """
+    streaming = (get_setting("llm_stream") or "True") == "True"
+    answer, error = llm_provider.complete(prompt, timeout=timeout_sec, required=LLM_REQUIRED_FIELDS, stream=streaming)
+    if answer is None:
+        return None, error
+
+    # === Parse LLM response ===
+    content, llm_result = answer.content, answer.result
+    if llm_result is None:
+        logger.error(f"LLM parse failed: no decision JSON in the {answer.model} answer")
+        content_lower = content.lower()
+        if "buy" in content_lower and ("approved" in content_lower or "true" in content_lower):
+            llm_result = {"side": "BUY", "approved": True, "resume_of_analysis": "Fallback: BUY approved"}
+        elif "sell" in content_lower and ("approved" in content_lower or "true" in content_lower):
+            llm_result = {"side": "SELL", "approved": True, "resume_of_analysis": "Fallback: SELL approved"}
+        else:
+            llm_result = {"side": "NONE", "approved": False, "resume_of_analysis": "Fallback: rejected"}
+    return {"content": content, "llm_result": llm_result, "model": answer.model}, None
 
 
-def analyze_with_llm(signal_dict: dict) -> dict:
-    """LLM analyzes full candle context; Python enforces rules ONLY if prompt_mode == 'mixed'."""
+def analyze_with_llm(signal_dict: dict, candles=None, force_refresh: bool = False,
+                     batcher: LLMBatcher = None) -> dict:
+    """LLM analyzes full candle context; Python enforces rules ONLY if prompt_mode == 'mixed'.
+    `candles` may carry KlineColumns with indicators already computed for this asset (batch mode).
+    The LLM decision is reused within the same closed candle unless `force_refresh` is set.
+    With a `batcher`, the LLM question is shared with other assets reaching this step at the same time."""
     from logs.log_config import apolo_trader_logger as logger
 
-    # === 1. Fetch market data (80 candles) ===
-    df = get_historical_data_limit_apolo(
+    # === 1. Fetch market data (80 candles, price, book, balance, funding, liquidations) concurrently ===
+    context = gather_market_context(
         symbol=signal_dict['asset'],
         interval=signal_dict['interval'],
+        strategy=signal_dict.get('indicator'),
         limit=80,
-        strategy=signal_dict.get('indicator')
+        candles=candles
     )
-    if df is None or len(df) < 20:
+    candles = context["candles"]
+    if candles is None or len(candles) < 20:
         return {
             "approved": False,
             "analysis": "Insufficient historical data",
             "explanation_for_user": "❌ No se pudieron cargar suficientes datos históricos para analizar la señal."
         }
 
-    latest_close = float(df['close'].iloc[-1])
+    latest_close = float(candles['close'][-1])
     
-    # === Trim CSV to avoid LLM timeout ===
-    csv_content = df.to_csv(index=False)
-    csv_lines = csv_content.split('\n')
-    if len(csv_lines) > 30:
-        csv_content = '\n'.join(csv_lines[:20] + ["... (middle truncated) ..."] + csv_lines[-10:])
-
     # === Structural data (for mixed mode or logging) ===
-    last_3_lows = df['low'].tail(3).astype(float).tolist()
-    last_3_highs = df['high'].tail(3).astype(float).tolist()
+    last_3_lows = candles['low'][-3:].tolist()
+    last_3_highs = candles['high'][-3:].tolist()
     is_buy_structure = last_3_lows[0] <= last_3_lows[1] <= last_3_lows[2]
     is_sell_structure = last_3_highs[0] >= last_3_highs[1] >= last_3_highs[2]
     
     # Get RSI
     latest_rsi = None
-    if 'rsi_14' in df.columns:
-        latest_rsi = float(df['rsi_14'].iloc[-1])
+    if 'rsi_14' in candles:
+        latest_rsi = float(candles['rsi_14'][-1])
 
     # === Live price ===
-    live_price = get_close_price(ORDERLY_ACCOUNT_ID, signal_dict['asset'])
+    live_price = context["live_price"]
     if live_price is None:
         live_price = latest_close
         logger.warning("Falling back to candle close price (WebSocket failed)")
     price_delta_pct = (live_price / latest_close - 1) * 100
 
     # === Orderbook ===
-    orderbook = get_orderbook(signal_dict['asset'], limit=20)
+    orderbook = context["orderbook"]
     orderbook_content = format_orderbook_as_text(orderbook)
-    bids = sum(float(qty) for _, qty in orderbook.get('bids', [])[:15])
-    asks = sum(float(qty) for _, qty in orderbook.get('asks', [])[:15])
-    bid_imbalance = bids / asks if asks > 0 else 0
-    ask_imbalance = asks / bids if bids > 0 else 0
+    depth_analytics = format_depth_analytics(orderbook)
+    top15 = orderbook_imbalance(orderbook, (15,))[15]
+    bids, asks = top15["bids"], top15["asks"]
+    bid_imbalance, ask_imbalance = top15["bid_imbalance"], top15["ask_imbalance"]
 
     # === Balance & funding ===
-    balance = get_available_balance(ORDERLY_SECRET, ORDERLY_ACCOUNT_ID, ORDERLY_PUBLIC_KEY)
-    funding_data = get_funding_rate_history(symbol=signal_dict['asset'], limit=50)
-    current_funding = float(funding_data[0].get('funding_rate', 0)) if funding_data else 0.0
-
-    liquidation_data = get_public_liquidations(symbol=signal_dict['asset'], lookback_hours=24)
+    balance = context["balance"]
+    if balance is None:
+        balance = 0.0
+        logger.warning("Balance unavailable, reporting 0.0 to the LLM")
+    funding_data = context["funding"]
+    current_funding = funding_data[0].funding_rate if funding_data else 0.0
+
+    liquidation_store = context["liquidations"]
     nearby_liquidations = 0
-    if liquidation_data:
-        current_price = latest_close
-        price_range = current_price * 0.02
-        for liq in liquidation_data:
-            for pos in liq.get('positions_by_perp', []):
-                if pos.get('symbol') == signal_dict['asset']:
-                    mark = float(pos.get('mark_price', 0))
-                    if abs(mark - current_price) <= price_range:
-                        nearby_liquidations += 1
+    liquidation_heatmap = ""
+    if liquidation_store is not None:
+        nearby_liquidations = liquidation_store.count_near(signal_dict['asset'], latest_close, 2.0)
+        liquidation_heatmap = format_liquidation_heatmap(liquidation_store.heatmap(signal_dict['asset'], latest_close))
+        if liquidation_store.partial:
+            # The feed hit its page cap: these are lower bounds, not the 24h totals
+            nearby_liquidations = f"al menos {nearby_liquidations} (datos incompletos)"
+            liquidation_heatmap = f"(datos incompletos, valores mínimos)\n{liquidation_heatmap}".rstrip()
 
     # === Parse risk settings ===
     try:
@@ -122,6 +166,47 @@ def analyze_with_llm(signal_dict: dict) -> dict:
         }
     
     orderbook_threshold = float(get_setting("order_book_threshold") or 1.6)
+    try:
+        quote_tick = get_cached_exchange_info(signal_dict['asset']).get("quote_tick")
+    except Exception as e:
+        logger.warning(f"Quote tick unavailable for {signal_dict['asset']}, using significant digits: {e}")
+        quote_tick = None
+    prompt_mode = get_setting("prompt_mode") or "user_only"
+
+    # === Pre-gate: in mixed mode only a side that passes the structural rules can be approved ===
+    structural_inputs = StructuralInputs(is_buy_structure, is_sell_structure, bid_imbalance, ask_imbalance,
+                                         latest_rsi, price_delta_pct, orderbook_threshold)
+    if prompt_mode == "mixed":
+        blocked = pre_gate.evaluate(structural_inputs)
+        if blocked is not None:
+            logger.info(f"⛔ Pre-gate rejected {signal_dict['asset']} without LLM call. {pre_gate.summary()}")
+            rejection_reasons = [f"{side}: {reason}" for side, reasons in blocked.items() for reason in reasons]
+            return {
+                "approved": False,
+                "symbol": signal_dict['asset'],
+                "side": "NONE",
+                "entry": float(latest_close),
+                "stop_loss": float(latest_close),
+                "take_profit": float(latest_close),
+                "resume_of_analysis": "Pre-gate: ningún lado cumple los requisitos estructurales",
+                "analysis": "LLM not called: neither BUY nor SELL can pass the mixed-mode rules",
+                "explanation_for_user": "❌ RECHAZADA (mixed, sin LLM)\n• " + "\n• ".join(rejection_reasons[:4]),
+                "llm_model_used": None,
+                "structural_alignment": 0,
+                "rejection_reasons": rejection_reasons,
+                "warning_reasons": [],
+                "rsi_status": "N/A",
+                "structural_data": {
+                    "is_buy_structure": is_buy_structure,
+                    "is_sell_structure": is_sell_structure,
+                    "bid_imbalance": bid_imbalance,
+                    "ask_imbalance": ask_imbalance,
+                    "latest_rsi": latest_rsi,
+                    "price_delta_pct": price_delta_pct,
+                    "rsi_warning": False,
+                    "rsi_rejection": False
+                }
+            }
 
     # === Build prompt ===
     user_prompt = get_setting("prompt_text") or ""
@@ -182,9 +267,10 @@ def analyze_with_llm(signal_dict: dict) -> dict:
         f"Apalancamiento: {leverage}x\n"
         f"Nivel de riesgo: {risk_level}%\n"
         f"Tasa de funding actual: {current_funding:.6f}\n"
-        f"Liquidaciones cercanas (±2%): {nearby_liquidations}\n\n"
-        f"LIBRO DE ÓRDENES (top 20):\n{orderbook_content}\n\n"
-        f"HISTORIAL DE VELAS (30 de {len(df)} filas):\n{csv_content}"
+        f"Liquidaciones cercanas (±2%): {nearby_liquidations}\n"
+        f"Mapa de liquidaciones 24h (±5%):\n{liquidation_heatmap or 'sin liquidaciones'}\n\n"
+        f"LIBRO DE ÓRDENES (top 15):\n{orderbook_content}\n\n"
+        f"ANÁLISIS DE PROFUNDIDAD:\n{depth_analytics or 'sin datos'}"
     )
 
     response_format_mixed = """{
@@ -220,108 +306,103 @@ def analyze_with_llm(signal_dict: dict) -> dict:
         "resume_of_analysis": "Resumen del análisis"
     }"""    
 
-    prompt_mode = get_setting("prompt_mode") or "user_only"
-    
     if prompt_mode == "mixed":
-        prompt = f"""{user_prompt}
-
-        {hard_rules_note}
-
-        {structural_context}
-
-        {market_context_full}
-
+        sections = {
+            "user_prompt": user_prompt,
+            "rules": hard_rules_note,
+            "structural": structural_context,
+            "market": market_context_full,
+        }
+        instruction = """
             📋 INSTRUCCIÓN FINAL:
             1. Analiza primero los REQUISITOS ESTRUCTURALES arriba. 
             2. SOLO aprueba si TODOS los requisitos críticos para BUY o SELL se cumplen.
             3. Para RSI: VETO absoluto si >80 (BUY) o <20 (SELL). Entre 70-80 o 20-30 es advertencia, no veto.
             4. Busca divergencias RSI-precio en los datos históricos.
-            5. Usa análisis técnico para reforzar tu decisión.
-
-            Responde EXCLUSIVAMENTE en este formato JSON:
-            {response_format_mixed}"""
+            5. Usa análisis técnico para reforzar tu decisión."""
+        answer_format = response_format_mixed
     else:
         market_context_simple = (
             f"Activo: {signal_dict['asset']}\n"
             f"Precio de cierre de la última vela: {latest_close:.6f}\n"
             f"Saldo disponible: {balance:.2f} USDC\n"
             f"Apalancamiento: {leverage}x\n"
-            f"Nivel de riesgo: {risk_level}%\n"
-            f"HISTORIAL DE VELAS (30 de {len(df)} filas):\n{csv_content}"
+            f"Nivel de riesgo: {risk_level}%"
         )
-        prompt = f"""{user_prompt}
-
-        {market_context_simple}
-
+        sections = {
+            "user_prompt": user_prompt,
+            "market": market_context_simple,
+        }
+        instruction = """
         📋 INSTRUCCIÓN FINAL:
-        Analiza la señal basándote en los datos de mercado proporcionados.
+        Analiza la señal basándote en los datos de mercado proporcionados."""
+        answer_format = response_format
+    final_instruction = f"""{instruction}
 
         Responde EXCLUSIVAMENTE en este formato JSON:
-        {response_format}"""    
+        {answer_format}"""
+
+    # === Fit the prompt into the token budget: candle history gets what the other sections leave ===
+    budget = PromptBudget(int(get_setting("prompt_token_budget") or DEFAULT_PROMPT_TOKEN_BUDGET))
+    parts = {name: budget.add(name, text) for name, text in sections.items()}
+    final_instruction = budget.add("instructions", final_instruction)
+    history = compact_candle_history(candles, budget.remaining(), quote_tick)
+    parts["candles"] = budget.add("candles", (
+        f"HISTORIAL DE VELAS ({history.rows_shown} de {len(candles)} filas"
+        f"{f', {history.rows_summarized} resumidas' if history.rows_summarized else ''}):\n{history.text}"
+    ))
+    prompt = "\n\n".join(part for part in (*parts.values(), final_instruction) if part)
+    logger.info(f"🧮 Prompt for {signal_dict['asset']}: {budget.report()}")
 
     if get_setting("show_prompt") == "True":
         send_bot_message(int(os.getenv("TELEGRAM_CHAT_ID")), f"📝 Prompt ({len(prompt)} chars):\n{prompt[:500]}...")
 
-    # === Call LLM ===
-    response = None
-    used_model = None
-    last_error = None
+    # === Call LLM (or reuse the decision already made on this candle) ===
     model_name = get_setting("llm_model")
-    timeout_sec = 30
-    
-    try:
-        logger.info(f"Trying LLM model: {model_name} with timeout {timeout_sec}s")
-        response = requests.post(
-            "https://api.deepseek.com/v1/chat/completions",
-            headers={"Authorization": f"Bearer {os.getenv('DEEP_SEEK_API_KEY')}"},
-            json={
-                "model": model_name,
-                "messages": [{"role": "user", "content": prompt}],
-                "temperature": 0.1,
-                "max_tokens": 1000,
-                "stream": False
-            },
-            timeout=timeout_sec
-        )
-        if response.status_code == 200:
-            used_model = model_name
-            logger.info(f"✓ LLM model {model_name} succeeded")
+    cache_key = DecisionKey(
+        asset=signal_dict['asset'],
+        interval=signal_dict['interval'],
+        strategy=signal_dict.get('indicator') or "",
+        candle_ts=last_closed_candle_ts(candles.start_time, signal_dict['interval']) or int(candles.start_time[-1]),
+        prompt_mode=prompt_mode,
+        prompt_hash=prompt_fingerprint(user_prompt, response_format_mixed if prompt_mode == "mixed" else response_format,
+                                       model_name, orderbook_threshold, leverage, risk_level, min_sl_pct, min_tp_pct,
+                                       budget.budget),
+    )
+    last_error = None
+    with decision_cache.lock(cache_key):
+        decision = decision_cache.get(cache_key, bypass=force_refresh)
+        if decision is not None:
+            logger.info(f"♻️ Reusing LLM decision for {signal_dict['asset']} on candle {cache_key.candle_ts}")
         else:
-            last_error = f"Status {response.status_code}: {response.text[:200]}"
-    except Exception as e:
-        last_error = str(e)
-        logger.warning(f"✗ LLM error: {e}")
-    
-    if response is None or response.status_code != 200:
+            if batcher is not None:
+                # Shared sections go once per batched call, the asset block once per asset
+                shared = ("user_prompt", "rules")
+                decision = batcher.submit(BatchRequest(
+                    asset=signal_dict['asset'],
+                    model=model_name,
+                    header="\n\n".join(parts[name] for name in shared if parts.get(name)),
+                    body="\n\n".join(text for name, text in parts.items() if name not in shared and text),
+                    footer=compact_block(f"""{instruction}
+                        Aplica estas instrucciones a CADA activo por separado.
+
+                        Responde EXCLUSIVAMENTE con un array JSON con un objeto por activo, en el mismo orden.
+                        Cada objeto lleva el campo "asset" con el símbolo exacto del encabezado del activo
+                        (ej. "PERP_BTC_USDC") y el resto de campos de este formato:
+                        {answer_format}"""),
+                ))
+            if decision is None:
+                decision, last_error = _query_llm(prompt)
+            if decision is not None:
+                decision_cache.put(cache_key, decision)
+
+    if decision is None:
         return {
             "approved": False,
             "analysis": f"LLM service unavailable: {last_error}",
             "explanation_for_user": "⚠️ Servicio de análisis temporalmente no disponible. Intente en 1 minuto."
         }
-
-    # === Parse LLM response ===
-    try:
-        content = response.json()['choices'][0]['message']['content']
-        json_start = content.find('{')
-        json_end = content.rfind('}') + 1
-        if json_start == -1 or json_end == 0:
-            llm_result = json.loads(content.strip())
-        else:
-            llm_result = json.loads(content[json_start:json_end])
-        
-        required = ["side", "approved", "resume_of_analysis"]
-        for field in required:
-            if field not in llm_result:
-                raise ValueError(f"Missing field: {field}")
-    except Exception as e:
-        logger.error(f"LLM parse failed: {e}")
-        content_lower = content.lower()
-        if "buy" in content_lower and ("approved" in content_lower or "true" in content_lower):
-            llm_result = {"side": "BUY", "approved": True, "resume_of_analysis": "Fallback: BUY approved"}
-        elif "sell" in content_lower and ("approved" in content_lower or "true" in content_lower):
-            llm_result = {"side": "SELL", "approved": True, "resume_of_analysis": "Fallback: SELL approved"}
-        else:
-            llm_result = {"side": "NONE", "approved": False, "resume_of_analysis": "Fallback: rejected"}
+    content, llm_result, used_model = decision["content"], decision["llm_result"], decision["model"]
 
     llm_side = llm_result.get("side", "NONE")
     llm_approved = bool(llm_result.get("approved", False))
@@ -329,8 +410,6 @@ def analyze_with_llm(signal_dict: dict) -> dict:
     logger.info(f"LLM Decision: {llm_side} (Approved: {llm_approved})")
 
     # === FINAL DECISION LOGIC ===
-    prompt_mode = get_setting("prompt_mode") or "user_only"
-
     final_approved = False
     final_side = "NONE"
     entry = latest_close
@@ -340,49 +419,23 @@ def analyze_with_llm(signal_dict: dict) -> dict:
 
     if prompt_mode == "mixed":
         # === STRICT MODE: enforce all structural rules ===
-        min_imbalance = float(get_setting("order_book_threshold") or 1.6)
-        rsi_rejection = False
-        if latest_rsi:
-            if llm_side == "BUY" and latest_rsi > 80:
-                rsi_rejection = True
-            elif llm_side == "SELL" and latest_rsi < 20:
-                rsi_rejection = True
-
-        if llm_side == "BUY" and llm_approved:
-            valid = (is_buy_structure and 
-                     bid_imbalance >= min_imbalance and 
-                     not rsi_rejection and 
-                     price_delta_pct >= -0.1)
-            if valid:
+        min_imbalance = structural_inputs.min_imbalance
+        if llm_side in ("BUY", "SELL") and llm_approved:
+            rejection_reasons = structural_rejections(llm_side, structural_inputs)
+            if not rejection_reasons and llm_side == "BUY":
                 swing_low = min(last_3_lows)
                 sl_dist = entry * min_sl_pct
                 stop_loss = min(swing_low * 0.999, entry - sl_dist)
                 tp_dist = entry * min_tp_pct
                 take_profit = entry + max(3 * (entry - stop_loss), tp_dist)
                 final_approved, final_side = True, "BUY"
-            else:
-                if not is_buy_structure: rejection_reasons.append("Estructura NO alcista")
-                if bid_imbalance < min_imbalance: rejection_reasons.append("Bids insuficientes")
-                if rsi_rejection: rejection_reasons.append(f"RSI >80: {latest_rsi}")
-                if price_delta_pct < -0.1: rejection_reasons.append("Precio cayendo")
-
-        elif llm_side == "SELL" and llm_approved:
-            valid = (is_sell_structure and 
-                     ask_imbalance >= min_imbalance and 
-                     not rsi_rejection and 
-                     price_delta_pct <= 0.1)
-            if valid:
+            elif not rejection_reasons:
                 swing_high = max(last_3_highs)
                 sl_dist = entry * min_sl_pct
                 stop_loss = max(swing_high * 1.001, entry + sl_dist)
                 tp_dist = entry * min_tp_pct
                 take_profit = entry - max(3 * (stop_loss - entry), tp_dist)
                 final_approved, final_side = True, "SELL"
-            else:
-                if not is_sell_structure: rejection_reasons.append("Estructura NO bajista")
-                if ask_imbalance < min_imbalance: rejection_reasons.append("Asks insuficientes")
-                if rsi_rejection: rejection_reasons.append(f"RSI <20: {latest_rsi}")
-                if price_delta_pct > 0.1: rejection_reasons.append("Precio subiendo")
 
         explanation_for_user = (
             f"✅ APROBADA ({final_side})" if final_approved else
@@ -475,154 +528,260 @@ def analyze_with_llm(signal_dict: dict) -> dict:
     }
 
 
-def process_signal(asset_override=None):
+def process_signal(asset_override=None, candles=None, force_refresh=False, batcher=None):
     """
     Main entry point for signal processing.
     Called by Telegram bot. Must return a string.
+    force_refresh re-runs the LLM even if the asset was already analyzed on this candle.
+    batcher (autotrade batch mode) lets the LLM call be shared with other assets.
+    """
+    try:
+        return run_signal(asset_override, candles, force_refresh, batcher)
+    except Exception as e:
+        logger.exception("Error in process_signal")
+        return f"🔥 Internal error: {str(e)}"
+
+
+def run_signal(asset_override=None, candles=None, force_refresh=False, batcher=None, cancelled=None):
     """
+    process_signal without the catch-all, for callers that report failures themselves.
+    Once `cancelled` is set (the caller gave up on this asset) no order is placed.
+    """
+    # --- Fetch required settings ---
+    asset = asset_override if asset_override else get_setting("asset")
+    interval = get_setting("interval")
+    min_tp = get_setting("min_tp")
+    min_sl = get_setting("min_sl")
+    #
+    min_tp = float(min_tp)
+    min_sl = float(min_sl)
+
+    leverage = get_setting("leverage")
+    risk_level = get_setting("risk_level")
+    indicator = get_setting("indicator")
+
+    # --- Validate settings ---
+    missing = []
+    if not asset: missing.append("asset")
+    if not interval: missing.append("interval")
+    if not min_tp: missing.append("min_tp")
+    if not min_sl: missing.append("min_sl")
+    if not leverage: missing.append("leverage")
+    if not risk_level: missing.append("risk_level")
+
+    if missing:
+        return f"❌ Missing settings: {', '.join(missing)}. Please configure them via /list."
+
+    # --- Convert types ---
     try:
-        # --- Fetch required settings ---
-        asset = asset_override if asset_override else get_setting("asset")
-        interval = get_setting("interval")
-        min_tp = get_setting("min_tp")
-        min_sl = get_setting("min_sl")
-        #
         min_tp = float(min_tp)
         min_sl = float(min_sl)
+        leverage = int(leverage)
+        risk_level = float(risk_level)
+    except (ValueError, TypeError) as e:
+        return f"❌ Invalid setting format: {str(e)}"
+
+    # --- Build signal dict ---
+    signal_dict = {
+        "asset": asset,
+        "interval": interval,
+        "min_tp": min_tp,
+        "min_sl": min_sl,
+        "leverage": leverage,
+        "risk_level": risk_level,
+        "indicator": indicator or "Trend-Following",
+    }
 
-        leverage = get_setting("leverage")
-        risk_level = get_setting("risk_level")
-        indicator = get_setting("indicator")
+    # --- Call LLM analyzer ---
+    llm_result = analyze_with_llm(signal_dict, candles=candles, force_refresh=force_refresh, batcher=batcher)
 
-        # --- Validate settings ---
-        missing = []
-        if not asset: missing.append("asset")
-        if not interval: missing.append("interval")
-        if not min_tp: missing.append("min_tp")
-        if not min_sl: missing.append("min_sl")
-        if not leverage: missing.append("leverage")
-        if not risk_level: missing.append("risk_level")
+    # --- Format response ---
+    if isinstance(llm_result, dict) and llm_result.get("approved"):
+        try:
+            # the signal was approved, if the auto_trade setting is true, place the order
+            # and create the dict required to place the order, the values are
+            # symbol, side, take_profit, stop_loss, leverage
+            auto_trade_val = get_setting("auto_trade")
+            if cancelled is not None and cancelled.is_set():
+                logger.warning(f"⏱️ {llm_result['symbol']} approved after its autotrade timeout, order not placed")
+                return "⏱️ Trade approved after the asset timed out; order not placed"
+            if auto_trade_val == "True" or auto_trade_val == "Automatic":
+                signal_dict = {
+                    "symbol": llm_result['symbol'],
+                    "side": llm_result['side'],
+                    "entry": float(llm_result['entry']),   
+                    "take_profit": float(llm_result['take_profit']),
+                    "stop_loss": float(llm_result['stop_loss']),
+                    "leverage": leverage
+                }
+                place_futures_order(signal_dict)  
+            return (
+                f"✅ TRADE APPROVED\n"
+                f"• Symbol: {llm_result['symbol']}\n"
+                f"• Side: {llm_result['side']}\n"
+                f"• Entry: {float(llm_result['entry']):.6f}\n"
+                f"• TP: {float(llm_result['take_profit']):.6f}\n"
+                f"• SL: {float(llm_result['stop_loss']):.6f}\n"
+                f"• Reason: {llm_result.get('resume_of_analysis', 'N/A')}"
+            )
+
+        except (KeyError, ValueError, TypeError) as e:
+            return f"⚠️ Trade approved but malformed output: {str(e)}"            
+    else:
+        if isinstance(llm_result, dict):
+            # Prefer the clean analysis summary
+            reason = llm_result.get("resume_of_analysis") or llm_result.get("analysis", "No reason provided.")
+        else:
+            reason = str(llm_result)
 
-        if missing:
-            return f"❌ Missing settings: {', '.join(missing)}. Please configure them via /list."
+        # Clean up if reason starts with JSON (fallback)
+        reason = str(reason).strip()
+        if reason.startswith("{"):
+            # Try to extract resume_of_analysis from raw JSON string
+            try:
+                raw_json_start = reason.find('{')
+                raw_json_end = reason.rfind('}') + 1
+                raw_json_str = reason[raw_json_start:raw_json_end]
+                fallback = json.loads(raw_json_str)
+                reason = fallback.get("resume_of_analysis", "Trade rejected by LLM.")
+            except:
+                reason = "Trade rejected due to failing hard rules (see analysis)."
+        
+        logger.info(f"Trade rejected. Reason: {reason}")
 
-        # --- Convert types ---
-        try:
-            min_tp = float(min_tp)
-            min_sl = float(min_sl)
-            leverage = int(leverage)
-            risk_level = float(risk_level)
-        except (ValueError, TypeError) as e:
-            return f"❌ Invalid setting format: {str(e)}"
-
-        # --- Build signal dict ---
-        signal_dict = {
-            "asset": asset,
-            "interval": interval,
-            "min_tp": min_tp,
-            "min_sl": min_sl,
-            "leverage": leverage,
-            "risk_level": risk_level,
-            "indicator": indicator or "Trend-Following",
-        }
+        return f"Trade rejected\n• Reason: {reason}"  # Allow slightly more for clarity
 
-        # --- Call LLM analyzer ---
-        llm_result = analyze_with_llm(signal_dict)
+# Autotrade worker pool defaults (overridable with the autotrade_concurrency / asset_timeout settings)
+DEFAULT_AUTOTRADE_CONCURRENCY = 4
+DEFAULT_ASSET_TIMEOUT = 120
 
-        # --- Format response ---
-        if isinstance(llm_result, dict) and llm_result.get("approved"):
-            try:
-                # the signal was approved, if the auto_trade setting is true, place the order
-                # and create the dict required to place the order, the values are
-                # symbol, side, take_profit, stop_loss, leverage
-                auto_trade_val = get_setting("auto_trade")
-                if auto_trade_val == "True" or auto_trade_val == "Automatic":
-                    signal_dict = {
-                        "symbol": llm_result['symbol'],
-                        "side": llm_result['side'],
-                        "entry": float(llm_result['entry']),   
-                        "take_profit": float(llm_result['take_profit']),
-                        "stop_loss": float(llm_result['stop_loss']),
-                        "leverage": leverage
-                    }
-                    place_futures_order(signal_dict)  
-                return (
-                    f"✅ TRADE APPROVED\n"
-                    f"• Symbol: {llm_result['symbol']}\n"
-                    f"• Side: {llm_result['side']}\n"
-                    f"• Entry: {float(llm_result['entry']):.6f}\n"
-                    f"• TP: {float(llm_result['take_profit']):.6f}\n"
-                    f"• SL: {float(llm_result['stop_loss']):.6f}\n"
-                    f"• Reason: {llm_result.get('resume_of_analysis', 'N/A')}"
-                )
-
-            except (KeyError, ValueError, TypeError) as e:
-                return f"⚠️ Trade approved but malformed output: {str(e)}"            
-        else:
-            if isinstance(llm_result, dict):
-                # Prefer the clean analysis summary
-                reason = llm_result.get("resume_of_analysis") or llm_result.get("analysis", "No reason provided.")
-            else:
-                reason = str(llm_result)
 
-            # Clean up if reason starts with JSON (fallback)
-            reason = str(reason).strip()
-            if reason.startswith("{"):
-                # Try to extract resume_of_analysis from raw JSON string
+def process_assets_concurrently(asset_list, candles=None, scheduler=None) -> dict:
+    """
+    Run the signal for every asset on a bounded worker pool.
+
+    At most `autotrade_concurrency` assets run at once (exchange calls still go
+    through the shared rate limiter). An asset that runs longer than
+    `asset_timeout` seconds from its own start is abandoned: its thread cannot
+    be interrupted, so it finishes in the background, its result is ignored and
+    it is cancelled so it places no order. A failing asset never affects the others.
+    With the llm_batch setting on, assets that reach the LLM step together share
+    one LLM request (up to llm_batch_size assets); the pool grows to that size so
+    a full batch can gather, exchange calls stay paced by the rate limiter.
+    Returns {asset: "ok" | "timeout" | "error: ..."}.
+    """
+    candles = candles or {}
+    concurrency = max(1, int(get_setting("autotrade_concurrency") or DEFAULT_AUTOTRADE_CONCURRENCY))
+    asset_timeout = float(get_setting("asset_timeout") or DEFAULT_ASSET_TIMEOUT)
+    started_at = {}
+    cancelled = {asset: threading.Event() for asset in asset_list}
+
+    batcher = None
+    if get_setting("llm_batch") == "True" and len(asset_list) > 1:
+        batcher = LLMBatcher(
+            _complete_llm, LLM_REQUIRED_FIELDS,
+            max_batch=int(get_setting("llm_batch_size") or DEFAULT_BATCH_SIZE),
+            window=float(get_setting("llm_batch_window") or DEFAULT_BATCH_WINDOW),
+        )
+        concurrency = max(concurrency, min(batcher.max_batch, len(asset_list)))
+
+    def run(asset):
+        started_at[asset] = time.monotonic()
+        logger.info(f"Processing autotrade for asset: {asset}")
+        return run_signal(asset_override=asset, candles=candles.get(asset), batcher=batcher,
+                          cancelled=cancelled[asset])
+
+    outcome = {}
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="autotrade")
+    try:
+        pending = {executor.submit(run, asset): asset for asset in asset_list}
+        while pending:
+            done, _ = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+            for future in done:
+                asset = pending.pop(future)
                 try:
-                    raw_json_start = reason.find('{')
-                    raw_json_end = reason.rfind('}') + 1
-                    raw_json_str = reason[raw_json_start:raw_json_end]
-                    fallback = json.loads(raw_json_str)
-                    reason = fallback.get("resume_of_analysis", "Trade rejected by LLM.")
-                except:
-                    reason = "Trade rejected due to failing hard rules (see analysis)."
-            
-            logger.info(f"Trade rejected. Reason: {reason}")
-
-            return f"Trade rejected\n• Reason: {reason}"  # Allow slightly more for clarity
+                    future.result()
+                    outcome[asset] = "ok"
+                    if scheduler is not None:
+                        scheduler.record_decision(asset)
+                except Exception as e:
+                    outcome[asset] = f"error: {e}"
+                    logger.exception(f"Error processing automated asset {asset}: {e}")
+
+            now = time.monotonic()
+            for future, asset in list(pending.items()):
+                if asset in started_at and now - started_at[asset] > asset_timeout:
+                    cancelled[asset].set()
+                    del pending[future]
+                    outcome[asset] = "timeout"
+                    logger.error(f"❌ Automated asset {asset} timed out after {asset_timeout:.0f}s")
+    finally:
+        # Whatever is still running (e.g. the loop itself failed) must not trade after the cycle
+        for event in cancelled.values():
+            event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+    if batcher is not None:
+        logger.info(f"📦 {batcher.summary()}")
+    return outcome
 
-    except Exception as e:
-        logger.exception("Error in process_signal")
-        return f"🔥 Internal error: {str(e)}"
 
 def autotrade():
     logger.info("Starting autotrade loop...")
+    scheduler = None
     while True:
         try:
             if get_setting("auto_trade") == "Automatic":
-                # Map interval string to timedelta
                 interval_str = get_setting("interval")
-                interval_map = {
-                    '5m': timedelta(minutes=5),
-                    '15m': timedelta(minutes=15),
-                    '30m': timedelta(minutes=30),
-                    '1h': timedelta(hours=1),
-                    '4h': timedelta(hours=4),
-                    '1d': timedelta(days=1)
-                }
-                trade_interval = interval_map.get(interval_str, timedelta(hours=1))
-                
+                if interval_str not in INTERVAL_MS:
+                    interval_str = "1h"
+                if scheduler is None or scheduler.interval != interval_str:
+                    scheduler = CandleScheduler(interval_str)
+                scheduler.offset = float(get_setting("candle_close_offset") or DEFAULT_CLOSE_OFFSET)
+
+                # Closed candles stream into the kline buffer; the first asset's close starts the cycle
+                close_signal = None
+                watched = [a.strip() for a in (get_setting("automated_assets") or "").split(',') if a.strip()]
+                if watched:
+                    stream = subscribe_klines(watched, interval_str)
+                    close_signal = lambda start_ms, timeout: stream.wait_for_close(
+                        watched[0], interval_str, start_ms - 1, timeout) is not None
+
+                # Start right after the candle closes so every decision sees a freshly closed bar
+                scheduler.wait_for_next_close(close_signal)
+                if get_setting("auto_trade") != "Automatic":
+                    continue
+
                 automated_assets = get_setting("automated_assets")
                 if automated_assets:
                     asset_list = [a.strip() for a in automated_assets.split(',') if a.strip()]
                     logger.info(f"Processing automated assets: {asset_list}")
-                    for asset in asset_list:
-                        try:
-                            logger.info(f"Processing autotrade for each interval {interval_str} asset: {asset}")
-                            process_signal(asset_override=asset)
-                        except Exception as e:
-                            logger.exception(f"Error processing automated asset {asset}: {e}")
-                        time.sleep(10)
+
+                    # Keep live tickers streaming for every asset the loop (and the manual asset) trades
+                    subscribe_configured_tickers(ORDERLY_ACCOUNT_ID, asset_list + [get_setting("asset")])
+
+                    # Candles + indicators from the incremental engines the kline stream keeps up to
+                    # date; assets they cannot serve go through one vectorized batch pass
+                    strategy = get_setting("indicator") or "Trend-Following"
+                    try:
+                        subscribe_klines(asset_list, interval_str)
+                        candles = streamed_indicator_columns(asset_list, interval_str, 80, strategy)
+                        missing = [asset for asset in asset_list if asset not in candles]
+                        if missing:
+                            candles.update(get_historical_data_batch_apolo(missing, interval_str, 80, strategy))
+                    except Exception as e:
+                        logger.warning(f"Batch indicator pass failed, falling back to per-asset fetch: {e}")
+                        candles = {}
+
+                    outcome = process_assets_concurrently(asset_list, candles, scheduler)
+                    failed = {asset: status for asset, status in outcome.items() if status != "ok"}
+                    if failed:
+                        logger.warning(f"Autotrade assets not completed on {interval_str}: {failed}")
+                    scheduler.finish_cycle()
                 else:
                     logger.info("Auto trade is Automatic but no assets configured.")
-                
-                # Sleep for the interval
-                time.sleep(trade_interval.total_seconds())
             else:
                 # Not automatic, sleep and check again later
                 time.sleep(60)
         except Exception as e:
             logger.error(f"Error in autotrade loop: {e}")
             time.sleep(60)        
-            
\ No newline at end of file
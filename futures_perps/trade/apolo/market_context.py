@@ -0,0 +1,104 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))))
+
+from logs.log_config import apolo_trader_logger as logger
+from futures_perps.trade.apolo.historical_data import get_indicator_columns_apolo
+from futures_perps.trade.apolo.liquidation_store import refresh_liquidation_store
+from futures_perps.trade.apolo.local_orderbook import get_live_orderbook
+from futures_perps.trade.apolo.orderbook_analytics import EMPTY_BOOK, MAX_DEPTH
+from trading_bot.futures_executor_apolo import get_close_price, get_available_balance, ORDERLY_ACCOUNT_ID, ORDERLY_SECRET, ORDERLY_PUBLIC_KEY
+from trading_bot.reference_data import get_current_funding
+
+# ✅ Per-source timeouts (seconds). A source that misses its deadline is reported in
+# context["errors"] and left at its default value; the rest of the context is still used.
+SOURCE_TIMEOUTS = {
+    "candles": 20,
+    "live_price": 12,
+    "orderbook": 10,
+    "balance": 10,
+    "funding": 10,
+    "liquidations": 15,
+}
+
+# A prefetched candle window (e.g. from the batch indicator pass) is only reused while fresh
+PREFETCH_MAX_AGE = 60
+
+# Shared pool so a signal does not pay thread start-up on every call.
+# Sized for a few signals being analyzed at the same time.
+_executor = ThreadPoolExecutor(max_workers=18, thread_name_prefix="market_ctx")
+
+
+def gather_market_context(symbol: str, interval: str, strategy: str, limit: int = 80, candles=None) -> dict:
+    """
+    Fetch everything analyze_with_llm needs for one signal concurrently.
+    `candles` computed less than PREFETCH_MAX_AGE seconds ago replace the kline fetch.
+
+    Returns:
+    {
+        "candles": KlineColumns | None (candles + strategy indicators as arrays),
+        "live_price": float | None,
+        "orderbook": NumericOrderBook (float64 arrays, up to MAX_DEPTH levels per side),
+        "balance": float | None,
+        "funding": list,
+        "liquidations": LiquidationStore | None,
+        "errors": {source: str},
+        "timings": {source: seconds}
+    }
+    """
+    sources = {
+        "candles": (get_indicator_columns_apolo, (symbol, interval, limit, strategy), None),
+        "live_price": (get_close_price, (ORDERLY_ACCOUNT_ID, symbol), None),
+        "orderbook": (get_live_orderbook, (symbol, MAX_DEPTH), EMPTY_BOOK),
+        "balance": (get_available_balance, (ORDERLY_SECRET, ORDERLY_ACCOUNT_ID, ORDERLY_PUBLIC_KEY), None),
+        "funding": (get_current_funding, (symbol,), []),
+        "liquidations": (refresh_liquidation_store, (), None),
+    }
+
+    def timed(name, fn, args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            timings[name] = time.perf_counter() - t0
+
+    prefetched = candles is not None and time.time() - candles.attrs.get("computed_at", 0) <= PREFETCH_MAX_AGE
+    if prefetched:
+        del sources["candles"]
+
+    timings = {}
+    started = time.monotonic()
+    futures = {
+        name: _executor.submit(timed, name, fn, args)
+        for name, (fn, args, _) in sources.items()
+    }
+
+    context = {"errors": {}, "timings": {}}
+    if prefetched:
+        context["candles"] = candles
+    for name, future in futures.items():
+        default = sources[name][2]
+        # Deadlines are measured from submission, not from when we start waiting on this source
+        remaining = max(0.0, SOURCE_TIMEOUTS[name] - (time.monotonic() - started))
+        try:
+            value = future.result(timeout=remaining)
+            context[name] = default if value is None and default is not None else value
+        except FutureTimeoutError:
+            # The worker cannot be interrupted; it finishes in the background and is discarded
+            context[name] = default
+            context["errors"][name] = f"timeout after {SOURCE_TIMEOUTS[name]}s"
+            logger.warning(f"⚠️ Market context source '{name}' timed out for {symbol}")
+        except Exception as e:
+            context[name] = default
+            context["errors"][name] = str(e)[:200]
+            logger.warning(f"⚠️ Market context source '{name}' failed for {symbol}: {e}")
+        context["timings"][name] = timings.get(name)
+
+    logger.info(
+        f"Market context for {symbol} gathered in {time.monotonic() - started:.2f}s "
+        f"(failed: {list(context['errors']) or 'none'})"
+    )
+    return context
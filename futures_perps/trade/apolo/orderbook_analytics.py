@@ -0,0 +1,152 @@
+from typing import Dict, Iterable, NamedTuple, Optional
+
+import numpy as np
+
+# Orderly serves at most 500 levels per side
+MAX_DEPTH = 500
+IMBALANCE_DEPTHS = (5, 10, 15, 20, 50)
+DEPTH_BANDS_PCT = (0.25, 0.5, 1.0, 2.0)
+
+
+class NumericOrderBook(NamedTuple):
+    """One side per pair of contiguous float64 arrays, best level first."""
+    bid_px: np.ndarray
+    bid_qty: np.ndarray
+    ask_px: np.ndarray
+    ask_qty: np.ndarray
+    ts: int = 0
+
+    def __len__(self):
+        return max(len(self.bid_px), len(self.ask_px))
+
+
+def _side(levels, descending: bool, depth: int):
+    arr = np.asarray(levels, dtype=np.float64).reshape(-1, 2) if len(levels) else np.empty((0, 2))
+    order = np.argsort(-arr[:, 0] if descending else arr[:, 0], kind="stable")[:depth]
+    arr = arr[order]
+    return np.ascontiguousarray(arr[:, 0]), np.ascontiguousarray(arr[:, 1])
+
+
+def book_from_levels(bids, asks, ts: int = 0, depth: int = MAX_DEPTH) -> NumericOrderBook:
+    """Build a book from [[price, qty], ...] levels (strings or numbers, any order)."""
+    bid_px, bid_qty = _side(bids, True, depth)
+    ask_px, ask_qty = _side(asks, False, depth)
+    return NumericOrderBook(bid_px, bid_qty, ask_px, ask_qty, ts)
+
+
+EMPTY_BOOK = book_from_levels([], [])
+
+
+def mid_price(book: NumericOrderBook) -> Optional[float]:
+    if not len(book.bid_px) or not len(book.ask_px):
+        return None
+    return float((book.bid_px[0] + book.ask_px[0]) / 2)
+
+
+def imbalance(book: NumericOrderBook, depths: Iterable[int] = IMBALANCE_DEPTHS) -> Dict[int, dict]:
+    """
+    Bid/ask quantity over the top N levels for every N in `depths` (one cumsum per side).
+    Ratios use the analyze_with_llm convention: 0 when the other side is empty.
+    """
+    bid_cum = np.cumsum(book.bid_qty)
+    ask_cum = np.cumsum(book.ask_qty)
+    result = {}
+    for depth in depths:
+        bids = float(bid_cum[min(depth, len(bid_cum)) - 1]) if len(bid_cum) else 0.0
+        asks = float(ask_cum[min(depth, len(ask_cum)) - 1]) if len(ask_cum) else 0.0
+        result[depth] = {
+            "bids": bids,
+            "asks": asks,
+            "bid_imbalance": bids / asks if asks > 0 else 0,
+            "ask_imbalance": asks / bids if bids > 0 else 0,
+        }
+    return result
+
+
+def depth_within(book: NumericOrderBook, pcts: Iterable[float] = DEPTH_BANDS_PCT) -> Dict[float, dict]:
+    """Cumulative quantity and notional on each side within ±pct% of mid."""
+    mid = mid_price(book)
+    result = {}
+    if mid is None:
+        return result
+    bid_notional = np.cumsum(book.bid_px * book.bid_qty)
+    ask_notional = np.cumsum(book.ask_px * book.ask_qty)
+    bid_cum, ask_cum = np.cumsum(book.bid_qty), np.cumsum(book.ask_qty)
+    # Bids are descending and asks ascending, so the levels inside a band are a prefix
+    for pct in pcts:
+        n_bid = int(np.searchsorted(-book.bid_px, -mid * (1 - pct / 100), side="right"))
+        n_ask = int(np.searchsorted(book.ask_px, mid * (1 + pct / 100), side="right"))
+        result[pct] = {
+            "bid_qty": float(bid_cum[n_bid - 1]) if n_bid else 0.0,
+            "ask_qty": float(ask_cum[n_ask - 1]) if n_ask else 0.0,
+            "bid_notional": float(bid_notional[n_bid - 1]) if n_bid else 0.0,
+            "ask_notional": float(ask_notional[n_ask - 1]) if n_ask else 0.0,
+        }
+    return result
+
+
+def weighted_mid(book: NumericOrderBook, depth: int = 10) -> Optional[float]:
+    """
+    Depth-weighted mid: the VWAP of each side's top `depth` levels, weighted by
+    the opposite side's quantity (a heavier bid side pulls the price towards the ask).
+    """
+    bid_px, bid_qty = book.bid_px[:depth], book.bid_qty[:depth]
+    ask_px, ask_qty = book.ask_px[:depth], book.ask_qty[:depth]
+    bid_total, ask_total = bid_qty.sum(), ask_qty.sum()
+    if bid_total <= 0 or ask_total <= 0:
+        return mid_price(book)
+    bid_vwap = (bid_px * bid_qty).sum() / bid_total
+    ask_vwap = (ask_px * ask_qty).sum() / ask_total
+    return float((bid_vwap * ask_total + ask_vwap * bid_total) / (bid_total + ask_total))
+
+
+def largest_walls(book: NumericOrderBook, top: int = 3) -> dict:
+    """The `top` biggest levels per side with their distance from mid and size vs the side's median level."""
+    mid = mid_price(book)
+    walls = {}
+    for side, px, qty in (("bids", book.bid_px, book.bid_qty), ("asks", book.ask_px, book.ask_qty)):
+        if not len(qty):
+            walls[side] = []
+            continue
+        n = min(top, len(qty))
+        idx = np.argpartition(-qty, n - 1)[:n]
+        idx = idx[np.argsort(-qty[idx], kind="stable")]
+        median = float(np.median(qty))
+        walls[side] = [
+            {
+                "price": float(px[i]),
+                "qty": float(qty[i]),
+                "distance_pct": float((px[i] / mid - 1) * 100) if mid else None,
+                "x_median": float(qty[i] / median) if median > 0 else None,
+            }
+            for i in idx
+        ]
+    return walls
+
+
+def format_orderbook_as_text(book: NumericOrderBook, levels: int = 15) -> str:
+    lines = ["Top Bids (price, quantity):"]
+    lines += [f"{p},{q}" for p, q in zip(book.bid_px[:levels].tolist(), book.bid_qty[:levels].tolist())]
+    lines.append("\nTop Asks (price, quantity):")
+    lines += [f"{p},{q}" for p, q in zip(book.ask_px[:levels].tolist(), book.ask_qty[:levels].tolist())]
+    return "\n".join(lines)
+
+
+def format_depth_analytics(book: NumericOrderBook) -> str:
+    """Compact multi-depth summary for the prompt (empty string for an empty book)."""
+    if mid_price(book) is None:
+        return ""
+    lines = [
+        "Ratio Bids/Asks por profundidad: " + ", ".join(
+            f"top{depth}={values['bid_imbalance']:.2f}x" for depth, values in imbalance(book).items()
+        ),
+        "Profundidad ±% del mid (USDC bids/asks): " + ", ".join(
+            f"{pct}%={values['bid_notional']:.0f}/{values['ask_notional']:.0f}" for pct, values in depth_within(book).items()
+        ),
+        f"Mid ponderado por profundidad: {weighted_mid(book):.6f}",
+    ]
+    for side, walls in largest_walls(book).items():
+        lines.append(f"Muros {side}: " + ", ".join(
+            f"{w['price']}x{w['qty']:.2f} ({w['distance_pct']:+.2f}%)" for w in walls
+        ))
+    return "\n".join(lines)
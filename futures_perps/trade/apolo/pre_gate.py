@@ -0,0 +1,69 @@
+import threading
+from typing import List, NamedTuple, Optional
+
+# RSI beyond these levels vetoes the side outright
+RSI_VETO_BUY = 80
+RSI_VETO_SELL = 20
+# Maximum adverse move of the live price vs the candle close (%)
+MAX_PRICE_DELTA_PCT = 0.1
+
+
+class StructuralInputs(NamedTuple):
+    is_buy_structure: bool
+    is_sell_structure: bool
+    bid_imbalance: float
+    ask_imbalance: float
+    latest_rsi: Optional[float]
+    price_delta_pct: float
+    min_imbalance: float
+
+
+def structural_rejections(side: str, inputs: StructuralInputs) -> List[str]:
+    """Mixed-mode rules for one side; an empty list means the side passes."""
+    reasons = []
+    rsi = inputs.latest_rsi
+    if side == "BUY":
+        if not inputs.is_buy_structure: reasons.append("Estructura NO alcista")
+        if inputs.bid_imbalance < inputs.min_imbalance: reasons.append("Bids insuficientes")
+        if rsi and rsi > RSI_VETO_BUY: reasons.append(f"RSI >{RSI_VETO_BUY}: {rsi}")
+        if inputs.price_delta_pct < -MAX_PRICE_DELTA_PCT: reasons.append("Precio cayendo")
+    elif side == "SELL":
+        if not inputs.is_sell_structure: reasons.append("Estructura NO bajista")
+        if inputs.ask_imbalance < inputs.min_imbalance: reasons.append("Asks insuficientes")
+        if rsi and rsi < RSI_VETO_SELL: reasons.append(f"RSI <{RSI_VETO_SELL}: {rsi}")
+        if inputs.price_delta_pct > MAX_PRICE_DELTA_PCT: reasons.append("Precio subiendo")
+    else:
+        reasons.append(f"Lado no operable: {side}")
+    return reasons
+
+
+class PreGate:
+    """
+    Runs the mixed-mode structural rules before the LLM is asked.
+
+    An LLM approval is only kept in mixed mode if its side passes these rules,
+    so when neither BUY nor SELL can pass the call is pointless: the signal is
+    rejected right away with the failing reasons of both sides.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {"evaluated": 0, "skipped": 0, "passed": 0}
+
+    def evaluate(self, inputs: StructuralInputs) -> Optional[dict]:
+        """None when at least one side can pass (ask the LLM), else {side: [reasons]}."""
+        rejections = {side: structural_rejections(side, inputs) for side in ("BUY", "SELL")}
+        blocked = all(rejections.values())
+        with self._lock:
+            self.stats["evaluated"] += 1
+            self.stats["skipped" if blocked else "passed"] += 1
+        return rejections if blocked else None
+
+    def summary(self) -> str:
+        with self._lock:
+            return (f"LLM calls avoided by pre-gate: {self.stats['skipped']} of {self.stats['evaluated']} "
+                    f"({self.stats['passed']} passed)")
+
+
+# ✅ Shared pre-gate (counters cover every analyzed signal)
+pre_gate = PreGate()
@@ -0,0 +1,174 @@
+import math
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+from futures_perps.trade.apolo.kline_columns import KlineColumns, CANDLE_COLUMNS
+
+DEFAULT_PROMPT_TOKEN_BUDGET = 2500
+# Rough DeepSeek tokenizer ratio for Spanish text mixed with numbers
+CHARS_PER_TOKEN = 3.5
+# Never show fewer candles than this (the rules look at the last 3; the LLM needs some trend)
+MIN_HISTORY_ROWS = 12
+# ...nor more: older candles are summarized even when the budget would allow them
+MAX_HISTORY_ROWS = 30
+# Significant digits for columns that are not in price units (RSI, ADX, volume, ...)
+SIGNIFICANT_DIGITS = 4
+# Columns in price units are rounded to the quote tick; without it, to this many digits of the close
+PRICE_SIGNIFICANT_DIGITS = 6
+_PRICE_COLUMNS = ("open", "high", "low", "close")
+_PRICE_PREFIXES = ("ema_", "sma_", "bollinger_", "vwap", "sar", "tenkan_sen", "kijun_sen", "senkou_span", "atr_", "std_")
+# Kept even when the budget forces columns out (the structural rules and the RSI veto use them)
+_REQUIRED_COLUMNS = set(CANDLE_COLUMNS) | {"rsi_14"}
+
+
+def estimate_tokens(text: str) -> int:
+    return int(math.ceil(len(text) / CHARS_PER_TOKEN)) if text else 0
+
+
+def compact_block(text: str) -> str:
+    """Strip the source indentation of the prompt blocks and collapse blank runs."""
+    lines, blank = [], False
+    for line in text.strip().splitlines():
+        line = line.strip()
+        if not line:
+            if not blank:
+                lines.append("")
+            blank = True
+            continue
+        blank = False
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def tick_decimals(quote_tick: Optional[float]) -> Optional[int]:
+    """Decimals needed to write a price on the quote tick (0.01 → 2, 0.5 → 1), None if unknown."""
+    try:
+        tick = float(quote_tick)
+    except (TypeError, ValueError):
+        return None
+    if tick <= 0:
+        return None
+    return max(0, int(math.ceil(-math.log10(tick) - 1e-9)))
+
+
+def magnitude_decimals(value: float, digits: int) -> int:
+    """Decimals that give `value` `digits` significant digits in fixed notation (65012.3, 6 → 1)."""
+    if not value or value != value or math.isinf(value):
+        return 0
+    return max(0, digits - 1 - int(math.floor(math.log10(abs(value)))))
+
+
+def _significant(v: float) -> str:
+    """SIGNIFICANT_DIGITS in fixed notation (never 1.235e+05), trailing zeros dropped."""
+    text = f"{v:.{magnitude_decimals(v, SIGNIFICANT_DIGITS)}f}"
+    return text.rstrip("0").rstrip(".") if "." in text else text
+
+
+def _is_price_column(column: str) -> bool:
+    return column in _PRICE_COLUMNS or column.startswith(_PRICE_PREFIXES)
+
+
+def _formatter(column: str, decimals: int):
+    if _is_price_column(column):
+        return lambda v: "" if v != v else f"{v:.{decimals}f}"
+    return lambda v: "" if v != v else _significant(v)
+
+
+class PromptBudget:
+    """Token accounting for the prompt sections, in the order they are added."""
+
+    def __init__(self, budget_tokens: int = DEFAULT_PROMPT_TOKEN_BUDGET):
+        self.budget = budget_tokens
+        self.sections: Dict[str, int] = {}
+
+    def add(self, name: str, text: str) -> str:
+        text = compact_block(text)
+        self.sections[name] = estimate_tokens(text)
+        return text
+
+    def remaining(self) -> int:
+        return self.budget - sum(self.sections.values())
+
+    def total(self) -> int:
+        return sum(self.sections.values())
+
+    def report(self) -> str:
+        parts = ", ".join(f"{name}={tokens}" for name, tokens in self.sections.items())
+        return f"~{self.total()}/{self.budget} tokens ({parts})"
+
+
+class CandleHistory(NamedTuple):
+    text: str
+    rows_shown: int
+    rows_summarized: int
+    columns: List[str]
+
+
+def _summary_line(candles: KlineColumns, end: int, columns: List[str], decimals: int) -> str:
+    """Statistics of the candles [0, end) that do not get a row of their own."""
+    if end <= 0:
+        return ""
+    fmt = _formatter("close", decimals)
+    first_close, last_close = candles.close[0], candles.close[end - 1]
+    change = (last_close / first_close - 1) * 100 if first_close else 0.0
+    parts = [
+        f"cierre {fmt(first_close)}→{fmt(last_close)} ({change:+.2f}%)",
+        f"máx {fmt(np.nanmax(candles.high[:end]))}",
+        f"mín {fmt(np.nanmin(candles.low[:end]))}",
+        f"volumen medio {_significant(np.nanmean(candles.volume[:end]))}",
+    ]
+    for column in columns:
+        if column in CANDLE_COLUMNS:
+            continue
+        values = candles[column][:end]
+        if np.isnan(values).all():
+            continue
+        col_fmt = _formatter(column, decimals)
+        parts.append(f"{column} medio {col_fmt(np.nanmean(values))} ({col_fmt(np.nanmin(values))}–{col_fmt(np.nanmax(values))})")
+    return f"Resumen de las {end} velas anteriores: " + ", ".join(parts)
+
+
+def _rows_text(candles: KlineColumns, start: int, columns: List[str], decimals: int) -> str:
+    times = pd.to_datetime(candles.start_time[start:], unit="ms", utc=True).strftime("%m-%d %H:%M")
+    formatted = [[_formatter(c, decimals)(v) for v in candles[c][start:].tolist()] for c in columns]
+    lines = ["t," + ",".join(columns)]
+    lines += [",".join((t, *row)) for t, row in zip(times, zip(*formatted))]
+    return "\n".join(lines)
+
+
+def compact_candle_history(candles: KlineColumns, budget_tokens: int,
+                           quote_tick: Optional[float] = None) -> CandleHistory:
+    """
+    Candle history that fits `budget_tokens`: the most recent candles (at most
+    MAX_HISTORY_ROWS) as CSV rows (prices rounded to the quote tick, or to
+    PRICE_SIGNIFICANT_DIGITS of the last close without one; other values to SIGNIFICANT_DIGITS) and the
+    older ones folded into one statistical summary line. When even
+    MIN_HISTORY_ROWS rows do not fit, optional indicator columns are dropped
+    from the last one backwards.
+    """
+    n = len(candles)
+    decimals = tick_decimals(quote_tick)
+    if decimals is None:
+        decimals = magnitude_decimals(float(candles.close[-1]) if n else 0.0, PRICE_SIGNIFICANT_DIGITS)
+    columns = list(CANDLE_COLUMNS) + list(candles.indicators)
+
+    while True:
+        # Cost of one row from a sample of the newest ones; the header and summary are fixed costs
+        sample_start = max(0, n - 5)
+        sample = _rows_text(candles, sample_start, columns, decimals).split("\n")
+        header_cost = estimate_tokens(sample[0])
+        row_cost = max(1, estimate_tokens("\n".join(sample[1:])) / max(1, len(sample) - 1))
+        summary_cost = estimate_tokens(_summary_line(candles, max(0, n - MIN_HISTORY_ROWS), columns, decimals))
+        rows = int((budget_tokens - header_cost - summary_cost) // row_cost)
+        optional = [c for c in columns if c not in _REQUIRED_COLUMNS]
+        if rows >= min(MIN_HISTORY_ROWS, n) or not optional:
+            break
+        columns.remove(optional[-1])
+
+    rows = max(min(rows, n, MAX_HISTORY_ROWS), min(MIN_HISTORY_ROWS, n))
+    start = n - rows
+    summary = _summary_line(candles, start, columns, decimals)
+    table = _rows_text(candles, start, columns, decimals)
+    return CandleHistory("\n".join(part for part in (summary, table) if part), rows, start, columns)
@@ -0,0 +1,604 @@
+import copy
+import math
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from logs.log_config import apolo_trader_logger as logger
+from futures_perps.trade.apolo.kline_columns import KlineColumns, CANDLE_COLUMNS
+
+NAN = float("nan")
+# Emitted rows kept per engine (the prompt window reads the newest ones)
+HISTORY_ROWS = 300
+
+
+def _div(a: float, b: float) -> float:
+    """IEEE division (like NumPy/pandas): x/0 → ±inf, 0/0 → nan, instead of raising."""
+    if b == 0.0:
+        if a == 0.0 or a != a:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+# ---------------------------------------------------------------------------
+# Accumulators. Each one mirrors the pandas kernel that add_indicators uses so
+# the streamed values match the batch frame, not just approximate it.
+# ---------------------------------------------------------------------------
+
+class _EWMean:
+    """Series.ewm(span=span, adjust=False).mean()"""
+
+    def __init__(self, span: int):
+        com = (span - 1) / 2.0
+        alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - alpha
+        self.new_wt = alpha
+        self.weighted = NAN
+
+    def update(self, x: float) -> float:
+        if self.weighted != self.weighted:
+            self.weighted = x
+        elif x == x and self.weighted != x:
+            old_wt = self.old_wt_factor
+            self.weighted = (old_wt * self.weighted + self.new_wt * x) / (old_wt + self.new_wt)
+        return self.weighted
+
+
+class _RollingMean:
+    """Series.rolling(window, min_periods).mean() — Kahan sums, same-value and sign rules."""
+
+    def __init__(self, window: int, min_periods: Optional[int] = None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self.values = deque()
+        self._reset()
+
+    def _reset(self):
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.neg_ct = 0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_ct = 0
+        self.prev_value = NAN
+
+    def _add(self, val: float):
+        if val != val:
+            return
+        self.nobs += 1
+        y = val - self.comp_add
+        t = self.sum_x + y
+        self.comp_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+        self.same_ct = self.same_ct + 1 if val == self.prev_value else 1
+        self.prev_value = val
+
+    def _remove(self, val: float):
+        if val != val:
+            return
+        self.nobs -= 1
+        y = -val - self.comp_remove
+        t = self.sum_x + y
+        self.comp_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def update(self, x: float) -> float:
+        if self.window == 1:
+            # pandas restarts the accumulation when consecutive windows do not overlap
+            self.values.clear()
+            self._reset()
+        self.values.append(x)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._add(x)
+
+        if self.nobs >= self.min_periods and self.nobs > 0:
+            result = self.sum_x / self.nobs
+            if self.same_ct >= self.nobs:
+                return self.prev_value
+            if self.neg_ct == 0 and result < 0:
+                return 0.0
+            if self.neg_ct == self.nobs and result > 0:
+                return 0.0
+            return result
+        return NAN
+
+
+class _RollingStd:
+    """Series.rolling(window).std() — Welford add/remove with compensation."""
+
+    def __init__(self, window: int, ddof: int = 1):
+        self.window = window
+        self.ddof = ddof
+        self.values = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_ct = 0
+        self.prev_value = NAN
+
+    def _add(self, val: float):
+        if val != val:
+            return
+        self.same_ct = self.same_ct + 1 if val == self.prev_value else 1
+        self.prev_value = val
+        self.nobs += 1
+        prev_mean = self.mean_x - self.comp_add
+        y = val - self.comp_add
+        t = y - self.mean_x
+        self.comp_add = t + self.mean_x - y
+        self.mean_x += t / self.nobs
+        self.ssqdm_x += (val - prev_mean) * (val - self.mean_x)
+
+    def _remove(self, val: float):
+        if val != val:
+            return
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean_x - self.comp_remove
+            y = val - self.comp_remove
+            t = y - self.mean_x
+            self.comp_remove = t + self.mean_x - y
+            self.mean_x -= t / self.nobs
+            self.ssqdm_x -= (val - prev_mean) * (val - self.mean_x)
+        else:
+            self.mean_x = 0.0
+            self.ssqdm_x = 0.0
+
+    def update(self, x: float) -> float:
+        self.values.append(x)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._add(x)
+
+        if self.nobs >= self.window and self.nobs > self.ddof:
+            if self.nobs == 1 or self.same_ct >= self.nobs:
+                var = 0.0
+            else:
+                var = self.ssqdm_x / (self.nobs - self.ddof)
+            return math.sqrt(var) if var > 0 else 0.0
+        return NAN
+
+
+class _RollingExtreme:
+    """Series.rolling(window).max()/min() with a monotonic deque (amortized O(1))."""
+
+    def __init__(self, window: int, is_max: bool):
+        self.window = window
+        self.is_max = is_max
+        self.i = -1
+        self.candidates = deque()  # (index, value), monotonic
+
+    def update(self, x: float) -> float:
+        self.i += 1
+        while self.candidates and self.candidates[0][0] <= self.i - self.window:
+            self.candidates.popleft()
+        if self.is_max:
+            while self.candidates and self.candidates[-1][1] <= x:
+                self.candidates.pop()
+        else:
+            while self.candidates and self.candidates[-1][1] >= x:
+                self.candidates.pop()
+        self.candidates.append((self.i, x))
+        return self.candidates[0][1] if self.i >= self.window - 1 else NAN
+
+
+class _Lag:
+    """Value from `periods` updates ago (Series.shift(periods))."""
+
+    def __init__(self, periods: int):
+        self.buf = deque(maxlen=periods + 1)
+
+    def update(self, x: float) -> float:
+        self.buf.append(x)
+        return self.buf[0] if len(self.buf) == self.buf.maxlen else NAN
+
+
+# ---------------------------------------------------------------------------
+# Per-feature states. update(bar) receives {"high", "low", "close", "volume"}
+# (floats) plus "prev_close" and returns {column: value}.
+# ---------------------------------------------------------------------------
+
+def _true_range(bar: dict) -> float:
+    high, low, prev_close = bar["high"], bar["low"], bar["prev_close"]
+    if prev_close != prev_close:
+        return high - low
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+
+class _EMAState:
+    def __init__(self, feature, window):
+        self.feature = feature
+        self.ema = _EWMean(window)
+
+    def update(self, bar):
+        return {self.feature: self.ema.update(bar["close"])}
+
+
+class _MACDState:
+    def __init__(self):
+        self.fast, self.slow, self.signal = _EWMean(12), _EWMean(26), _EWMean(9)
+
+    def update(self, bar):
+        macd = self.fast.update(bar["close"]) - self.slow.update(bar["close"])
+        return {"macd": macd, "macd_signal": self.signal.update(macd)}
+
+
+class _ATRState:
+    def __init__(self, feature, window):
+        self.feature = feature
+        self.mean = _RollingMean(window)
+
+    def update(self, bar):
+        return {self.feature: self.mean.update(_true_range(bar))}
+
+
+class _BollingerState:
+    def __init__(self, window=20):
+        self.mean, self.std = _RollingMean(window), _RollingStd(window)
+
+    def update(self, bar):
+        mavg, std = self.mean.update(bar["close"]), self.std.update(bar["close"])
+        return {"bollinger_hband": mavg + (std * 2), "bollinger_lband": mavg - (std * 2)}
+
+
+class _StdState:
+    def __init__(self, feature, window):
+        self.feature = feature
+        self.std = _RollingStd(window)
+
+    def update(self, bar):
+        return {self.feature: self.std.update(bar["close"])}
+
+
+class _RSIState:
+    """rsi_N from add_indicators: rolling(min_periods=1) means, 100 when there are no losses."""
+
+    def __init__(self, feature, window):
+        self.feature = feature
+        self.gain, self.loss = _RollingMean(window, 1), _RollingMean(window, 1)
+
+    def update(self, bar):
+        delta = bar["close"] - bar["prev_close"]
+        avg_gain = self.gain.update(delta if delta > 0 else 0.0)
+        avg_loss = self.loss.update(-(delta if delta < 0 else 0.0))
+        if avg_loss == 0:
+            return {self.feature: 100.0}
+        return {self.feature: 100 - (100 / (1 + _div(avg_gain, avg_loss)))}
+
+
+class _StochState:
+    def __init__(self, window):
+        self.window = window
+        self.low_min, self.high_max = _RollingExtreme(window, False), _RollingExtreme(window, True)
+        self.d = _RollingMean(3)
+
+    def update(self, bar):
+        low_min = self.low_min.update(bar["low"])
+        high_max = self.high_max.update(bar["high"])
+        k = _div(bar["close"] - low_min, high_max - low_min) * 100
+        return {f"stoch_k_{self.window}": k, f"stoch_d_{self.window}": self.d.update(k)}
+
+
+class _MomentumState:
+    def __init__(self, feature, window):
+        self.feature = feature
+        self.lag = _Lag(window)
+
+    def update(self, bar):
+        return {self.feature: bar["close"] - self.lag.update(bar["close"])}
+
+
+class _ROCState:
+    def __init__(self, feature, window):
+        self.feature = feature
+        self.lag = _Lag(window)
+
+    def update(self, bar):
+        return {self.feature: (_div(bar["close"], self.lag.update(bar["close"])) - 1) * 100}
+
+
+class _ADXState:
+    def __init__(self, feature, window):
+        self.feature = feature
+        self.prev_high = self.prev_low = NAN
+        self.plus_dm, self.minus_dm = _RollingMean(window), _RollingMean(window)
+        self.tr_a, self.tr_b = _RollingMean(window), _RollingMean(window)
+        self.adx = _RollingMean(window)
+
+    def update(self, bar):
+        up = bar["high"] - self.prev_high
+        down = bar["low"] - self.prev_low
+        self.prev_high, self.prev_low = bar["high"], bar["low"]
+        tr = _true_range(bar)
+        plus_di = 100 * _div(self.plus_dm.update(up if up > 0 else 0.0), self.tr_a.update(tr))
+        minus_di = 100 * _div(self.minus_dm.update(-(down if down < 0 else 0.0)), self.tr_b.update(tr))
+        dx = _div(100 * abs(plus_di - minus_di), plus_di + minus_di)
+        return {self.feature: self.adx.update(dx)}
+
+
+class _MidpointState:
+    """tenkan_sen_N / kijun_sen_N: (highest high + lowest low) / 2."""
+
+    def __init__(self, feature, window):
+        self.feature = feature
+        self.high_max, self.low_min = _RollingExtreme(window, True), _RollingExtreme(window, False)
+
+    def update(self, bar):
+        return {self.feature: (self.high_max.update(bar["high"]) + self.low_min.update(bar["low"])) / 2}
+
+
+class _SenkouAState:
+    def __init__(self):
+        self.tenkan, self.kijun = _MidpointState("t", 9), _MidpointState("k", 26)
+        self.lag = _Lag(26)
+
+    def update(self, bar):
+        line = (self.tenkan.update(bar)["t"] + self.kijun.update(bar)["k"]) / 2
+        return {"senkou_span_a": self.lag.update(line)}
+
+
+class _SenkouBState:
+    def __init__(self):
+        self.mid = _MidpointState("m", 52)
+        self.lag = _Lag(26)
+
+    def update(self, bar):
+        return {"senkou_span_b": self.lag.update(self.mid.update(bar)["m"])}
+
+
+class _SARState:
+    """Same recurrence as the add_indicators SAR (first candle has no value)."""
+
+    def __init__(self):
+        self.n = 0
+        self.af, self.max_af = 0.02, 0.2
+        self.ep = self.sar = NAN
+        self.trend = 1
+
+    def update(self, bar):
+        self.n += 1
+        if self.n == 1:
+            self.ep, self.sar = bar["high"], bar["low"]
+            return {"sar": NAN}
+        self.sar = self.sar + self.af * (self.ep - self.sar)
+        if self.trend == 1:
+            if bar["low"] < self.sar:
+                self.trend, self.sar, self.ep, self.af = -1, self.ep, bar["low"], 0.02
+        else:
+            if bar["high"] > self.sar:
+                self.trend, self.sar, self.ep, self.af = 1, self.ep, bar["high"], 0.02
+        if self.af < self.max_af:
+            self.af += 0.02
+        return {"sar": self.sar}
+
+
+class _VWAPState:
+    def __init__(self):
+        self.pv_sum = 0.0
+        self.v_sum = 0.0
+
+    def update(self, bar):
+        self.pv_sum += bar["volume"] * (bar["high"] + bar["low"] + bar["close"]) / 3
+        self.v_sum += bar["volume"]
+        return {"vwap": _div(self.pv_sum, self.v_sum)}
+
+
+def _window(feature: str, default: int = None, last: bool = False) -> int:
+    parts = feature.split("_")
+    if len(parts) < 2:
+        if default is None:
+            raise ValueError(f"No window in feature: {feature}")
+        return default
+    return int(parts[-1] if last else parts[1])
+
+
+def _build_state(feature: str, shared: dict):
+    """State object for one requested feature (None for base columns)."""
+    if feature in ("close", "high", "low", "volume"):
+        return None
+    if feature in ("macd", "macd_signal"):
+        return shared.setdefault("macd", _MACDState())
+    if feature in ("bollinger_hband", "bollinger_lband"):
+        return shared.setdefault("bollinger", _BollingerState())
+    if feature.startswith("stoch_"):
+        window = _window(feature, last=True)
+        return shared.setdefault(f"stoch_{window}", _StochState(window))
+    if feature.startswith("ema_"):
+        return _EMAState(feature, _window(feature))
+    if feature.startswith("atr_"):
+        return _ATRState(feature, _window(feature))
+    if feature.startswith("std_"):
+        return _StdState(feature, _window(feature))
+    if feature.startswith("rsi_"):
+        return _RSIState(feature, _window(feature))
+    if feature.startswith("momentum_"):
+        return _MomentumState(feature, _window(feature))
+    if feature.startswith("roc_"):
+        return _ROCState(feature, _window(feature))
+    if feature.startswith("adx"):
+        return _ADXState(feature, _window(feature, default=14))
+    if feature.startswith("tenkan_sen_") or feature.startswith("kijun_sen_"):
+        return _MidpointState(feature, _window(feature, last=True))
+    if feature.startswith("senkou_span_a"):
+        return _SenkouAState()
+    if feature.startswith("senkou_span_b"):
+        return _SenkouBState()
+    if feature == "sar":
+        return _SARState()
+    if feature == "vwap":
+        return _VWAPState()
+    raise ValueError(f"Unsupported streaming feature: {feature}")
+
+
+class IndicatorEngine:
+    """
+    Incremental version of add_indicators for one (symbol, interval, feature set).
+
+    update(candle) costs O(1) per feature (amortized for rolling min/max) and
+    returns the row add_indicators would produce for that candle: inf → nan,
+    forward-filled, and None while any requested column is still warming up
+    (add_indicators drops those rows). When rsi_14 is not requested it is
+    appended the same way add_indicators does, starting from the first
+    emitted row.
+
+    The newest HISTORY_ROWS emitted rows are kept with their candles, so
+    window() gives the KlineColumns the batch pass would for the same candles
+    without recomputing them. `lock` guards an engine shared by the candle-close
+    feed and the autotrade cycle.
+    """
+
+    def __init__(self, features: List[str], history: int = HISTORY_ROWS):
+        self.features = list(features)
+        self.lock = threading.Lock()
+        self.history = deque(maxlen=history)  # (candle, row) of the emitted rows, oldest first
+        self.reset()
+
+    def reset(self):
+        """Forget every candle fed so far (e.g. after a gap in the stream)."""
+        shared = {}
+        self.states = []
+        for feature in self.features:
+            try:
+                state = _build_state(feature, shared)
+            except (IndexError, ValueError):
+                logger.warning(f"⚠️ Could not extract window for feature: {feature}")
+                continue
+            if state is not None and all(state is not s for s in self.states):
+                self.states.append(state)
+
+        self.columns = list(self.features)
+        self.prev_close = NAN
+        self.last_valid: Dict[str, float] = {}
+        self.ready = False
+        self.rows_seen = 0
+        self.last_ts: Optional[int] = None  # start_timestamp of the last candle fed
+        self.history.clear()
+
+        # Post-dropna rsi_14 (plain rolling(14) means, not cleaned)
+        self.needs_entropy_rsi = "rsi_14" not in self.features
+        self._entropy_prev_close = NAN
+        self._entropy_gain = _RollingMean(14)
+        self._entropy_loss = _RollingMean(14)
+
+    def update(self, candle: dict) -> Optional[dict]:
+        bar = {
+            "high": float(candle["high"]),
+            "low": float(candle["low"]),
+            "close": float(candle["close"]),
+            "volume": float(candle["volume"]),
+            "prev_close": self.prev_close,
+        }
+        self.prev_close = bar["close"]
+        self.rows_seen += 1
+        if "start_timestamp" in candle:
+            self.last_ts = int(candle["start_timestamp"])
+
+        values = {"close": bar["close"], "high": bar["high"], "low": bar["low"], "volume": bar["volume"]}
+        for state in self.states:
+            values.update(state.update(bar))
+
+        row = {}
+        for column in self.columns:
+            value = values.get(column, NAN)
+            if value != value or value in (math.inf, -math.inf):
+                value = self.last_valid.get(column, NAN)
+            else:
+                self.last_valid[column] = value
+            row[column] = value
+
+        if not self.ready:
+            if any(v != v for v in row.values()):
+                return None
+            self.ready = True
+
+        if self.needs_entropy_rsi:
+            row["rsi_14"] = self._entropy_rsi(bar["close"])
+        if "start_timestamp" in candle:
+            row["start_timestamp"] = candle["start_timestamp"]
+        self.history.append((candle, row))
+        return row
+
+    def preview(self, candle: dict) -> Optional[dict]:
+        """Row for a candle that is still forming, leaving the engine as it was."""
+        clone = copy.copy(self)
+        clone.states = copy.deepcopy(self.states)
+        clone.last_valid = dict(self.last_valid)
+        clone._entropy_gain = copy.deepcopy(self._entropy_gain)
+        clone._entropy_loss = copy.deepcopy(self._entropy_loss)
+        clone.history = deque(maxlen=1)
+        return clone.update(candle)
+
+    def window(self, limit: int, forming: Optional[dict] = None) -> Optional[KlineColumns]:
+        """
+        The newest `limit` emitted rows (the last one for `forming`, when given) as
+        KlineColumns with the indicator columns attached; None before the first row.
+        """
+        items = list(self.history)[-max(0, limit - (forming is not None)):]
+        if forming is not None:
+            row = self.preview(forming)
+            if row is not None:
+                items.append((forming, row))
+        if not items:
+            return None
+        candles = [candle for candle, _ in items]
+        columns = [column for column in items[-1][1] if column != "start_timestamp" and column not in CANDLE_COLUMNS]
+        return KlineColumns(
+            np.array([int(c["start_timestamp"]) for c in candles], dtype=np.int64),
+            *(np.array([float(c[column]) for c in candles], dtype=np.float64) for column in CANDLE_COLUMNS),
+            indicators={column: np.array([row[column] for _, row in items], dtype=np.float64) for column in columns},
+        )
+
+    def _entropy_rsi(self, close: float) -> float:
+        delta = close - self._entropy_prev_close
+        self._entropy_prev_close = close
+        gain = self._entropy_gain.update(delta if delta > 0 else 0.0)
+        loss = self._entropy_loss.update(-(delta if delta < 0 else 0.0))
+        return 100 - _div(100, 1 + _div(gain, loss))
+
+    def warm_up(self, candles: List[dict]) -> List[dict]:
+        """Feed historical candles (oldest → newest); returns the emitted rows."""
+        rows = []
+        for candle in candles:
+            row = self.update(candle)
+            if row is not None:
+                rows.append(row)
+        return rows
+
+
+_engines: Dict[tuple, IndicatorEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_indicator_engine(symbol: str, interval: str, features: List[str]) -> IndicatorEngine:
+    """Shared engine per (symbol, interval, feature set); created empty on first use."""
+    key = (symbol, interval, tuple(features))
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = IndicatorEngine(features)
+            _engines[key] = engine
+        return engine
+
+
+def engines_for(symbol: str, interval: str) -> List[IndicatorEngine]:
+    """Every engine following (symbol, interval), whatever its feature set."""
+    with _engines_lock:
+        return [engine for key, engine in _engines.items() if key[:2] == (symbol, interval)]
+
+
+def reset_indicator_engines(symbol: str = None, interval: str = None):
+    """Drop engine state, e.g. after a kline gap forces a backfill."""
+    with _engines_lock:
+        for key in list(_engines):
+            if (symbol is None or key[0] == symbol) and (interval is None or key[1] == interval):
+                del _engines[key]
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import base58
+import pytest
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The Orderly client is configured at import time; tests never reach the exchange
+os.environ.setdefault("ORDERLY_SECRET", base58.b58encode(bytes(range(32))).decode())
+os.environ.setdefault("ORDERLY_PUBLIC_KEY", "ed25519:test")
+os.environ.setdefault("ORDERLY_ACCOUNT_ID", "0xtest")
+os.environ.setdefault("ORDERLY_BASE_URL", "http://127.0.0.1:9")
+# ...and so is the Telegram bot used for notifications
+os.environ.setdefault("API_TOKEN", "123456:test")
+os.environ.setdefault("TELEGRAM_CHAT_ID", "1")
+
+
+@pytest.fixture
+def settings_db(tmp_path, monkeypatch):
+    """Fresh settings database with the default settings; returns db_ops for upsert_setting."""
+    import db.db_ops as db_ops
+    monkeypatch.setattr(db_ops, "DB_PATH", str(tmp_path / "trading.db"))
+    db_ops.initialize_database_tables()
+    return db_ops
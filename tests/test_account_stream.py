@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import orjson
+
+from trading_bot.account_stream import AccountStream
+from trading_bot.rate_limiter import PRIORITY_HIGH
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.content = orjson.dumps(payload)
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeClient:
+    """OrderlyClient stand-in whose /v1/positions reports `free_collateral` (or fails)."""
+    account_id = "0xtest"
+
+    def __init__(self, free_collateral=1000.0):
+        self.free_collateral = free_collateral
+        self.fail = False
+        self.calls = []
+
+    def get(self, path, priority=None, **kwargs):
+        self.calls.append((path, priority))
+        if self.fail:
+            raise ConnectionError("exchange down")
+        return FakeResponse({"success": True, "data": {
+            "free_collateral": self.free_collateral,
+            "rows": [{"symbol": "PERP_BTC_USDC", "position_qty": 0.5, "average_open_price": 100.0,
+                      "mark_price": 101.0, "unsettled_pnl": 0.5}],
+        }})
+
+
+class FakeLoop:
+    def __init__(self):
+        self.scheduled = 0
+
+    def call_later(self, delay, callback):
+        self.scheduled += 1
+
+
+def synced_stream(client):
+    stream = AccountStream(client)
+    stream._connected = True
+    stream.refresh_snapshot()
+    return stream
+
+
+def push(stream, loop, topic, data):
+    asyncio.run(stream._on_message(None, orjson.dumps({"topic": topic, "data": data}), loop))
+
+
+def test_reads_wait_for_the_first_snapshot():
+    client = FakeClient()
+    stream = AccountStream(client)
+    assert stream.get_free_collateral() is None and stream.open_positions() is None
+    stream._connected = True
+    stream.refresh_snapshot()
+    assert stream.get_free_collateral() == 1000.0
+    assert [p.symbol for p in stream.open_positions()] == ["PERP_BTC_USDC"]
+
+
+def test_stale_collateral_is_re_read_before_sizing():
+    client = FakeClient()
+    stream = synced_stream(client)
+    client.free_collateral = 750.0
+    assert stream.get_free_collateral(max_age=3.0) == 1000.0      # fresh enough
+    stream.synced_at = time.time() - 10
+    assert stream.get_free_collateral(max_age=3.0, priority=PRIORITY_HIGH) == 750.0
+    assert client.calls[-1] == ("/v1/positions", PRIORITY_HIGH)
+
+
+def test_failed_re_read_falls_back_to_rest():
+    client = FakeClient()
+    stream = synced_stream(client)
+    stream.synced_at = time.time() - 10
+    client.fail = True
+    assert stream.get_free_collateral(max_age=3.0) is None
+    assert stream.get_free_collateral() == 1000.0
+
+
+def test_only_size_changes_schedule_a_snapshot():
+    stream = synced_stream(FakeClient())
+    loop = FakeLoop()
+    push(stream, loop, "position", {"positions": [{"symbol": "PERP_BTC_USDC", "markPrice": 102.0}]})
+    assert loop.scheduled == 0 and stream.positions["PERP_BTC_USDC"].mark_price == 102.0
+    assert stream.positions["PERP_BTC_USDC"].position_qty == 0.5
+    push(stream, loop, "position", {"positions": [{"symbol": "PERP_BTC_USDC", "positionQty": 0.0}]})
+    assert loop.scheduled == 1 and stream.open_positions() == []
+
+
+def test_execution_reports_track_open_orders():
+    stream = synced_stream(FakeClient())
+    loop = FakeLoop()
+    push(stream, loop, "executionreport", {"orderId": 1, "status": "NEW"})
+    push(stream, loop, "executionreport", {"orderId": 2, "status": "NEW"})
+    push(stream, loop, "executionreport", {"orderId": 1, "status": "FILLED"})
+    assert [order["orderId"] for order in stream.open_orders()] == [2]
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from futures_perps.trade.apolo.batch_indicators import compute_indicator_columns
+from futures_perps.trade.apolo.historical_data import add_indicators, strategy_features
+from futures_perps.trade.apolo.kline_columns import columns_from_klines
+from trading_bot.orderly_types import Kline
+
+STEP = 60_000
+FEATURE_SETS = sorted({tuple(info["features"]) for strategies in strategy_features.values()
+                       for info in strategies.values()})
+
+
+def random_columns(n, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    high = close * (1 + rng.uniform(0, 0.01, n))
+    low = close * (1 - rng.uniform(0, 0.01, n))
+    volume = rng.uniform(1, 100, n)
+    return columns_from_klines([Kline(i * STEP, (i + 1) * STEP, close[i], high[i], low[i], close[i], volume[i], 0.0)
+                                for i in range(n)])
+
+
+@pytest.mark.parametrize("features", FEATURE_SETS)
+def test_batch_pass_matches_add_indicators(features):
+    # Two symbols share a group, the shorter one (a recent listing) gets its own
+    candles = {"PERP_BTC_USDC": random_columns(80, 1), "PERP_ETH_USDC": random_columns(80, 2),
+               "PERP_NEW_USDC": random_columns(60, 3)}
+    results = compute_indicator_columns(candles, list(features))
+    assert set(results) == set(candles)
+
+    for symbol, columns in candles.items():
+        expected = add_indicators(columns.to_frame(), list(features)).reset_index(drop=True)
+        frame = results[symbol].to_frame().reset_index(drop=True)
+        assert len(frame) == len(expected), symbol
+        assert list(frame.columns) == list(expected.columns), symbol
+        for column in expected.columns:
+            if column == "start_timestamp":
+                assert (frame[column] == expected[column]).all()
+                continue
+            assert np.allclose(frame[column].to_numpy(float), expected[column].to_numpy(float),
+                               rtol=1e-9, atol=1e-9, equal_nan=True), (symbol, column)
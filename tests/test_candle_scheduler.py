@@ -0,0 +1,30 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from futures_perps.trade.apolo.candle_scheduler import CandleScheduler, next_candle_close_ms
+
+
+def ms(*args) -> int:
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def test_next_close_is_the_next_boundary():
+    assert next_candle_close_ms("1m", ms(2024, 1, 3, 10, 0, 30)) == ms(2024, 1, 3, 10, 1)
+    assert next_candle_close_ms("5m", ms(2024, 1, 3, 10, 7, 59)) == ms(2024, 1, 3, 10, 10)
+    assert next_candle_close_ms("1h", ms(2024, 1, 3, 10, 59, 59)) == ms(2024, 1, 3, 11)
+
+
+def test_exactly_on_a_boundary_gives_the_following_one():
+    assert next_candle_close_ms("15m", ms(2024, 1, 3, 10, 15)) == ms(2024, 1, 3, 10, 30)
+
+
+def test_weekly_candles_close_on_monday():
+    # 2024-01-03 was a Wednesday; the week closes on Monday 2024-01-08 00:00 UTC
+    assert next_candle_close_ms("1w", ms(2024, 1, 3, 12)) == ms(2024, 1, 8)
+    assert next_candle_close_ms("1w", ms(2024, 1, 8)) == ms(2024, 1, 15)
+
+
+def test_unsupported_interval():
+    with pytest.raises(ValueError):
+        CandleScheduler("7m")
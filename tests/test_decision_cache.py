@@ -0,0 +1,66 @@
+import threading
+import time
+
+import numpy as np
+
+from futures_perps.trade.apolo.decision_cache import (
+    DecisionCache, DecisionKey, last_closed_candle_ts, prompt_fingerprint,
+)
+from futures_perps.trade.apolo.kline_buffer import INTERVAL_MS
+
+STEP = INTERVAL_MS["1h"]
+
+
+def key(candle_ts=1_700_000_000_000, prompt_hash="abc"):
+    return DecisionKey("PERP_BTC_USDC", "1h", "Trend-Following", candle_ts, "user_only", prompt_hash)
+
+
+def test_decisions_are_reused_within_the_candle(settings_db):
+    cache = DecisionCache()
+    assert cache.get(key()) is None
+    cache.put(key(), {"approved": True, "side": "BUY"})
+    assert cache.get(key()) == {"approved": True, "side": "BUY"}
+    assert cache.get(key(candle_ts=1_700_000_000_000 + STEP)) is None
+    assert cache.get(key(prompt_hash=prompt_fingerprint("new prompt"))) is None
+    assert cache.get(key(), bypass=True) is None
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 3 and cache.stats["bypassed"] == 1
+
+
+def test_expired_and_excess_decisions_are_evicted(settings_db):
+    cache = DecisionCache(max_age=60, max_entries=2)
+    for i in range(3):
+        cache.put(key(candle_ts=i), {"i": i})
+    assert settings_db.evict_llm_decisions(60, 2) == 1
+    assert cache.get(key(candle_ts=0)) is None and cache.get(key(candle_ts=2)) == {"i": 2}
+
+    cache.max_age = 0.05
+    time.sleep(0.1)
+    assert cache.get(key(candle_ts=2)) is None
+
+
+def test_overlapping_analysis_waits_for_the_call_in_flight(settings_db):
+    cache = DecisionCache()
+    calls = []
+
+    def analyze():
+        with cache.lock(key()):
+            decision = cache.get(key())
+            if decision is None:
+                calls.append(1)
+                time.sleep(0.1)
+                cache.put(key(), {"approved": False})
+
+    threads = [threading.Thread(target=analyze) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1 and cache.stats["hits"] == 2
+    assert cache._locks == {}
+
+
+def test_last_closed_candle_skips_the_forming_one():
+    now = 10 * STEP + 5
+    assert last_closed_candle_ts(np.array([8 * STEP, 9 * STEP, 10 * STEP]), "1h", now) == 9 * STEP
+    assert last_closed_candle_ts(np.array([8 * STEP, 9 * STEP]), "1h", now) == 9 * STEP
+    assert last_closed_candle_ts(np.array([]), "1h", now) is None
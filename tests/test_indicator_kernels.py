@@ -0,0 +1,16 @@
+import numpy as np
+
+from benchmarks.bench_sar import legacy_sar, make_candles
+from futures_perps.trade.apolo.indicator_kernels import parabolic_sar
+
+
+def test_sar_matches_the_legacy_pandas_loop():
+    for seed in range(5):
+        df = make_candles(500, seed)
+        expected = legacy_sar(df.copy()).to_numpy()
+        assert np.array_equal(parabolic_sar(df["high"].to_numpy(), df["low"].to_numpy()), expected, equal_nan=True)
+
+
+def test_sar_edge_lengths():
+    assert len(parabolic_sar([], [])) == 0
+    assert np.isnan(parabolic_sar([101.0], [99.0])).all()
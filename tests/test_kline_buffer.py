@@ -0,0 +1,82 @@
+import time
+
+from futures_perps.trade.apolo.kline_buffer import INTERVAL_MS, KlineBuffer
+from trading_bot.orderly_types import Kline
+
+SYMBOL, INTERVAL = "PERP_BTC_USDC", "1m"
+STEP = INTERVAL_MS[INTERVAL]
+
+
+def kline(start, close=100.0):
+    return Kline(start, start + STEP, close, close + 1, close - 1, close, 10.0, 1000.0)
+
+
+class FakeExchange:
+    """fetch_rows stand-in serving the newest `limit` candles up to the current one."""
+
+    def __init__(self, count=200):
+        self.now = (int(time.time() * 1000) // STEP) * STEP
+        self.candles = {self.now - i * STEP: kline(self.now - i * STEP) for i in range(count)}
+        self.limits = []
+
+    def __call__(self, symbol, interval, limit):
+        self.limits.append(limit)
+        return [self.candles[ts] for ts in sorted(self.candles)[-limit:]]
+
+
+def test_warm_buffer_only_fetches_the_newest_candles():
+    exchange = FakeExchange()
+    buffer = KlineBuffer(exchange)
+    first = buffer.get_rows(SYMBOL, INTERVAL, 80)
+    exchange.candles[exchange.now] = kline(exchange.now, 105.0)   # the forming candle moved
+    rows = buffer.get_rows(SYMBOL, INTERVAL, 80)
+
+    assert exchange.limits[0] == 80 and exchange.limits[1] <= 3
+    assert [r.start_timestamp for r in rows] == [r.start_timestamp for r in first]
+    assert rows[-1].close == 105.0
+    assert buffer.stats["full_fetches"] == 1 and buffer.stats["delta_fetches"] == 1
+
+
+def test_larger_window_than_stored_refetches():
+    exchange = FakeExchange()
+    buffer = KlineBuffer(exchange)
+    buffer.get_rows(SYMBOL, INTERVAL, 50)
+    assert len(buffer.get_rows(SYMBOL, INTERVAL, 120)) == 120
+    assert exchange.limits == [50, 120]
+
+
+def test_hole_in_the_delta_backfills():
+    exchange = FakeExchange()
+    buffer = KlineBuffer(exchange)
+    buffer.get_rows(SYMBOL, INTERVAL, 80)
+    series = buffer._series[(SYMBOL, INTERVAL)]
+    for _ in range(10):                       # the buffer last saw the candle 10 steps ago...
+        series.pop()
+    for i in range(5, 10):                    # ...and the exchange skips 5 of the candles since
+        del exchange.candles[exchange.now - i * STEP]
+    rows = buffer.get_rows(SYMBOL, INTERVAL, 20)
+    assert buffer.stats["gap_backfills"] == 1 and exchange.limits[-1] == 20
+    assert rows[-1].start_timestamp == exchange.now
+
+
+def test_append_closed_only_extends_a_contiguous_series():
+    exchange = FakeExchange()
+    buffer = KlineBuffer(exchange)
+    assert not buffer.append_closed(SYMBOL, INTERVAL, kline(exchange.now))   # nothing stored yet
+    buffer.get_rows(SYMBOL, INTERVAL, 10)
+    assert buffer.append_closed(SYMBOL, INTERVAL, kline(exchange.now, 101.0))           # replaces the newest row
+    assert buffer.append_closed(SYMBOL, INTERVAL, kline(exchange.now + STEP))           # next candle
+    assert not buffer.append_closed(SYMBOL, INTERVAL, kline(exchange.now + 3 * STEP))   # gap
+    series = buffer._series[(SYMBOL, INTERVAL)]
+    assert series[-2].close == 101.0 and series[-1].start_timestamp == exchange.now + STEP
+
+
+def test_invalidate_forces_a_full_fetch():
+    exchange = FakeExchange()
+    buffer = KlineBuffer(exchange)
+    buffer.get_rows(SYMBOL, INTERVAL, 30)
+    buffer.get_rows("PERP_ETH_USDC", INTERVAL, 30)
+    buffer.invalidate(symbol=SYMBOL)
+    assert (SYMBOL, INTERVAL) not in buffer._series and ("PERP_ETH_USDC", INTERVAL) in buffer._series
+    buffer.get_rows(SYMBOL, INTERVAL, 30)
+    assert buffer.stats["full_fetches"] == 3
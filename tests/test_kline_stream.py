@@ -0,0 +1,93 @@
+import threading
+import time
+
+from futures_perps.trade.apolo.kline_buffer import INTERVAL_MS, KlineBuffer
+from futures_perps.trade.apolo.kline_stream import KlineStream
+from trading_bot.orderly_types import Kline
+
+SYMBOL, INTERVAL = "PERP_BTC_USDC", "1m"
+STEP = INTERVAL_MS[INTERVAL]
+
+
+def kline(start, close=100.0):
+    return Kline(start, start + STEP, close, close + 1, close - 1, close, 10.0, 1000.0)
+
+
+class FakeHub:
+    def __init__(self):
+        self.handlers = {}
+
+    def add_handler(self, topic, handler):
+        self.handlers[topic] = handler
+
+    def push(self, start, close=100.0):
+        self.handlers[f"{SYMBOL}@kline_{INTERVAL}"]({
+            "topic": f"{SYMBOL}@kline_{INTERVAL}",
+            "data": {"startTime": start, "endTime": start + STEP, "open": close, "high": close + 1,
+                     "low": close - 1, "close": close, "volume": 10.0, "amount": 1000.0},
+        })
+
+
+class BlockingFetch:
+    """fetch_rows that serves `rows`, blocking while `gate` is clear (a slow REST call)."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.gate = threading.Event()
+        self.gate.set()
+        self.fetching = threading.Event()
+
+    def __call__(self, symbol, interval, limit):
+        self.fetching.set()
+        self.gate.wait(5)
+        return list(self.rows)
+
+
+def make_stream(start):
+    fetch = BlockingFetch([kline(start - STEP * i) for i in range(5)])
+    buffer = KlineBuffer(fetch)
+    buffer.get_rows(SYMBOL, INTERVAL, 5)
+    hub = FakeHub()
+    stream = KlineStream(hub, buffer)
+    stream.subscribe(SYMBOL, INTERVAL)
+    return hub, stream, buffer, fetch
+
+
+def test_closed_candle_is_stored_and_signalled():
+    start = (int(time.time() * 1000) // STEP - 1) * STEP
+    hub, stream, buffer, _ = make_stream(start)
+    hub.push(start, 101.0)
+    hub.push(start + STEP, 102.0)
+    event = stream.wait_for_close(SYMBOL, INTERVAL, start - 1, timeout=2)
+    assert event is not None and event.candle.close == 101.0
+    assert buffer._series[(SYMBOL, INTERVAL)][-1].close == 101.0
+
+
+def test_hub_thread_never_waits_for_a_fetch_in_flight():
+    start = (int(time.time() * 1000) // STEP - 1) * STEP
+    hub, stream, buffer, fetch = make_stream(start)
+    fetch.gate.clear()
+    fetch.fetching.clear()
+    worker = threading.Thread(target=buffer.get_rows, args=(SYMBOL, INTERVAL, 50))  # holds the series lock
+    worker.start()
+    assert fetch.fetching.wait(2)
+
+    started = time.monotonic()
+    hub.push(start, 101.0)
+    hub.push(start + STEP, 102.0)
+    assert time.monotonic() - started < 0.1
+    assert stream.wait_for_close(SYMBOL, INTERVAL, start - 1, timeout=0.2) is None
+
+    fetch.gate.set()
+    worker.join(2)
+    assert stream.wait_for_close(SYMBOL, INTERVAL, start - 1, timeout=2) is not None
+
+
+def test_late_messages_for_closed_candles_are_ignored():
+    start = (int(time.time() * 1000) // STEP - 1) * STEP
+    hub, stream, _, _ = make_stream(start)
+    hub.push(start)
+    hub.push(start + STEP)
+    hub.push(start, 99.0)
+    stream.wait_for_close(SYMBOL, INTERVAL, start - 1, timeout=2)
+    assert stream.stats()["closes"] == 1
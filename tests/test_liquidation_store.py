@@ -0,0 +1,121 @@
+import time
+
+import orjson
+
+import futures_perps.trade.apolo.historical_data as historical_data
+from futures_perps.trade.apolo.historical_data import LiquidationRows, fetch_liquidation_rows
+from futures_perps.trade.apolo.liquidation_store import LiquidationStore, format_liquidation_heatmap
+from trading_bot.orderly_types import Liquidation, LiquidatedPosition
+
+
+def liquidation(ts, liquidation_id, *positions):
+    return Liquidation(ts, liquidation_id, "liquidated",
+                       [LiquidatedPosition(symbol, qty, price) for symbol, qty, price in positions])
+
+
+class FakeFeed:
+    """fetch_rows stand-in that returns the rows inside the requested time range."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    def __call__(self, start_ms, end_ms):
+        self.calls.append((start_ms, end_ms))
+        return [row for row in self.rows if start_ms <= row.timestamp <= end_ms]
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+def test_counts_near_price_per_symbol():
+    t = now_ms() - 60_000
+    feed = FakeFeed([
+        liquidation(t, 1, ("PERP_BTC_USDC", 0.1, 100.0), ("PERP_ETH_USDC", 2.0, 50.0)),
+        liquidation(t + 1, 2, ("PERP_BTC_USDC", -0.2, 101.5)),
+        liquidation(t + 2, 3, ("PERP_BTC_USDC", 0.3, 110.0)),
+    ])
+    store = LiquidationStore(feed).refresh()
+    assert store.count_near("PERP_BTC_USDC", 100.0, pct=2.0) == 2
+    assert store.count_near("PERP_BTC_USDC", 100.0, pct=10.0) == 3
+    assert store.count_near("PERP_ETH_USDC", 50.0) == 1
+    assert store.count_near("PERP_SOL_USDC", 50.0) == 0
+
+
+def test_incremental_refresh_deduplicates_rows_with_and_without_id():
+    t = now_ms() - 60_000
+    feed = FakeFeed([liquidation(t, 7, ("PERP_BTC_USDC", 1.0, 100.0)),
+                     liquidation(t, None, ("PERP_BTC_USDC", 1.0, 99.0))])
+    store = LiquidationStore(feed, refresh_interval=0)
+    for _ in range(3):
+        store.refresh(force=True)
+    # Incremental pulls start at the newest timestamp seen, so both rows come back every time
+    assert feed.calls[1][0] == t
+    assert store.stats["rows"] == 2
+    assert store.count_near("PERP_BTC_USDC", 100.0, pct=5.0) == 2
+
+
+def test_rows_older_than_the_window_are_evicted():
+    t = now_ms()
+    feed = FakeFeed([liquidation(t - 2 * 3600_000, 1, ("PERP_BTC_USDC", 1.0, 100.0)),
+                     liquidation(t - 60_000, 2, ("PERP_BTC_USDC", 1.0, 100.0))])
+    store = LiquidationStore(feed, window_hours=3, refresh_interval=0).refresh()
+    assert store.count_near("PERP_BTC_USDC", 100.0) == 2
+
+    store.window_ms = 3600_000
+    store.refresh(force=True)
+    assert store.count_near("PERP_BTC_USDC", 100.0) == 1
+    assert store.stats["evicted"] == 1
+
+
+def test_refresh_is_throttled():
+    feed = FakeFeed([])
+    store = LiquidationStore(feed, refresh_interval=60)
+    store.refresh()
+    store.refresh()
+    assert len(feed.calls) == 1
+
+
+def test_heatmap_bands():
+    t = now_ms() - 60_000
+    feed = FakeFeed([liquidation(t, 1, ("PERP_BTC_USDC", 1.0, 96.0)),
+                     liquidation(t, 2, ("PERP_BTC_USDC", 2.0, 105.0))])
+    bands = LiquidationStore(feed).refresh().heatmap("PERP_BTC_USDC", 100.0, pct=5.0, buckets=10)
+    assert len(bands) == 10
+    assert [band["count"] for band in bands] == [0, 1, 0, 0, 0, 0, 0, 0, 0, 1]  # last band keeps its upper edge
+    assert bands[-1]["notional"] == 210.0
+    assert format_liquidation_heatmap(bands).count("\n") == 1
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.content = orjson.dumps(payload)
+
+    def raise_for_status(self):
+        pass
+
+
+def test_page_cap_marks_the_fetch_truncated(monkeypatch):
+    t = now_ms() - 60_000
+    pages = []
+
+    def get(path, params=None, **kwargs):
+        pages.append(params["page"])
+        rows = [{"timestamp": t, "liquidation_id": params["page"] * 1000 + i, "type": "liquidated",
+                 "positions_by_perp": [{"symbol": "PERP_BTC_USDC", "position_qty": 1, "mark_price": 100}]}
+                for i in range(historical_data.LIQUIDATION_PAGE_SIZE)]
+        return FakeResponse({"success": True, "data": {"rows": rows, "meta": {"total": 10_000}}})
+
+    monkeypatch.setattr(historical_data.orderly_client, "get", get)
+    rows = fetch_liquidation_rows(t - 1000, t + 1000)
+    assert rows.truncated and len(pages) == historical_data.MAX_LIQUIDATION_PAGES
+
+    store = LiquidationStore(lambda start_ms, end_ms: rows).refresh()
+    assert store.partial and store.stats["truncated_fetches"] == 1
+
+
+def test_complete_fetch_is_not_partial():
+    rows = LiquidationRows([liquidation(now_ms() - 60_000, 1, ("PERP_BTC_USDC", 1.0, 100.0))])
+    store = LiquidationStore(lambda start_ms, end_ms: rows).refresh()
+    assert not rows.truncated and not store.partial
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from futures_perps.trade.apolo.llm_batch import parse_batch_decisions
+
+REQUIRED = ("asset", "side", "approved")
+ASSETS = ["PERP_BTC_USDC", "PERP_ETH_USDC", "PERP_SOL_USDC"]
+
+
+def test_valid_entries_by_asset():
+    content = "Aquí están:\n" + json.dumps([
+        {"asset": "PERP_BTC_USDC", "side": "BUY", "approved": True},
+        {"asset": "PERP_ETH_USDC", "side": "NONE", "approved": False},
+    ]) + "\nFin."
+    decisions = parse_batch_decisions(content, ASSETS, REQUIRED)
+    assert set(decisions) == {"PERP_BTC_USDC", "PERP_ETH_USDC"}
+    assert decisions["PERP_BTC_USDC"]["side"] == "BUY"
+
+
+def test_invalid_unknown_and_repeated_entries_are_left_out():
+    content = json.dumps([
+        {"asset": "PERP_BTC_USDC", "side": "LONG", "approved": True},     # unknown side
+        {"asset": "PERP_ETH_USDC", "side": "SELL"},                       # missing field
+        {"asset": "PERP_DOGE_USDC", "side": "BUY", "approved": True},     # not in the batch
+        {"asset": "PERP_SOL_USDC", "side": "SELL", "approved": True},
+        {"asset": "PERP_SOL_USDC", "side": "BUY", "approved": True},      # first entry wins
+        "texto suelto",
+    ])
+    decisions = parse_batch_decisions(content, ASSETS, REQUIRED)
+    assert decisions == {"PERP_SOL_USDC": {"asset": "PERP_SOL_USDC", "side": "SELL", "approved": True}}
+
+
+def test_no_array_raises():
+    with pytest.raises(ValueError):
+        parse_batch_decisions('{"asset": "PERP_BTC_USDC", "side": "BUY", "approved": true}', ASSETS, REQUIRED)
+    with pytest.raises(ValueError):
+        parse_batch_decisions("no puedo decidir", ASSETS, REQUIRED)
@@ -0,0 +1,183 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from futures_perps.trade.apolo.llm_provider import LLMProvider, MIN_LATENCY_SAMPLES, parse_endpoints
+
+REQUIRED = ("side", "approved")
+DECISION = '{"side": "BUY", "approved": true}'
+# Seconds each fake model takes to answer ("broken" answers 500, "junk" has no decision)
+DELAYS = {"slow": 3.0, "fast": 0.1, "broken": 0.0, "junk": 0.0}
+# Streamed answers keep talking after the decision for this long
+STREAM_TAIL = 2.0
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), FakeLLMHandler)
+        self.requests = []      # (model, Authorization header)
+        self.disconnected = []  # models whose streaming client went away mid-answer
+        self.url = f"http://127.0.0.1:{self.server_address[1]}/v1/chat/completions"
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """
+    OpenAI-style chat completions. Streamed answers are server-sent events in
+    chunked transfer encoding, like the real APIs, with the model delay spread
+    over the decision text.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        model = body["model"]
+        self.server.requests.append((model, self.headers.get("Authorization")))
+        if model == "broken":
+            self.send_response(500)
+            self.send_header("Content-Length", "4")
+            self.end_headers()
+            self.wfile.write(b"boom")
+            return
+        text = "Sin decisión." if model == "junk" else f"Análisis. {DECISION} Y ahora una explicación larga."
+        if body.get("stream"):
+            self._stream(model, text)
+        else:
+            time.sleep(DELAYS[model])
+            out = json.dumps({"choices": [{"message": {"content": text}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+    def _stream(self, model, text):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunks = [text[i:i + 8] for i in range(0, len(text), 8)]
+        tail = int(STREAM_TAIL / 0.05)
+        pauses = [DELAYS[model] / len(chunks)] * len(chunks) + [0.05] * tail
+        try:
+            for chunk, pause in zip(chunks + [" bla"] * tail, pauses):
+                time.sleep(pause)
+                event = {"choices": [{"delta": {"content": chunk}}]}
+                self._write_chunk(b"data: " + json.dumps(event).encode() + b"\n\n")
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except OSError:
+            self.server.disconnected.append(model)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+@pytest.fixture
+def server(settings_db, monkeypatch):
+    monkeypatch.setenv("DEEP_SEEK_API_KEY", "deepseek-key")
+    monkeypatch.setenv("OTHER_LLM_KEY", "other-key")
+    srv = FakeLLMServer()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def endpoints(server, *entries):
+    return parse_endpoints(entries, server.url)
+
+
+def test_hedge_fires_after_the_primary_p90(server):
+    provider = LLMProvider()
+    slow, fast = endpoints(server, "slow", "fast")
+    provider.tracker(slow).samples.extend([0.2] * MIN_LATENCY_SAMPLES)
+
+    started = time.monotonic()
+    answer, error = provider.complete("x", required=REQUIRED, endpoints=[slow, fast], timeout=10)
+    assert error is None and answer.model == "fast"
+    assert answer.result == {"side": "BUY", "approved": True}
+    assert time.monotonic() - started < DELAYS["slow"]
+    assert provider.stats["hedges"] == 1
+    # The losing primary still records how long it had run
+    assert len(provider.tracker(slow).samples) == MIN_LATENCY_SAMPLES + 1
+    assert provider.tracker(slow).samples[-1] >= 0.2
+
+
+def test_failover_on_error_and_on_answer_without_decision(server):
+    provider = LLMProvider()
+    answer, error = provider.complete("x", required=REQUIRED, endpoints=endpoints(server, "broken", "junk", "fast"))
+    assert error is None and answer.model == "fast"
+    assert provider.stats["failovers"] == 2
+    broken, junk, _ = endpoints(server, "broken", "junk", "fast")
+    assert provider.tracker(broken).failures == 1 and provider.tracker(junk).failures == 1
+
+
+def test_content_without_decision_is_returned_when_nothing_better_answers(server):
+    answer, error = LLMProvider().complete("x", required=REQUIRED, endpoints=endpoints(server, "junk", "broken"))
+    assert error is None and answer.result is None and answer.content == "Sin decisión."
+
+
+def test_every_endpoint_down(server):
+    provider = LLMProvider()
+    answer, error = provider.complete("x", required=REQUIRED, endpoints=endpoints(server, "broken"))
+    assert answer is None and "500" in error
+    assert provider.stats["failed"] == 1
+
+
+def test_hedging_off_only_fails_over(server, settings_db):
+    settings_db.upsert_setting("llm_hedge", "False")
+    provider = LLMProvider()
+    slow, fast = endpoints(server, "slow", "fast")
+    provider.tracker(slow).samples.extend([0.2] * MIN_LATENCY_SAMPLES)
+    answer, _ = provider.complete("x", required=REQUIRED, endpoints=[slow, fast], timeout=10)
+    assert answer.model == "slow" and provider.stats["hedges"] == 0
+
+
+def test_stream_is_cut_off_once_the_decision_is_complete(server):
+    started = time.monotonic()
+    answer, error = LLMProvider().complete("x", required=REQUIRED, stream=True, endpoints=endpoints(server, "fast"))
+    assert error is None and answer.cut_off
+    assert answer.result == {"side": "BUY", "approved": True}
+    assert "explicación larga" not in answer.content
+    assert time.monotonic() - started < STREAM_TAIL / 2
+
+
+def wait_for_disconnect(server, model, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while model not in server.disconnected and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return model in server.disconnected
+
+
+def test_losing_stream_is_cancelled(server):
+    provider = LLMProvider()
+    slow, fast = endpoints(server, "slow", "fast")
+    provider.tracker(slow).samples.extend([0.2] * MIN_LATENCY_SAMPLES)
+    answer, _ = provider.complete("x", required=REQUIRED, stream=True, endpoints=[slow, fast], timeout=10)
+    assert answer.model == "fast"
+    # The primary's stream is closed right away instead of being read to the end
+    assert wait_for_disconnect(server, "slow", timeout=DELAYS["slow"] / 2)
+
+
+def test_api_keys_per_endpoint(server):
+    other = server.url + "?provider=other"
+    entries = ("fast", f"broken@{other}", f"junk@{other}#OTHER_LLM_KEY")
+    LLMProvider().complete("x", required=REQUIRED, endpoints=endpoints(server, *entries), timeout=5)
+    LLMProvider().complete("x", required=REQUIRED, endpoints=endpoints(server, *entries[1:]), timeout=5)
+    assert dict(server.requests) == {"fast": "Bearer deepseek-key", "broken": None, "junk": "Bearer other-key"}
+
+
+def test_batch_latency_is_tracked_apart(server):
+    provider = LLMProvider()
+    fast, = endpoints(server, "fast")
+    provider.complete("x", endpoints=[fast], kind="batch")
+    assert len(provider.tracker(fast, "batch").samples) == 1
+    assert len(provider.tracker(fast).samples) == 0
@@ -0,0 +1,44 @@
+from futures_perps.trade.apolo.llm_stream import IncrementalJSONObject
+
+REQUIRED = ("side", "approved")
+
+
+def feed_in_pieces(parser, text, size):
+    result = None
+    for i in range(0, len(text), size):
+        result = parser.feed(text[i:i + size])
+    return result
+
+
+def test_object_after_prose_split_in_small_chunks():
+    text = 'Análisis: tendencia alcista. {"side": "BUY", "approved": true} Fin.'
+    parser = IncrementalJSONObject(REQUIRED)
+    assert feed_in_pieces(parser, text, 3) == {"side": "BUY", "approved": True}
+
+
+def test_result_is_returned_as_soon_as_the_object_closes():
+    parser = IncrementalJSONObject(REQUIRED)
+    assert parser.feed('{"side": "SELL", "approved": false') is None
+    assert parser.feed('} y más texto') == {"side": "SELL", "approved": False}
+    assert parser.feed('{"side": "BUY", "approved": true}') == {"side": "SELL", "approved": False}
+
+
+def test_braces_and_escaped_quotes_inside_strings():
+    text = '{"side": "BUY", "approved": true, "note": "usa {llaves} y \\"comillas\\" }"}'
+    assert feed_in_pieces(IncrementalJSONObject(REQUIRED), text, 5)["note"] == 'usa {llaves} y "comillas" }'
+
+
+def test_object_without_required_fields_is_skipped():
+    text = 'Ejemplo {"side": "BUY"} y la decisión {"side": "NONE", "approved": false}'
+    assert feed_in_pieces(IncrementalJSONObject(REQUIRED), text, 7) == {"side": "NONE", "approved": False}
+
+
+def test_nested_object_counts_as_one():
+    text = '{"side": "BUY", "approved": true, "levels": {"sl": 1.5, "tp": 3}}'
+    assert IncrementalJSONObject(REQUIRED).feed(text)["levels"] == {"sl": 1.5, "tp": 3}
+
+
+def test_no_object():
+    parser = IncrementalJSONObject(REQUIRED)
+    assert feed_in_pieces(parser, "sin decisión clara { roto", 4) is None
+    assert parser.text == "sin decisión clara { roto"
@@ -0,0 +1,111 @@
+import threading
+import time
+
+from futures_perps.trade.apolo.local_orderbook import LocalOrderBookManager
+from trading_bot.orderly_types import OrderbookSnapshot
+
+SYMBOL = "PERP_BTC_USDC"
+
+
+class FakeHub:
+    def __init__(self):
+        self.handlers = {}
+
+    def add_handler(self, topic, handler):
+        self.handlers[topic] = handler
+
+    def push(self, prev_ts, ts, bids=(), asks=()):
+        self.handlers[f"{SYMBOL}@orderbookupdate"]({
+            "topic": f"{SYMBOL}@orderbookupdate", "ts": ts,
+            "data": {"symbol": SYMBOL, "prevTs": prev_ts, "bids": [list(b) for b in bids],
+                     "asks": [list(a) for a in asks]},
+        })
+
+
+class FakeSnapshots:
+    """fetch_snapshot stand-in: returns the snapshots in order, each one once `release` is set."""
+
+    def __init__(self, *timestamps):
+        self.timestamps = list(timestamps)
+        self.calls = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, symbol, levels):
+        self.release.wait(5)
+        ts = self.timestamps[min(self.calls, len(self.timestamps) - 1)]
+        self.calls += 1
+        return OrderbookSnapshot([(100.0, 1.0), (99.0, 2.0)], [(101.0, 1.0), (102.0, 3.0)], ts)
+
+
+def synced_manager(snapshots):
+    hub = FakeHub()
+    manager = LocalOrderBookManager(hub, snapshots)
+    assert manager.get_book(SYMBOL, wait=2) is not None
+    return hub, manager
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_straddling_then_contiguous_live_deltas():
+    snapshots = FakeSnapshots(1000)
+    hub, manager = synced_manager(snapshots)
+    hub.push(990, 1010, bids=[(100.0, 5.0)])      # straddles the snapshot: prevTs < 1000 < ts
+    hub.push(1010, 1020, asks=[(101.0, 0.0)])     # contiguous
+    book = manager.get_book(SYMBOL)
+    assert book is not None and book.ts == 1020
+    assert book.bid_qty[0] == 5.0 and book.ask_px[0] == 102.0
+    assert snapshots.calls == 1 and manager.stats()["gaps"] == 0
+
+
+def test_deltas_already_in_the_snapshot_are_ignored():
+    snapshots = FakeSnapshots(1000)
+    hub, manager = synced_manager(snapshots)
+    hub.push(980, 990, bids=[(100.0, 9.0)])
+    hub.push(990, 1010)
+    book = manager.get_book(SYMBOL)
+    assert book.ts == 1010 and book.bid_qty[0] == 1.0
+    assert snapshots.calls == 1
+
+
+def test_gap_after_the_first_delta_resyncs():
+    snapshots = FakeSnapshots(1000, 2000)
+    hub, manager = synced_manager(snapshots)
+    hub.push(990, 1010)
+    hub.push(1015, 1020)                          # 1010 -> 1015 missing
+    assert manager.stats()["gaps"] == 1
+    assert wait_until(lambda: snapshots.calls == 2 and manager.get_book(SYMBOL) is not None)
+    assert manager.get_book(SYMBOL).ts == 2000
+
+
+def test_deltas_buffered_during_the_snapshot_are_replayed():
+    snapshots = FakeSnapshots(1000)
+    snapshots.release.clear()
+    hub = FakeHub()
+    manager = LocalOrderBookManager(hub, snapshots)
+    manager.track(SYMBOL)
+    hub.push(980, 990)                            # older than the snapshot, dropped
+    hub.push(995, 1005, bids=[(100.0, 7.0)])      # straddles
+    hub.push(1005, 1010, bids=[(98.0, 1.0)])
+    snapshots.release.set()
+    book = manager.get_book(SYMBOL, wait=2)
+    assert book.ts == 1010 and list(book.bid_qty[:3]) == [7.0, 2.0, 1.0]
+    assert snapshots.calls == 1
+
+
+def test_broken_chain_in_the_buffer_takes_a_new_snapshot():
+    snapshots = FakeSnapshots(1000, 1030)
+    snapshots.release.clear()
+    hub = FakeHub()
+    manager = LocalOrderBookManager(hub, snapshots)
+    manager.track(SYMBOL)
+    hub.push(995, 1005)
+    hub.push(1007, 1010)                          # 1005 -> 1007 missing
+    snapshots.release.set()
+    assert wait_until(lambda: snapshots.calls == 2 and manager.get_book(SYMBOL) is not None)
+    assert manager.get_book(SYMBOL).ts == 1030
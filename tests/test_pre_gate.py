@@ -0,0 +1,36 @@
+from futures_perps.trade.apolo.pre_gate import PreGate, StructuralInputs, structural_rejections
+
+
+def inputs(**overrides):
+    values = dict(is_buy_structure=True, is_sell_structure=False, bid_imbalance=2.0, ask_imbalance=0.5,
+                  latest_rsi=55.0, price_delta_pct=0.0, min_imbalance=1.6)
+    values.update(overrides)
+    return StructuralInputs(**values)
+
+
+def test_buy_passes_and_sell_fails():
+    assert structural_rejections("BUY", inputs()) == []
+    assert structural_rejections("SELL", inputs()) == ["Estructura NO bajista", "Asks insuficientes"]
+
+
+def test_rsi_veto_and_adverse_price_move():
+    assert structural_rejections("BUY", inputs(latest_rsi=85.0, price_delta_pct=-0.5)) == [
+        "RSI >80: 85.0", "Precio cayendo"]
+    assert structural_rejections("SELL", inputs(is_sell_structure=True, ask_imbalance=2.0, latest_rsi=15.0,
+                                                price_delta_pct=0.5)) == ["RSI <20: 15.0", "Precio subiendo"]
+
+
+def test_missing_rsi_does_not_veto():
+    assert structural_rejections("BUY", inputs(latest_rsi=None)) == []
+
+
+def test_unknown_side():
+    assert structural_rejections("NONE", inputs()) == ["Lado no operable: NONE"]
+
+
+def test_pre_gate_skips_only_when_both_sides_fail():
+    gate = PreGate()
+    assert gate.evaluate(inputs()) is None
+    blocked = gate.evaluate(inputs(is_buy_structure=False))
+    assert set(blocked) == {"BUY", "SELL"} and all(blocked.values())
+    assert gate.stats == {"evaluated": 2, "skipped": 1, "passed": 1}
@@ -0,0 +1,56 @@
+import numpy as np
+
+from futures_perps.trade.apolo.kline_columns import KlineColumns
+from futures_perps.trade.apolo.prompt_compactor import (
+    MAX_HISTORY_ROWS, MIN_HISTORY_ROWS, compact_candle_history, estimate_tokens, tick_decimals,
+)
+
+
+def candles(n=60, close=65012.3, step=0.7, indicators=None):
+    closes = close + np.arange(n) * step
+    return KlineColumns(np.arange(n, dtype=np.int64) * 60_000, closes, closes + 1.3, closes - 1.1, closes,
+                        np.full(n, 123456.7), indicators)
+
+
+def rows(history):
+    return history.text.splitlines()[2:]
+
+
+def test_tick_decimals():
+    assert tick_decimals(0.01) == 2
+    assert tick_decimals(0.5) == 1
+    assert tick_decimals(1) == 0
+    assert tick_decimals(None) is None
+    assert tick_decimals(0) is None
+
+
+def test_prices_on_the_quote_tick():
+    history = compact_candle_history(candles(), 2500, quote_tick=0.1)
+    assert rows(history)[-1].split(",")[1:6] == ["65053.6", "65054.9", "65052.5", "65053.6", "123457"]
+
+
+def test_without_quote_tick_prices_stay_in_fixed_notation():
+    history = compact_candle_history(candles(), 2500)
+    assert "e+" not in history.text and "e-" not in history.text
+    lows = [row.split(",")[3] for row in rows(history)[-3:]]
+    assert len(set(lows)) == 3
+    small = compact_candle_history(candles(close=0.000123456, step=0.000000001), 2500)
+    assert "e-" not in small.text
+    assert rows(small)[-1].split(",")[4] == "0.000123515"
+
+
+def test_recent_rows_and_summary_of_the_rest():
+    history = compact_candle_history(candles(60), 2500, quote_tick=0.1)
+    assert history.rows_shown == MAX_HISTORY_ROWS
+    assert history.rows_summarized == 60 - MAX_HISTORY_ROWS
+    assert history.text.startswith(f"Resumen de las {60 - MAX_HISTORY_ROWS} velas anteriores")
+    assert len(rows(history)) == MAX_HISTORY_ROWS
+
+
+def test_tight_budget_drops_optional_columns_first():
+    indicators = {name: np.linspace(1, 2, 60) for name in ("rsi_14", "ema_9", "adx_14", "macd", "obv")}
+    history = compact_candle_history(candles(indicators=indicators), 200, quote_tick=0.1)
+    assert history.rows_shown == MIN_HISTORY_ROWS
+    assert "rsi_14" in history.columns
+    assert len(history.columns) < 5 + len(indicators)
+    assert estimate_tokens(history.text) <= 200 * 1.5
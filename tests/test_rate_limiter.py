@@ -0,0 +1,56 @@
+import threading
+import time
+
+from trading_bot.rate_limiter import PRIORITY_HIGH, PRIORITY_NORMAL, TokenBucketRateLimiter
+
+
+def drain(limiter, n, endpoint="default"):
+    for _ in range(n):
+        limiter.acquire(endpoint, PRIORITY_HIGH)
+
+
+def test_high_priority_is_served_before_waiting_normal_requests():
+    limiter = TokenBucketRateLimiter(rate=4, reserve=0, endpoint_rates={}, default_endpoint_rate=100)
+    drain(limiter, 4)
+    order = []
+
+    def request(name, priority):
+        limiter.acquire("default", priority)
+        order.append(name)
+
+    normal = threading.Thread(target=request, args=("normal", PRIORITY_NORMAL))
+    normal.start()
+    time.sleep(0.05)
+    high = threading.Thread(target=request, args=("high", PRIORITY_HIGH))
+    high.start()
+    normal.join(3)
+    high.join(3)
+    assert order == ["high", "normal"]
+
+
+def test_normal_requests_leave_the_reserve_to_the_high_lane():
+    limiter = TokenBucketRateLimiter(rate=4, reserve=2, endpoint_rates={}, default_endpoint_rate=100)
+    drain(limiter, 1)
+    assert limiter.acquire("default", PRIORITY_NORMAL) < 0.05   # 3 tokens left, 1 above the reserve
+    assert limiter.acquire("default", PRIORITY_HIGH) < 0.05     # the reserve is still there
+    assert limiter.acquire("default", PRIORITY_NORMAL) >= 0.2
+
+
+def test_high_waiter_on_its_own_endpoint_does_not_stall_normal_traffic():
+    limiter = TokenBucketRateLimiter(rate=10, reserve=1, endpoint_rates={"/v1/algo/order": 1},
+                                     default_endpoint_rate=10)
+    drain(limiter, 1, "/v1/algo/order")
+    high = threading.Thread(target=limiter.acquire, args=("/v1/algo/order", PRIORITY_HIGH))
+    high.start()
+    time.sleep(0.05)
+    # The high request waits ~1s for its endpoint bucket; global tokens are plentiful
+    assert limiter.acquire("/v1/kline", PRIORITY_NORMAL) < 0.1
+    high.join(3)
+
+
+def test_stats_count_throttled_requests():
+    limiter = TokenBucketRateLimiter(rate=10, reserve=0, endpoint_rates={"/v1/kline": 2})
+    for _ in range(3):
+        limiter.acquire("/v1/kline")
+    stats = limiter.stats()["/v1/kline"]
+    assert stats["acquired"] == 3 and stats["throttled"] == 1 and stats["wait_time"] > 0.3
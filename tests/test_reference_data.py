@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from trading_bot.reference_data import FUNDING_FALLBACK_TTL, ReferenceDataCache, _funding_expiry
+
+
+class FakeLoaders:
+    """Bulk and single-symbol loaders whose entries expire after `ttl` seconds."""
+
+    def __init__(self, symbols=("PERP_BTC_USDC", "PERP_ETH_USDC"), ttl=60.0, bulk_fails=False):
+        self.symbols = symbols
+        self.ttl = ttl
+        self.bulk_fails = bulk_fails
+        self.bulk_calls = 0
+        self.single_calls = []
+
+    def load_all(self, priority):
+        self.bulk_calls += 1
+        if self.bulk_fails:
+            raise RuntimeError("bulk endpoint down")
+        expires = time.time() + self.ttl
+        return {symbol: ({"symbol": symbol, "version": self.bulk_calls}, expires) for symbol in self.symbols}
+
+    def load_one(self, symbol, priority):
+        self.single_calls.append(symbol)
+        return {"symbol": symbol, "single": True}, time.time() + self.ttl
+
+
+def cache_for(loaders):
+    return ReferenceDataCache({"info": (loaders.load_all, loaders.load_one)})
+
+
+def test_one_bulk_refresh_serves_every_symbol():
+    loaders = FakeLoaders()
+    cache = cache_for(loaders)
+    assert cache.get("info", "PERP_BTC_USDC")["version"] == 1
+    assert cache.get("info", "PERP_ETH_USDC")["version"] == 1
+    assert loaders.bulk_calls == 1
+    assert cache.stats()["info"] == {"hits": 1, "misses": 1, "bulk_refreshes": 1, "single_fetches": 0}
+
+
+def test_expired_entries_are_refreshed():
+    loaders = FakeLoaders(ttl=0.1)
+    cache = cache_for(loaders)
+    cache.get("info", "PERP_BTC_USDC")
+    time.sleep(0.15)
+    assert cache.get("info", "PERP_BTC_USDC")["version"] == 2
+    assert loaders.bulk_calls == 2
+
+
+def test_single_fetch_when_bulk_fails_or_misses_the_symbol():
+    loaders = FakeLoaders(bulk_fails=True)
+    cache = cache_for(loaders)
+    assert cache.get("info", "PERP_BTC_USDC")["single"]
+    assert loaders.single_calls == ["PERP_BTC_USDC"]
+
+    loaders = FakeLoaders()
+    assert cache_for(loaders).get("info", "PERP_SOL_USDC")["single"]
+    assert loaders.bulk_calls == 1 and loaders.single_calls == ["PERP_SOL_USDC"]
+
+
+def test_invalidate():
+    loaders = FakeLoaders()
+    cache = cache_for(loaders)
+    cache.get("info", "PERP_BTC_USDC")
+    cache.invalidate("info", "PERP_BTC_USDC")
+    cache.get("info", "PERP_ETH_USDC")
+    assert loaders.bulk_calls == 1
+    cache.get("info", "PERP_BTC_USDC")
+    assert loaders.bulk_calls == 2
+
+
+def test_counters_are_exact_under_concurrency():
+    cache = cache_for(FakeLoaders())
+    cache.get("info", "PERP_BTC_USDC")
+
+    def worker():
+        for _ in range(2000):
+            cache.get("info", "PERP_BTC_USDC")
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert cache.stats()["info"]["hits"] == 8 * 2000
+
+
+def test_funding_expires_at_the_next_settlement():
+    next_settlement = time.time() + 1800
+    assert _funding_expiry(next_settlement * 1000) == pytest.approx(next_settlement)
+    assert _funding_expiry(None) == pytest.approx(time.time() + FUNDING_FALLBACK_TTL, abs=1)
+    assert _funding_expiry((time.time() - 10) * 1000) == pytest.approx(time.time() + FUNDING_FALLBACK_TTL, abs=1)
@@ -0,0 +1,105 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from futures_perps.trade.apolo.historical_data import add_indicators, strategy_features
+from futures_perps.trade.apolo.kline_buffer import INTERVAL_MS, KlineBuffer
+from futures_perps.trade.apolo.kline_stream import WARM_UP_CANDLES, KlineStream
+from futures_perps.trade.apolo.streaming_indicators import IndicatorEngine, reset_indicator_engines
+from trading_bot.orderly_types import Kline
+
+SYMBOL, INTERVAL = "PERP_BTC_USDC", "1m"
+STEP = INTERVAL_MS[INTERVAL]
+FEATURE_SETS = sorted({tuple(info["features"]) for strategies in strategy_features.values()
+                       for info in strategies.values()})
+
+
+def random_klines(n, start=0, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    high = close * (1 + rng.uniform(0, 0.01, n))
+    low = close * (1 - rng.uniform(0, 0.01, n))
+    volume = rng.uniform(1, 100, n)
+    return [Kline(start + i * STEP, start + (i + 1) * STEP, close[i], high[i], low[i], close[i], volume[i], 0.0)
+            for i in range(n)]
+
+
+def reference(klines, features):
+    frame = pd.DataFrame([{column: k[column] for column in ("start_timestamp", "open", "high", "low", "close", "volume")}
+                          for k in klines])
+    return add_indicators(frame, list(features)).reset_index(drop=True)
+
+
+def assert_matches(columns, ref):
+    frame = columns.to_frame().reset_index(drop=True)
+    assert len(frame) == len(ref)
+    for column in ref.columns:
+        if column == "start_timestamp":
+            continue
+        assert np.allclose(frame[column].to_numpy(float), ref[column].to_numpy(float),
+                           rtol=1e-9, atol=1e-9, equal_nan=True), column
+
+
+@pytest.mark.parametrize("features", FEATURE_SETS)
+def test_engine_matches_add_indicators(features):
+    klines = random_klines(400)
+    ref = reference(klines, features)
+    engine = IndicatorEngine(list(features), history=len(klines))
+    rows = engine.warm_up(klines)
+    assert len(rows) == len(ref)
+    assert_matches(engine.window(len(ref)), ref)
+
+
+def test_preview_leaves_the_engine_untouched():
+    features = FEATURE_SETS[0]
+    klines = random_klines(200)
+    engine = IndicatorEngine(list(features))
+    engine.warm_up(klines[:-1])
+    before = engine.window(50)
+    previewed = engine.window(50, forming=klines[-1])
+    assert engine.last_ts == klines[-2].start_timestamp
+    assert np.array_equal(engine.window(50).close, before.close)
+
+    engine.update(klines[-1])
+    after = engine.window(50)
+    for name, values in after.indicators.items():
+        assert np.allclose(previewed.indicators[name], values, equal_nan=True), name
+
+
+class FakeHub:
+    def add_handler(self, topic, handler):
+        self.handler = handler
+
+    def push(self, kline):
+        self.handler({"topic": f"{SYMBOL}@kline_{INTERVAL}",
+                      "data": {"startTime": kline.start_timestamp, "endTime": kline.end_timestamp,
+                               "open": kline.open, "high": kline.high, "low": kline.low,
+                               "close": kline.close, "volume": kline.volume, "amount": kline.amount}})
+
+
+def test_candle_closes_advance_the_engine_without_refetching():
+    reset_indicator_engines()
+    now = (int(time.time() * 1000) // STEP) * STEP
+    klines = random_klines(400, start=now - 399 * STEP)   # the last one is forming
+    served = {"rows": klines[:-3]}
+    buffer = KlineBuffer(lambda symbol, interval, limit: served["rows"][-limit:])
+    hub = FakeHub()
+    stream = KlineStream(hub, buffer)
+    stream.subscribe(SYMBOL, INTERVAL)
+    features = list(FEATURE_SETS[0])
+
+    assert stream.indicator_columns(SYMBOL, INTERVAL, 80, features) is not None
+    for kline in klines[-4:]:                              # closes three candles, the last one is forming
+        hub.push(kline)
+    assert stream.wait_for_close(SYMBOL, INTERVAL, klines[-3].start_timestamp, timeout=2) is not None
+
+    fetched = buffer.stats["rows_fetched"]
+    served["rows"] = klines                                # the delta fetch only returns the newest candles
+    columns = stream.indicator_columns(SYMBOL, INTERVAL, 80, features)
+    assert buffer.stats["rows_fetched"] - fetched <= 3
+    assert columns.start_time[-1] == klines[-1].start_timestamp
+    # Same window as a full recompute over every candle the engine has seen (warm-up + closes + forming)
+    assert_matches(columns, reference(klines[-(WARM_UP_CANDLES + 3):], features).tail(80))
+    reset_indicator_engines()
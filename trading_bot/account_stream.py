@@ -0,0 +1,220 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+from base64 import urlsafe_b64encode
+from collections import OrderedDict
+from typing import Dict, List, Optional
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import websockets
+
+from logs.log_config import apolo_trader_logger as logger
+from trading_bot.orderly_client import OrderlyClient, get_orderly_client
+from trading_bot.rate_limiter import PRIORITY_NORMAL
+from trading_bot.orderly_types import Position, PositionsSnapshot, loads, response_json
+
+PRIVATE_WSS_BASE = "wss://ws-private-evm.orderly.org/v2/ws/private/stream"
+PRIVATE_TOPICS = ("balance", "position", "executionreport")
+BACKOFF_START = 1.0
+BACKOFF_MAX = 30.0
+# Seconds to batch push events before re-reading free collateral
+SNAPSHOT_DEBOUNCE = 1.0
+# Free collateral also moves with unrealized PnL, which is not pushed: re-read at least this often
+SNAPSHOT_MAX_AGE = 60.0
+# ...and right before sizing an order when the last read is older than this
+ORDER_SNAPSHOT_MAX_AGE = 3.0
+# Finished orders kept for inspection
+MAX_TRACKED_ORDERS = 500
+FINAL_ORDER_STATUSES = {"FILLED", "CANCELLED", "REJECTED", "EXPIRED"}
+
+
+class AccountStream:
+    """
+    In-memory account model kept current by Orderly's private WebSocket.
+
+    Authenticates once per connection (ed25519 signature of the timestamp),
+    subscribes to balance, position and execution reports, and reconnects
+    with backoff. Positions, balances and orders are updated from the push
+    events. Free collateral is not pushed by the exchange, so it comes from a
+    /v1/positions snapshot taken on every (re)connect, debounced after balance
+    changes, executions and position size changes, and every SNAPSHOT_MAX_AGE
+    seconds. Reads only touch memory; they return None while the model is not
+    synced so callers can fall back to REST.
+    """
+
+    def __init__(self, client: OrderlyClient, url_base: str = PRIVATE_WSS_BASE):
+        self.client = client
+        self.url = f"{url_base}/{client.account_id}"
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._connected = False
+        self._snapshot_pending = False
+
+        self.free_collateral: Optional[float] = None
+        self.positions: Dict[str, Position] = {}
+        self.balances = {}
+        self.orders = OrderedDict()
+        self.synced_at = 0.0
+        self.stats = {"events": 0, "snapshots": 0, "connects": 0, "auth_failures": 0}
+
+    # --- lifecycle -----------------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=lambda: asyncio.run(self._connect_forever()),
+                                            name="account-stream", daemon=True)
+            self._thread.start()
+
+    def _auth_message(self) -> dict:
+        timestamp = str(int(time.time() * 1000))
+        signature = urlsafe_b64encode(self.client.private_key.sign(timestamp.encode())).decode()
+        return {"id": "auth", "event": "auth",
+                "params": {"orderly_key": self.client.public_key, "sign": signature, "timestamp": timestamp}}
+
+    async def _connect_forever(self):
+        backoff = BACKOFF_START
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=15) as ws:
+                    await ws.send(json.dumps(self._auth_message()))
+                    reply = loads(await asyncio.wait_for(ws.recv(), timeout=10))
+                    if reply.get("event") != "auth" or not reply.get("success"):
+                        self.stats["auth_failures"] += 1
+                        raise ConnectionError(f"private stream auth rejected: {reply}")
+
+                    for topic in PRIVATE_TOPICS:
+                        await ws.send(json.dumps({"id": f"sub_{topic}", "topic": topic, "event": "subscribe"}))
+                    self._connected = True
+                    self.stats["connects"] += 1
+                    backoff = BACKOFF_START
+                    logger.info("🔐 Private account stream connected")
+
+                    # Pushes only carry changes: start from a full snapshot after every (re)connect
+                    await loop.run_in_executor(None, self.refresh_snapshot)
+                    periodic = asyncio.ensure_future(self._periodic_snapshots(loop))
+                    try:
+                        async for raw in ws:
+                            await self._on_message(ws, raw, loop)
+                    finally:
+                        periodic.cancel()
+            except Exception as e:
+                logger.warning(f"⚠️ Private account stream disconnected: {e}. Reconnecting in {backoff:.0f}s")
+            finally:
+                self._connected = False
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, BACKOFF_MAX)
+
+    # --- state updates -------------------------------------------------------
+
+    def refresh_snapshot(self, priority: int = PRIORITY_NORMAL):
+        """Re-read free collateral and positions from /v1/positions."""
+        self._snapshot_pending = False
+        try:
+            response = self.client.get("/v1/positions", priority=priority)
+            response.raise_for_status()
+            payload = response_json(response)
+        except Exception as e:
+            logger.warning(f"⚠️ Account snapshot failed: {e}")
+            return
+        if not payload.get("success") or "data" not in payload:
+            return
+        snapshot = PositionsSnapshot.from_rest(payload["data"])
+        with self._lock:
+            self.free_collateral = snapshot.free_collateral
+            self.positions = {position.symbol: position for position in snapshot.positions}
+            self.synced_at = time.time()
+            self.stats["snapshots"] += 1
+
+    async def _periodic_snapshots(self, loop):
+        while True:
+            await asyncio.sleep(SNAPSHOT_MAX_AGE)
+            await loop.run_in_executor(None, self.refresh_snapshot)
+
+    def _schedule_snapshot(self, loop):
+        if self._snapshot_pending:
+            return
+        self._snapshot_pending = True
+        loop.call_later(SNAPSHOT_DEBOUNCE, lambda: loop.run_in_executor(None, self.refresh_snapshot))
+
+    async def _on_message(self, ws, raw, loop):
+        msg = loads(raw)
+        if msg.get("event") == "ping":
+            await ws.send(json.dumps({"event": "pong", "ts": msg.get("ts", int(time.time() * 1000))}))
+            return
+        topic, data = msg.get("topic"), msg.get("data")
+        if topic not in PRIVATE_TOPICS or data is None:
+            return
+        self.stats["events"] += 1
+
+        collateral_changed = True
+        with self._lock:
+            if topic == "position":
+                # Mark-price ticks arrive here constantly; only a size change warrants a snapshot
+                collateral_changed = False
+                for push in data.get("positions", []):
+                    symbol = push.get("symbol")
+                    if symbol:
+                        previous = self.positions.get(symbol)
+                        position = Position.from_ws(push, previous)
+                        if previous is None or position.position_qty != previous.position_qty:
+                            collateral_changed = True
+                        self.positions[symbol] = position
+            elif topic == "balance":
+                self.balances.update(data.get("balances", {}))
+            elif topic == "executionreport":
+                order_id = data.get("orderId") or data.get("order_id")
+                if order_id is not None:
+                    self.orders[order_id] = data
+                    self.orders.move_to_end(order_id)
+                    while len(self.orders) > MAX_TRACKED_ORDERS:
+                        self.orders.popitem(last=False)
+        if collateral_changed:
+            self._schedule_snapshot(loop)
+
+    # --- reads ---------------------------------------------------------------
+
+    @property
+    def synced(self) -> bool:
+        return self._connected and self.synced_at > 0
+
+    def get_free_collateral(self, max_age: Optional[float] = None,
+                            priority: int = PRIORITY_NORMAL) -> Optional[float]:
+        """Streamed free collateral; with `max_age`, a snapshot older than that is re-read first."""
+        if max_age is not None and self.synced and time.time() - self.synced_at > max_age:
+            self.refresh_snapshot(priority)
+            with self._lock:
+                if time.time() - self.synced_at > max_age:
+                    return None  # re-read failed: let the caller use REST
+        with self._lock:
+            return self.free_collateral if self.synced else None
+
+    def open_positions(self) -> Optional[List[Position]]:
+        with self._lock:
+            if not self.synced:
+                return None
+            return [position for position in self.positions.values() if position.position_qty != 0]
+
+    def open_orders(self) -> list:
+        with self._lock:
+            return [order for order in self.orders.values() if order.get("status") not in FINAL_ORDER_STATUSES]
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def get_account_stream(account_id: str = None, public_key: str = None, secret: str = None) -> AccountStream:
+    """Running account stream for a set of credentials (the .env account by default)."""
+    client = get_orderly_client(account_id, public_key, secret)
+    with _streams_lock:
+        stream = _streams.get(id(client))
+        if stream is None:
+            stream = AccountStream(client)
+            _streams[id(client)] = stream
+    stream.start()
+    return stream
@@ -2,7 +2,6 @@ from decimal import ROUND_UP, Decimal
 import os
 import math
 import json
-import threading
 import time
 from dotenv import load_dotenv
 import sys
@@ -10,9 +9,12 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 import requests
 import websockets
 from trading_bot.send_bot_message import send_bot_message
-from base58 import b58decode
-from base64 import urlsafe_b64encode
-from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from trading_bot.orderly_client import orderly_client, get_orderly_client, ORDERLY_ACCOUNT_ID, ORDERLY_SECRET, ORDERLY_PUBLIC_KEY
+from trading_bot.rate_limiter import PRIORITY_HIGH, PRIORITY_NORMAL
+from trading_bot.market_data_hub import get_market_data_hub
+from trading_bot.reference_data import get_cached_exchange_info
+from trading_bot.account_stream import ORDER_SNAPSHOT_MAX_AGE, get_account_stream
+from trading_bot.orderly_types import AlgoOrderResult, PositionsSnapshot, Ticker, loads, response_json
 from db.db_ops import get_setting
 
 
@@ -20,42 +22,8 @@ from logs.log_config import apolo_trader_logger as logger
 
 load_dotenv()
 
-# ✅ Orderly API Config
-BASE_URL = os.getenv("ORDERLY_BASE_URL")
-ORDERLY_ACCOUNT_ID = os.getenv("ORDERLY_ACCOUNT_ID")
-ORDERLY_SECRET = os.getenv("ORDERLY_SECRET")
-ORDERLY_PUBLIC_KEY = os.getenv("ORDERLY_PUBLIC_KEY")
 DEEP_SEEK_API_KEY = os.getenv("DEEP_SEEK_API_KEY")
-WSS_BASE = "wss://ws-private-evm.orderly.org/v2/ws/private/stream"
 
-if not ORDERLY_SECRET or not ORDERLY_PUBLIC_KEY:
-    raise ValueError("❌ ORDERLY_SECRET or ORDERLY_PUBLIC_KEY environment variables are not set!")
-
-# ✅ Remove "ed25519:" prefix if present in private key
-if ORDERLY_SECRET.startswith("ed25519:"):
-    ORDERLY_SECRET = ORDERLY_SECRET.replace("ed25519:", "")
-
-# ✅ Decode Base58 Private Key
-private_key = Ed25519PrivateKey.from_private_bytes(b58decode(ORDERLY_SECRET))
-
-
-# ✅ Rate limiter (Ensures max 8 API requests per second globally)
-class RateLimiter:
-    def __init__(self, max_calls, period):
-        self.max_calls = max_calls
-        self.period = period
-        self.calls = []
-        self.lock = threading.Lock()
-
-    def __call__(self):
-        with self.lock:
-            now = time.time()
-            self.calls = [call for call in self.calls if call > now - self.period]
-            if len(self.calls) >= self.max_calls:
-                sleep_time = self.period - (now - self.calls[0])
-                print(f"⏳ Rate limit reached! Sleeping for {sleep_time:.2f} seconds...")
-                time.sleep(sleep_time)
-            self.calls.append(time.time())
 
 # Helpers
 def round_down_to_tick(value: float, tick: float) -> float:
@@ -76,6 +44,19 @@ def get_confidence_level(confidence: float) -> str:
         return "⚠️ WEAK"
 
 def get_close_price(wallet_address: str, symbol: str = "PERP_NEAR_USDC") -> float:
+    """
+    Current price from the persistent market data hub (in-memory ticker).
+    The first call for a symbol subscribes it and waits briefly for a tick;
+    if the hub has nothing fresh, fall back to a one-shot WebSocket read.
+    """
+    price = get_market_data_hub(wallet_address).get_price(symbol, wait=3.0)
+    if price is not None:
+        return price
+    logger.warning(f"⚠️ No fresh hub ticker for {symbol}, using one-shot WebSocket")
+    return _get_close_price_once(wallet_address, symbol)
+
+
+def _get_close_price_once(wallet_address: str, symbol: str) -> float:
     """Get current price from Orderly WebSocket - simplified version"""
     import asyncio
     
@@ -97,12 +78,10 @@ def get_close_price(wallet_address: str, symbol: str = "PERP_NEAR_USDC") -> floa
                 for _ in range(10):  # Try up to 10 messages
                     try:
                         raw = await asyncio.wait_for(ws.recv(), timeout=5.0)
-                        msg = json.loads(raw)
+                        msg = loads(raw)
 
-                        if msg.get("topic") == topic and "data" in msg:
-                            close_price = msg["data"].get("close")
-                            if close_price is not None:
-                                return float(close_price)
+                        if msg.get("topic") == topic and (msg.get("data") or {}).get("close") is not None:
+                            return Ticker.from_ws(msg["data"], time.time()).close
                     except asyncio.TimeoutError:
                         break
                        
@@ -118,78 +97,52 @@ def get_close_price(wallet_address: str, symbol: str = "PERP_NEAR_USDC") -> floa
         logger.error(f"Async execution error: {e}")
         return None
     
-def get_futures_exchange_info(symbol: str):
+def get_futures_exchange_info(symbol: str, priority: int = PRIORITY_NORMAL):
     """
     Fetch asset info from Orderly API including quantity precision, margin, and liquidation parameters.
+    Served from the reference-data cache (all symbols refreshed in one request).
     """
-    path = f"/v1/public/info/{symbol}"  # Include query string
-    url = f"{BASE_URL}{path}"
-
     try:
-        response = requests.get(url, timeout=10)
+        data = get_cached_exchange_info(symbol, priority=priority)
     except requests.exceptions.RequestException as e:
         print(f"❌ Request error: {e}")
         return None
 
-    if response.status_code == 200:
-        data = response.json().get("data", {})
-        return {
-            "base_mmr": data.get("base_mmr", 0.05),
-            "base_imr": data.get("base_imr", 0.1),
-            "imr_factor": data.get("imr_factor", 0.00000208),
-            "funding_period": data.get("funding_period", 8),
-            "cap_funding": data.get("cap_funding", 0.0075),
-            "std_liquidation_fee": data.get("std_liquidation_fee", 0.024),
-            "liquidator_fee": data.get("liquidator_fee", 0.012),
-            "min_notional": data.get("min_notional", 10),
-            "quote_max": data.get("quote_max", 100000),
-
-            # ✅ Precision-relevant fields
-            "base_tick": data.get("base_tick", 0.01),
-            "base_min": data.get("base_min", 0.0),
-            "base_max": data.get("base_max", float("inf")),
-            "quote_tick": data.get("quote_tick", 0.01),
-        }
-    else:
-        raise Exception(f"Failed to fetch asset info for {symbol} - Status code: {response.status_code}")
-
-def get_available_balance(orderly_secret, orderly_account_id, orderly_public_key) -> float:
-    # Convert the orderly_secret string to Ed25519PrivateKey object
-    if orderly_secret.startswith("ed25519:"):
-        orderly_secret = orderly_secret.replace("ed25519:", "")
-    private_key = Ed25519PrivateKey.from_private_bytes(b58decode(orderly_secret))
-
-    timestamp = str(int(time.time() * 1000))
-    path = "/v1/positions"
-
-    # Get first and last day of current month
-    # first_day_of_month = time.strftime("%Y-%m-01")
-    # last_day_of_month = time.strftime("%Y-%m-%d")
-
-    # params = {
-    #     "page": 1,
-    #     "page_size": 1,
-    #     "start_date": first_day_of_month,
-    #     "end_date": last_day_of_month
-    # }
-
-    message = f"{timestamp}GET{path}"
-    signature = urlsafe_b64encode(private_key.sign(message.encode())).decode()
-
-    headers = {
-        "Content-Type": "application/x-www-form-urlencoded",
-        "orderly-timestamp": timestamp,
-        "orderly-account-id": orderly_account_id,
-        "orderly-key": orderly_public_key,
-        "orderly-signature": signature,
+    return {
+        "base_mmr": data.get("base_mmr", 0.05),
+        "base_imr": data.get("base_imr", 0.1),
+        "imr_factor": data.get("imr_factor", 0.00000208),
+        "funding_period": data.get("funding_period", 8),
+        "cap_funding": data.get("cap_funding", 0.0075),
+        "std_liquidation_fee": data.get("std_liquidation_fee", 0.024),
+        "liquidator_fee": data.get("liquidator_fee", 0.012),
+        "min_notional": data.get("min_notional", 10),
+        "quote_max": data.get("quote_max", 100000),
+
+        # ✅ Precision-relevant fields
+        "base_tick": data.get("base_tick", 0.01),
+        "base_min": data.get("base_min", 0.0),
+        "base_max": data.get("base_max", float("inf")),
+        "quote_tick": data.get("quote_tick", 0.01),
     }
 
-    url = f"{BASE_URL}{path}"
+def get_available_balance(orderly_secret, orderly_account_id, orderly_public_key,
+                          priority: int = PRIORITY_NORMAL) -> float:
+    # Free collateral from the private account stream; REST only while it is not synced.
+    # Order sizing (high priority) needs it fresh: it moves with unrealized PnL, which is not pushed.
+    max_age = ORDER_SNAPSHOT_MAX_AGE if priority <= PRIORITY_HIGH else None
+    free_collateral = get_account_stream(orderly_account_id, orderly_public_key, orderly_secret).get_free_collateral(
+        max_age, priority)
+    if free_collateral is not None:
+        return free_collateral
+
+    # Client (and its decoded key) is cached per credential set
+    client = get_orderly_client(orderly_account_id, orderly_public_key, orderly_secret)
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = client.get("/v1/positions", priority=priority)
         response.raise_for_status()
-        data = response.json()
+        data = response_json(response)
         # get from data free_collateral
         if data.get("success") and "data" in data:
             free_collateral = data["data"].get("free_collateral", 0.0)
@@ -285,19 +238,17 @@ def calculate_position_size_with_margin_cap(
 
     return qty
 
-rate_limiter = RateLimiter(max_calls=10, period=1)
 def place_futures_order(signal: dict):
     """
     Creates and submits a BRACKET order with TAKE_PROFIT and STOP_LOSS child orders.
+    Every REST call of the order flow uses the high-priority limiter lane.
     """
-    rate_limiter()  # ✅ global rate limit
-
     logger.info("Placing order with signal_dict: %s", signal)
 
     symbol = signal['symbol']
     side = signal['side'].upper()
 
-    asset_info = get_futures_exchange_info(symbol)
+    asset_info = get_futures_exchange_info(symbol, priority=PRIORITY_HIGH)
     if not asset_info:
         logger.error(f"❌ Failed to fetch asset info for {symbol}")
         return
@@ -337,16 +288,10 @@ def place_futures_order(signal: dict):
     orderly_secret     = ORDERLY_SECRET
     orderly_public_key = ORDERLY_PUBLIC_KEY
 
-    balance = get_available_balance(orderly_secret, orderly_account_id, orderly_public_key)
+    balance = get_available_balance(orderly_secret, orderly_account_id, orderly_public_key, priority=PRIORITY_HIGH)
     if balance is None or balance < 5.0:
         logger.error(f"❌ Insufficient balance. Balance: {balance}")
 
-    # Key
-    raw_key = b58decode(orderly_secret.replace("ed25519:", ""))
-    if len(raw_key) == 64:
-        raw_key = raw_key[:32]
-    private_key = Ed25519PrivateKey.from_private_bytes(raw_key)
-
     # --- Current price ---
     live_price = float(get_close_price(orderly_account_id, symbol))
     if live_price <= 0:
@@ -459,26 +404,11 @@ def place_futures_order(signal: dict):
     }
 
     # --- Sign & send ---
-    timestamp = str(int(time.time() * 1000))
     path = "/v1/algo/order"
-    body = json.dumps(payload, separators=(",", ":"))  # compact
-    message = f"{timestamp}POST{path}{body}"
-    signature = urlsafe_b64encode(private_key.sign(message.encode())).decode()
-
-    headers = {
-        "Content-Type": "application/json",
-        "orderly-timestamp": timestamp,
-        "orderly-account-id": orderly_account_id,
-        "orderly-key": orderly_public_key,
-        "orderly-signature": signature,
-        "Accept": "application/json"
-    }
-
-    url = f"{BASE_URL}{path}"
     max_retries = 2
     for attempt in range(max_retries):
         try:
-            response = requests.post(url, data=body, headers=headers, timeout=10)
+            response = orderly_client.post(path, payload, priority=PRIORITY_HIGH)
             if response.status_code == 200:
                 break
             elif "trigger price" in response.text.lower():
@@ -498,9 +428,7 @@ def place_futures_order(signal: dict):
             logger.error(f"❌ Error creating order: status={response.status_code}, text={response.text}")
 
     # Success: mark open + store order id
-    rows = response.json().get("data", {}).get("rows", [])
-    positional_tp_sl = next((row for row in rows if row.get("algo_type") == "POSITIONAL_TP_SL"), {})
-    order_id = positional_tp_sl.get("order_id", "0")
+    order_id = AlgoOrderResult.from_response(response_json(response)).order_id
 
     # Before your return statement, transform the side
     if side_str == "SELL":
@@ -530,32 +458,20 @@ def get_user_statistics():
     orderly_secret     = ORDERLY_SECRET
     orderly_public_key = ORDERLY_PUBLIC_KEY
 
-    if orderly_secret.startswith("ed25519:"):
-        orderly_secret = orderly_secret.replace("ed25519:", "")
-    private_key = Ed25519PrivateKey.from_private_bytes(b58decode(orderly_secret))
-
-    timestamp = str(int(time.time() * 1000))
-    path = "/v1/positions"
-    message = f"{timestamp}GET{path}"
-    signature = urlsafe_b64encode(private_key.sign(message.encode())).decode()
-
-    headers = {
-        "orderly-timestamp": timestamp,
-        "orderly-account-id": orderly_account_id,
-        "orderly-key": orderly_public_key,
-        "orderly-signature": signature,
-    }
+    open_positions = get_account_stream(orderly_account_id, orderly_public_key, orderly_secret).open_positions()
+    if open_positions is not None:
+        return len(open_positions)
 
-    url = f"{BASE_URL}{path}"
+    client = get_orderly_client(orderly_account_id, orderly_public_key, orderly_secret)
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = client.get("/v1/positions")
         response.raise_for_status()
-        data = response.json()
+        data = response_json(response)
 
         if data.get("success") and "data" in data:
-            positions = data["data"].get("rows", [])
-            open_positions = [p for p in positions if p.get("position_qty", 0) != 0]
+            positions = PositionsSnapshot.from_rest(data["data"]).positions
+            open_positions = [p for p in positions if p.position_qty != 0]
             count = len(open_positions)
             return count
         else:
@@ -0,0 +1,185 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+from collections import defaultdict
+from typing import Callable, Optional
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import websockets
+
+from logs.log_config import apolo_trader_logger as logger
+from trading_bot.orderly_types import Ticker, loads
+
+PUBLIC_WSS_BASE = "wss://ws-evm.orderly.org/ws/stream"
+# Reconnect backoff (seconds): doubles after each failed connection, reset once connected
+BACKOFF_START = 1.0
+BACKOFF_MAX = 30.0
+# A cached ticker older than this is treated as missing by get_price
+PRICE_MAX_AGE = 15.0
+
+
+class MarketDataHub:
+    """
+    One long-lived, multiplexed connection to Orderly's public WebSocket.
+
+    Runs its own asyncio loop in a daemon thread. Topics are re-subscribed
+    after every reconnect. Ticker messages are decoded into Ticker records and
+    cached in memory per symbol, so price lookups never touch the network.
+    Other topics can be consumed with add_handler().
+    """
+
+    def __init__(self, account_id: str, url_base: str = PUBLIC_WSS_BASE):
+        self.url = f"{url_base}/{account_id}"
+        self._topics = set()
+        self._handlers = defaultdict(list)
+        self._prices = {}
+        self._cond = threading.Condition()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ws = None
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"messages": 0, "connects": 0, "reconnects": 0, "handler_errors": 0}
+
+    # --- lifecycle -----------------------------------------------------------
+
+    def start(self):
+        """Start the background connection (idempotent)."""
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run_loop, name="market-data-hub", daemon=True)
+            self._thread.start()
+
+    def _run_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._connect_forever())
+
+    async def _connect_forever(self):
+        backoff = BACKOFF_START
+        while True:
+            try:
+                async with websockets.connect(self.url, ping_interval=15) as ws:
+                    self._ws = ws
+                    self._stats["connects"] += 1
+                    backoff = BACKOFF_START
+                    logger.info(f"📡 Market data hub connected ({len(self._topics)} topics)")
+                    for topic in list(self._topics):
+                        await self._send_subscribe(ws, topic)
+                    async for raw in ws:
+                        await self._on_message(ws, raw)
+            except Exception as e:
+                logger.warning(f"⚠️ Market data hub disconnected: {e}. Reconnecting in {backoff:.0f}s")
+            finally:
+                self._ws = None
+            self._stats["reconnects"] += 1
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, BACKOFF_MAX)
+
+    # --- subscriptions -------------------------------------------------------
+
+    @staticmethod
+    async def _send_subscribe(ws, topic: str):
+        await ws.send(json.dumps({"id": f"hub_{topic}", "topic": topic, "event": "subscribe"}))
+
+    def subscribe(self, topic: str):
+        """Subscribe to a topic now (if connected) and after every reconnect."""
+        self.start()
+        with self._cond:
+            if topic in self._topics:
+                return
+            self._topics.add(topic)
+        ws, loop = self._ws, self._loop
+        if ws is not None and loop is not None:
+            asyncio.run_coroutine_threadsafe(self._send_subscribe(ws, topic), loop)
+
+    def subscribe_ticker(self, symbol: str):
+        self.subscribe(f"{symbol}@ticker")
+
+    def add_handler(self, topic: str, handler: Callable[[dict], None]):
+        """Call handler(message) from the hub thread for every message on topic. Subscribes too."""
+        with self._cond:
+            self._handlers[topic].append(handler)
+        self.subscribe(topic)
+
+    # --- message handling ----------------------------------------------------
+
+    async def _on_message(self, ws, raw):
+        msg = loads(raw)
+        if msg.get("event") == "ping":
+            await ws.send(json.dumps({"event": "pong", "ts": msg.get("ts", int(time.time() * 1000))}))
+            return
+
+        topic = msg.get("topic")
+        data = msg.get("data")
+        if not topic or data is None:
+            return
+        self._stats["messages"] += 1
+
+        if topic.endswith("@ticker") and data.get("close") is not None:
+            symbol = topic.split("@", 1)[0]
+            with self._cond:
+                self._prices[symbol] = Ticker.from_ws(data, time.time())
+                self._cond.notify_all()
+
+        for handler in self._handlers.get(topic, ()):
+            try:
+                handler(msg)
+            except Exception as e:
+                self._stats["handler_errors"] += 1
+                logger.error(f"❌ Market data handler for {topic} failed: {e}")
+
+    # --- reads ---------------------------------------------------------------
+
+    def get_ticker(self, symbol: str) -> Optional[Ticker]:
+        """Latest Ticker (received_at in epoch seconds) or None if no ticker was received yet."""
+        with self._cond:
+            return self._prices.get(symbol)
+
+    def get_price(self, symbol: str, max_age: float = PRICE_MAX_AGE, wait: float = 0.0) -> Optional[float]:
+        """
+        Latest close for symbol, or None when missing or older than max_age seconds.
+        With wait > 0, block up to that long for a fresh tick (e.g. right after subscribing).
+        """
+        self.subscribe_ticker(symbol)
+        deadline = time.monotonic() + wait
+        with self._cond:
+            while True:
+                ticker = self._prices.get(symbol)
+                if ticker is not None and time.time() - ticker.received_at <= max_age:
+                    return ticker.close
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {**self._stats, "connected": self._ws is not None, "topics": len(self._topics),
+                    "symbols_priced": len(self._prices)}
+
+
+_hubs = {}
+_hubs_lock = threading.Lock()
+
+
+def get_market_data_hub(account_id: str) -> MarketDataHub:
+    """Return the running hub for an account, starting it on first use."""
+    with _hubs_lock:
+        hub = _hubs.get(account_id)
+        if hub is None:
+            hub = MarketDataHub(account_id)
+            _hubs[account_id] = hub
+    hub.start()
+    return hub
+
+
+def subscribe_configured_tickers(account_id: str, symbols) -> MarketDataHub:
+    """Make sure the hub streams tickers for every given symbol (configured + automated assets)."""
+    hub = get_market_data_hub(account_id)
+    for symbol in symbols:
+        if symbol:
+            hub.subscribe_ticker(symbol)
+    return hub
@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import threading
+import urllib.parse
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import requests
+from requests.adapters import HTTPAdapter
+from base58 import b58decode
+from base64 import urlsafe_b64encode
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from dotenv import load_dotenv
+
+from trading_bot.rate_limiter import rate_limiter, PRIORITY_NORMAL
+
+load_dotenv()
+
+# ✅ Orderly API Config
+BASE_URL = os.getenv("ORDERLY_BASE_URL")
+ORDERLY_ACCOUNT_ID = os.getenv("ORDERLY_ACCOUNT_ID")
+ORDERLY_SECRET = os.getenv("ORDERLY_SECRET")
+ORDERLY_PUBLIC_KEY = os.getenv("ORDERLY_PUBLIC_KEY")
+
+if not ORDERLY_SECRET or not ORDERLY_PUBLIC_KEY:
+    raise ValueError("❌ ORDERLY_SECRET or ORDERLY_PUBLIC_KEY environment variables are not set!")
+
+# ✅ Remove "ed25519:" prefix if present in private key
+if ORDERLY_SECRET.startswith("ed25519:"):
+    ORDERLY_SECRET = ORDERLY_SECRET.replace("ed25519:", "")
+
+DEFAULT_TIMEOUT = 10
+
+
+def load_private_key(orderly_secret: str) -> Ed25519PrivateKey:
+    """Decode a base58 Orderly secret (with or without the 'ed25519:' prefix, 32 or 64 bytes)."""
+    raw_key = b58decode(orderly_secret.replace("ed25519:", ""))
+    if len(raw_key) == 64:
+        raw_key = raw_key[:32]
+    return Ed25519PrivateKey.from_private_bytes(raw_key)
+
+
+class OrderlyClient:
+    """
+    Signed Orderly REST client backed by one keep-alive connection pool.
+
+    Key material is decoded once at construction; every request reuses the
+    pooled TCP+TLS connection instead of opening a new one. Every request
+    first takes a token from the process-wide rate limiter.
+    """
+
+    def __init__(self, base_url, account_id, public_key, secret, timeout=DEFAULT_TIMEOUT, pool_size=20):
+        self.base_url = base_url
+        self.account_id = account_id
+        self.public_key = public_key
+        self.private_key = load_private_key(secret)
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        # Simple I/O counters: one place to see how the exchange is behaving
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "errors": 0, "total_time": 0.0}
+
+    def sign(self, method: str, path_with_query: str, body: str = "") -> dict:
+        timestamp = str(int(time.time() * 1000))
+        message = f"{timestamp}{method}{path_with_query}{body}"
+        signature = urlsafe_b64encode(self.private_key.sign(message.encode())).decode()
+        return {
+            "orderly-timestamp": timestamp,
+            "orderly-account-id": self.account_id,
+            "orderly-key": self.public_key,
+            "orderly-signature": signature,
+        }
+
+    def request(self, method: str, path: str, params: dict = None, payload: dict = None,
+                signed: bool = True, timeout: float = None, endpoint: str = None,
+                priority: int = PRIORITY_NORMAL) -> requests.Response:
+        """
+        Send a request and return the raw Response (callers keep their own status handling).
+        Network errors propagate as requests.exceptions.RequestException.
+        `endpoint` names the rate-limit bucket (defaults to the path; pass it for
+        paths that embed a symbol) and `priority` picks the limiter lane.
+        """
+        rate_limiter.acquire(endpoint or path, priority)
+
+        query = f"?{urllib.parse.urlencode(params)}" if params else ""
+        body = json.dumps(payload, separators=(",", ":")) if payload is not None else None
+
+        headers = {}
+        if signed:
+            headers.update(self.sign(method, f"{path}{query}", body or ""))
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+            headers["Accept"] = "application/json"
+        elif method == "GET" and signed:
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+
+        t0 = time.perf_counter()
+        try:
+            response = self.session.request(
+                method,
+                f"{self.base_url}{path}{query}",
+                data=body,
+                headers=headers,
+                timeout=timeout or self.timeout,
+            )
+        except requests.exceptions.RequestException:
+            self._record(time.perf_counter() - t0, error=True)
+            raise
+        self._record(time.perf_counter() - t0, error=response.status_code != 200)
+        return response
+
+    def get(self, path: str, params: dict = None, signed: bool = True, timeout: float = None,
+            endpoint: str = None, priority: int = PRIORITY_NORMAL) -> requests.Response:
+        return self.request("GET", path, params=params, signed=signed, timeout=timeout,
+                            endpoint=endpoint, priority=priority)
+
+    def post(self, path: str, payload: dict, timeout: float = None,
+             endpoint: str = None, priority: int = PRIORITY_NORMAL) -> requests.Response:
+        return self.request("POST", path, payload=payload, timeout=timeout,
+                            endpoint=endpoint, priority=priority)
+
+    def _record(self, elapsed: float, error: bool):
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            self._stats["total_time"] += elapsed
+            if error:
+                self._stats["errors"] += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["avg_latency"] = stats["total_time"] / stats["requests"] if stats["requests"] else 0.0
+        return stats
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_orderly_client(account_id: str = None, public_key: str = None, secret: str = None) -> OrderlyClient:
+    """Return the shared client for a set of credentials (the .env account by default)."""
+    account_id = account_id or ORDERLY_ACCOUNT_ID
+    public_key = public_key or ORDERLY_PUBLIC_KEY
+    secret = (secret or ORDERLY_SECRET).replace("ed25519:", "")
+    key = (account_id, public_key, secret)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = OrderlyClient(BASE_URL, account_id, public_key, secret)
+            _clients[key] = client
+        return client
+
+
+# ✅ Shared client for the configured account
+orderly_client = get_orderly_client()
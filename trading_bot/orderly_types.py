@@ -0,0 +1,258 @@
+"""
+Typed, slot-based records for Orderly payloads.
+
+Responses and WebSocket frames are decoded once into small __slots__ objects
+with their numeric fields already converted, instead of being kept as nested
+dicts and converted field by field at every use. Parsing uses orjson; the hot
+paths (REST klines, order book snapshots) fill the records straight from the
+parsed rows without going through __init__ or per-field lookups with defaults.
+
+Records also answer record["field"], record.get("field") and "field" in
+record, so code written against the raw JSON rows keeps working.
+"""
+from typing import List, Optional
+
+import orjson
+
+loads = orjson.loads
+
+
+def response_json(response) -> dict:
+    """Decode a requests.Response body (same result as response.json())."""
+    return loads(response.content)
+
+
+def _float(value, default: float = 0.0) -> float:
+    return float(value) if value is not None else default
+
+
+class _Record:
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def astuple(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.astuple() == other.astuple()
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Kline(_Record):
+    __slots__ = ("start_timestamp", "end_timestamp", "open", "high", "low", "close", "volume", "amount")
+
+    def __init__(self, start_timestamp, end_timestamp, open, high, low, close, volume, amount):
+        self.start_timestamp = start_timestamp
+        self.end_timestamp = end_timestamp
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.amount = amount
+
+    @classmethod
+    def from_rest(cls, row: dict) -> "Kline":
+        """/v1/kline row."""
+        return cls(int(row["start_timestamp"]), int(row.get("end_timestamp") or 0),
+                   float(row["open"]), float(row["high"]), float(row["low"]), float(row["close"]),
+                   float(row["volume"]), _float(row.get("amount")))
+
+    @classmethod
+    def many_from_rest(cls, rows: list) -> List["Kline"]:
+        """/v1/kline rows in one pass (rows without start_timestamp are skipped), same records as from_rest."""
+        new = object.__new__
+        klines = []
+        for row in rows:
+            start = row.get("start_timestamp")
+            if start is None:
+                continue
+            kline = new(cls)
+            kline.start_timestamp = int(start)
+            kline.end_timestamp = int(row.get("end_timestamp") or 0)
+            kline.open = float(row["open"])
+            kline.high = float(row["high"])
+            kline.low = float(row["low"])
+            kline.close = float(row["close"])
+            kline.volume = float(row["volume"])
+            amount = row.get("amount")
+            kline.amount = float(amount) if amount is not None else 0.0
+            klines.append(kline)
+        return klines
+
+    @classmethod
+    def from_ws(cls, data: dict) -> "Kline":
+        """`{symbol}@kline_{interval}` data."""
+        return cls(int(data["startTime"]), int(data["endTime"]),
+                   float(data["open"]), float(data["high"]), float(data["low"]), float(data["close"]),
+                   float(data["volume"]), _float(data.get("amount")))
+
+
+class Ticker(_Record):
+    __slots__ = ("symbol", "open", "high", "low", "close", "volume", "amount", "received_at")
+
+    def __init__(self, symbol, open, high, low, close, volume, amount, received_at):
+        self.symbol = symbol
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.amount = amount
+        self.received_at = received_at
+
+    @classmethod
+    def from_ws(cls, data: dict, received_at: float) -> "Ticker":
+        """`{symbol}@ticker` data."""
+        return cls(data.get("symbol"), _float(data.get("open")), _float(data.get("high")), _float(data.get("low")),
+                   float(data["close"]), _float(data.get("volume")), _float(data.get("amount")), received_at)
+
+
+class OrderbookSnapshot(_Record):
+    __slots__ = ("bids", "asks", "timestamp")
+
+    def __init__(self, bids, asks, timestamp):
+        self.bids = bids            # [(price, qty), ...] best first
+        self.asks = asks
+        self.timestamp = timestamp  # exchange ms, the sequence anchor for deltas
+
+    @classmethod
+    def from_rest(cls, data: dict) -> "OrderbookSnapshot":
+        """/v1/orderbook/{symbol} data."""
+        return cls(_levels(data.get("bids", ())), _levels(data.get("asks", ())), int(data.get("timestamp") or 0))
+
+
+def _levels(rows) -> list:
+    """[{"price", "quantity"}, ...] -> [(price, qty), ...] floats."""
+    return [(float(row["price"]), float(row["quantity"])) for row in rows]
+
+
+class FundingRate(_Record):
+    __slots__ = ("symbol", "funding_rate", "funding_rate_timestamp", "next_funding_time")
+
+    def __init__(self, symbol, funding_rate, funding_rate_timestamp, next_funding_time):
+        self.symbol = symbol
+        self.funding_rate = funding_rate
+        self.funding_rate_timestamp = funding_rate_timestamp
+        self.next_funding_time = next_funding_time
+
+    @classmethod
+    def from_history(cls, row: dict) -> "FundingRate":
+        """/v1/public/funding_rate_history row."""
+        return cls(row.get("symbol"), _float(row.get("funding_rate")),
+                   row.get("funding_rate_timestamp"), row.get("next_funding_time"))
+
+    @classmethod
+    def from_current(cls, row: dict) -> "FundingRate":
+        """/v1/public/funding_rates row (latest settled rate of one symbol)."""
+        return cls(row.get("symbol"), _float(row.get("last_funding_rate")),
+                   row.get("last_funding_rate_timestamp"), row.get("next_funding_time"))
+
+
+class LiquidatedPosition(_Record):
+    __slots__ = ("symbol", "position_qty", "mark_price", "notional")
+
+    def __init__(self, symbol, position_qty, mark_price):
+        self.symbol = symbol
+        self.position_qty = position_qty
+        self.mark_price = mark_price
+        self.notional = abs(position_qty) * mark_price
+
+
+class Liquidation(_Record):
+    __slots__ = ("timestamp", "liquidation_id", "type", "positions_by_perp")
+
+    def __init__(self, timestamp, liquidation_id, type, positions_by_perp):
+        self.timestamp = timestamp
+        self.liquidation_id = liquidation_id
+        self.type = type
+        self.positions_by_perp = positions_by_perp
+
+    @classmethod
+    def from_rest(cls, row: dict) -> "Liquidation":
+        """/v1/public/liquidated_positions row (positions without a usable price are dropped)."""
+        positions = []
+        for pos in row.get("positions_by_perp", []):
+            try:
+                positions.append(LiquidatedPosition(pos.get("symbol"), _float(pos.get("position_qty")),
+                                                    _float(pos.get("mark_price"))))
+            except (TypeError, ValueError):
+                continue
+        return cls(int(row.get("timestamp") or 0), row.get("liquidation_id"), row.get("type"), positions)
+
+
+class Position(_Record):
+    __slots__ = ("symbol", "position_qty", "average_open_price", "mark_price", "unsettled_pnl")
+
+    def __init__(self, symbol, position_qty, average_open_price, mark_price, unsettled_pnl):
+        self.symbol = symbol
+        self.position_qty = position_qty
+        self.average_open_price = average_open_price
+        self.mark_price = mark_price
+        self.unsettled_pnl = unsettled_pnl
+
+    @classmethod
+    def from_rest(cls, row: dict) -> "Position":
+        """/v1/positions row."""
+        return cls(row.get("symbol"), _float(row.get("position_qty")), _float(row.get("average_open_price")),
+                   _float(row.get("mark_price")), _float(row.get("unsettled_pnl")))
+
+    @classmethod
+    def from_ws(cls, data: dict, previous: Optional["Position"] = None) -> "Position":
+        """Private `position` push (camelCase); fields it omits keep their previous value."""
+        def field(key, attr):
+            value = data.get(key)
+            if value is not None:
+                return float(value)
+            return getattr(previous, attr) if previous is not None else 0.0
+
+        return cls(data.get("symbol"), field("positionQty", "position_qty"),
+                   field("averageOpenPrice", "average_open_price"), field("markPrice", "mark_price"),
+                   field("unsettledPnl", "unsettled_pnl"))
+
+
+class PositionsSnapshot(_Record):
+    __slots__ = ("free_collateral", "positions")
+
+    def __init__(self, free_collateral, positions):
+        self.free_collateral = free_collateral
+        self.positions: List[Position] = positions
+
+    @classmethod
+    def from_rest(cls, data: dict) -> "PositionsSnapshot":
+        """/v1/positions data."""
+        return cls(_float(data.get("free_collateral")),
+                   [Position.from_rest(row) for row in data.get("rows", []) if row.get("symbol")])
+
+
+class AlgoOrderResult(_Record):
+    __slots__ = ("success", "order_id", "rows")
+
+    def __init__(self, success, order_id, rows):
+        self.success = success
+        self.order_id = order_id
+        self.rows = rows
+
+    @classmethod
+    def from_response(cls, payload: dict) -> "AlgoOrderResult":
+        """/v1/algo/order response; order_id is the POSITIONAL_TP_SL parent's ("0" if missing)."""
+        rows = (payload.get("data") or {}).get("rows", [])
+        parent = next((row for row in rows if row.get("algo_type") == "POSITIONAL_TP_SL"), {})
+        return cls(bool(payload.get("success")), parent.get("order_id", "0"), rows)
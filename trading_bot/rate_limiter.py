@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import defaultdict
+
+# ✅ Priority lanes. Lower value = served first.
+PRIORITY_HIGH = 0    # order placement and what it needs (asset info, balance)
+PRIORITY_NORMAL = 1  # market data for signal analysis (klines, orderbook, funding, ...)
+
+# Global Orderly budget (requests per second) shared by every thread in the process
+GLOBAL_RATE = 10
+# Tokens of the global bucket that only the high lane may spend, so a burst of
+# market-data fetches can never starve an order
+HIGH_PRIORITY_RESERVE = 2
+# Per-endpoint budget: one busy endpoint (e.g. klines for 30 assets) cannot use the whole global rate
+DEFAULT_ENDPOINT_RATE = 6
+ENDPOINT_RATES = {
+    "/v1/algo/order": GLOBAL_RATE,
+}
+
+
+class _Bucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        missing = amount - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+
+class TokenBucketRateLimiter:
+    """
+    Process-wide token bucket with per-endpoint buckets and priority lanes.
+
+    A request needs one token from the global bucket and one from its endpoint
+    bucket. Normal-priority requests must leave HIGH_PRIORITY_RESERVE global
+    tokens untouched and yield while a high-priority request is waiting for
+    global tokens (one held back only by its own endpoint bucket does not need
+    them, so it does not stall normal traffic).
+    Waiting happens in Condition.wait(), which releases the lock, so a
+    throttled thread never blocks the others.
+    """
+
+    def __init__(self, rate: float = GLOBAL_RATE, reserve: float = HIGH_PRIORITY_RESERVE,
+                 endpoint_rates: dict = None, default_endpoint_rate: float = DEFAULT_ENDPOINT_RATE):
+        self._cond = threading.Condition()
+        self._global = _Bucket(rate, rate)
+        self._reserve = reserve
+        self._endpoint_rates = dict(ENDPOINT_RATES if endpoint_rates is None else endpoint_rates)
+        self._default_endpoint_rate = default_endpoint_rate
+        self._endpoints = {}
+        self._high_waiting_global = 0  # high-priority requests waiting for a global token
+        self._stats = defaultdict(lambda: {"acquired": 0, "throttled": 0, "wait_time": 0.0})
+
+    def _endpoint_bucket(self, endpoint: str) -> _Bucket:
+        bucket = self._endpoints.get(endpoint)
+        if bucket is None:
+            rate = self._endpoint_rates.get(endpoint, self._default_endpoint_rate)
+            bucket = self._endpoints[endpoint] = _Bucket(rate, rate)
+        return bucket
+
+    def acquire(self, endpoint: str = "default", priority: int = PRIORITY_NORMAL) -> float:
+        """Block until the request may be sent; returns the seconds spent waiting."""
+        high = priority <= PRIORITY_HIGH
+        start = time.monotonic()
+        throttled = False
+        waiting_global = False
+        with self._cond:
+            bucket = self._endpoint_bucket(endpoint)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._global.refill(now)
+                    bucket.refill(now)
+                    needed = 1 if high else 1 + self._reserve
+                    yielding = not high and self._high_waiting_global > 0
+                    if not yielding and self._global.tokens >= needed and bucket.tokens >= 1:
+                        self._global.tokens -= 1
+                        bucket.tokens -= 1
+                        break
+                    throttled = True
+                    if high and waiting_global != (self._global.tokens < needed):
+                        waiting_global = not waiting_global
+                        self._high_waiting_global += 1 if waiting_global else -1
+                        if not waiting_global:
+                            self._cond.notify_all()
+                    wait = max(self._global.time_until(needed), bucket.time_until(1))
+                    # Yielding threads are woken by notify_all when the high lane drains
+                    self._cond.wait(timeout=wait if wait > 0 else 0.05)
+            finally:
+                if waiting_global:
+                    self._high_waiting_global -= 1
+                    self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            stats = self._stats[endpoint]
+            stats["acquired"] += 1
+            if throttled:
+                stats["throttled"] += 1
+                stats["wait_time"] += waited
+        return waited
+
+    def __call__(self, endpoint: str = "default", priority: int = PRIORITY_NORMAL) -> float:
+        return self.acquire(endpoint, priority)
+
+    def stats(self) -> dict:
+        """Per-endpoint counters: {endpoint: {"acquired", "throttled", "wait_time"}}."""
+        with self._cond:
+            return {endpoint: dict(values) for endpoint, values in self._stats.items()}
+
+
+# ✅ The one limiter every Orderly request goes through
+rate_limiter = TokenBucketRateLimiter()
@@ -0,0 +1,151 @@
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logs.log_config import apolo_trader_logger as logger
+from trading_bot.orderly_client import orderly_client
+from trading_bot.rate_limiter import PRIORITY_NORMAL
+from trading_bot.orderly_types import FundingRate, response_json
+
+# Tick sizes, margins and limits almost never change
+EXCHANGE_INFO_TTL = 3600
+# Used when a funding row has no usable next_funding_time
+FUNDING_FALLBACK_TTL = 300
+
+
+def _rows(response) -> list:
+    response.raise_for_status()
+    data = response_json(response).get("data") or {}
+    return data.get("rows", []) if isinstance(data, dict) else data
+
+
+def _load_all_exchange_info(priority: int) -> Dict[str, Tuple[dict, float]]:
+    """Every symbol's /v1/public/info row in one request."""
+    expires = time.time() + EXCHANGE_INFO_TTL
+    rows = _rows(orderly_client.get("/v1/public/info", signed=False, priority=priority))
+    return {row["symbol"]: (row, expires) for row in rows if row.get("symbol")}
+
+
+def _load_exchange_info(symbol: str, priority: int) -> Tuple[dict, float]:
+    response = orderly_client.get(f"/v1/public/info/{symbol}", signed=False,
+                                  endpoint="/v1/public/info", priority=priority)
+    response.raise_for_status()
+    return response_json(response).get("data", {}), time.time() + EXCHANGE_INFO_TTL
+
+
+def _funding_expiry(next_funding_time) -> float:
+    """Funding only changes at the next settlement: expire exactly then."""
+    try:
+        expires = float(next_funding_time) / 1000
+    except (TypeError, ValueError):
+        expires = 0.0
+    now = time.time()
+    return expires if expires > now else now + FUNDING_FALLBACK_TTL
+
+
+def _load_all_funding(priority: int) -> Dict[str, Tuple[list, float]]:
+    """Latest settled funding of every symbol, as FundingRate records like funding_rate_history's."""
+    rows = _rows(orderly_client.get("/v1/public/funding_rates", signed=False, priority=priority))
+    entries = {}
+    for row in rows:
+        if not row.get("symbol") or row.get("last_funding_rate") is None:
+            continue
+        funding = FundingRate.from_current(row)
+        entries[row["symbol"]] = ([funding], _funding_expiry(funding.next_funding_time))
+    return entries
+
+
+def _load_funding(symbol: str, priority: int) -> Tuple[list, float]:
+    rows = _rows(orderly_client.get("/v1/public/funding_rate_history", params={"symbol": symbol, "limit": 1},
+                                    signed=False, priority=priority))
+    rows = [FundingRate.from_history(row) for row in rows]
+    return rows, _funding_expiry(rows[0].next_funding_time if rows else None)
+
+
+class ReferenceDataCache:
+    """
+    Slow-changing per-symbol reference data with a per-dataset expiry.
+
+    A miss refreshes the whole dataset in one bulk request (all symbols); only
+    if that fails, or the symbol is not in it, is the single-symbol endpoint
+    used. Concurrent misses on a dataset wait for the same refresh.
+    """
+
+    def __init__(self, loaders: Dict[str, Tuple[Callable, Callable]]):
+        self._loaders = loaders
+        self._entries: Dict[str, Dict[str, tuple]] = {dataset: {} for dataset in loaders}
+        self._locks = {dataset: threading.Lock() for dataset in loaders}
+        # Counters have their own lock: hits must not wait behind a dataset refresh in flight
+        self._stats_lock = threading.Lock()
+        self._stats = {dataset: {"hits": 0, "misses": 0, "bulk_refreshes": 0, "single_fetches": 0}
+                       for dataset in loaders}
+
+    def _fresh(self, dataset: str, symbol: str):
+        entry = self._entries[dataset].get(symbol)
+        if entry is not None and entry[1] > time.time():
+            return entry
+        return None
+
+    def _count(self, dataset: str, counter: str):
+        with self._stats_lock:
+            self._stats[dataset][counter] += 1
+
+    def get(self, dataset: str, symbol: str, priority: int = PRIORITY_NORMAL):
+        entry = self._fresh(dataset, symbol)
+        if entry is not None:
+            self._count(dataset, "hits")
+            return entry[0]
+
+        with self._locks[dataset]:
+            entry = self._fresh(dataset, symbol)
+            if entry is not None:
+                # Another thread refreshed the dataset while we waited
+                self._count(dataset, "hits")
+                return entry[0]
+            self._count(dataset, "misses")
+
+            load_all, load_one = self._loaders[dataset]
+            try:
+                self._entries[dataset].update(load_all(priority))
+                self._count(dataset, "bulk_refreshes")
+            except Exception as e:
+                logger.warning(f"⚠️ Bulk refresh of {dataset} failed: {e}")
+
+            entry = self._fresh(dataset, symbol)
+            if entry is None:
+                self._count(dataset, "single_fetches")
+                entry = load_one(symbol, priority)
+                self._entries[dataset][symbol] = entry
+            return entry[0]
+
+    def invalidate(self, dataset: str = None, symbol: str = None):
+        for name, entries in self._entries.items():
+            if dataset is None or name == dataset:
+                if symbol is None:
+                    entries.clear()
+                else:
+                    entries.pop(symbol, None)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {dataset: dict(values) for dataset, values in self._stats.items()}
+
+
+# ✅ Shared cache for exchange info and funding
+reference_data = ReferenceDataCache({
+    "exchange_info": (_load_all_exchange_info, _load_exchange_info),
+    "funding": (_load_all_funding, _load_funding),
+})
+
+
+def get_cached_exchange_info(symbol: str, priority: int = PRIORITY_NORMAL) -> dict:
+    """Raw /v1/public/info row for symbol (cached for EXCHANGE_INFO_TTL)."""
+    return reference_data.get("exchange_info", symbol, priority)
+
+
+def get_current_funding(symbol: str, priority: int = PRIORITY_NORMAL) -> list:
+    """[latest FundingRate] for symbol, cached until the next funding settlement."""
+    return reference_data.get("funding", symbol, priority)